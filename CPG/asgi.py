@@ -3,6 +3,11 @@ ASGI config for CPG project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
 
+The gesture command stream (``comando-gesto/stream/``) only works when the
+project is served through this module, e.g.::
+
+    uvicorn CPG.asgi:application --port 8000
+
 For more information on this file, see
 https://docs.djangoproject.com/en/5.1/howto/deployment/asgi/
 """
@@ -14,3 +19,10 @@ from django.core.asgi import get_asgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'CPG.settings')
 
 application = get_asgi_application()
+
+from django.conf import settings
+
+if settings.DEBUG:
+    from django.contrib.staticfiles.handlers import ASGIStaticFilesHandler
+
+    application = ASGIStaticFilesHandler(application)
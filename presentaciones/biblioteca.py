@@ -0,0 +1,64 @@
+import base64
+import json
+
+from django.conf import settings
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+
+from .models import Presentacion
+
+TAMANO_PAGINA = getattr(settings, 'BIBLIOTECA_TAMANO_PAGINA', 24)
+LIMITE_MAXIMO = 100
+# Solo las columnas que pinta la cuadrícula del inicio.
+CAMPOS_TARJETA = ('id', 'nombre', 'titulo', 'enlace_drive', 'miniatura', 'miniatura_url', 'fecha_subida', 'estado')
+
+
+class CursorInvalido(ValueError):
+    pass
+
+
+def codificar_cursor(fecha_subida, presentacion_id):
+    datos = json.dumps([fecha_subida.isoformat(), presentacion_id]).encode('utf-8')
+    return base64.urlsafe_b64encode(datos).decode('ascii').rstrip('=')
+
+
+def decodificar_cursor(cursor):
+    try:
+        datos = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        fecha, presentacion_id = json.loads(datos)
+        fecha = parse_datetime(fecha)
+        if fecha is None:
+            raise ValueError(cursor)
+        return fecha, int(presentacion_id)
+    except (ValueError, TypeError) as e:
+        raise CursorInvalido(f"Cursor inválido: {cursor}") from e
+
+
+def pagina_biblioteca(usuario, cursor=None, limite=TAMANO_PAGINA):
+    # Paginación por clave (fecha_subida, id): el costo no crece con la profundidad, a diferencia de OFFSET,
+    # y una presentación nueva no desplaza ni repite las páginas ya cargadas.
+    limite = max(1, min(limite, LIMITE_MAXIMO))
+    consulta = Presentacion.objects.filter(usuario=usuario)
+    if cursor:
+        fecha, presentacion_id = decodificar_cursor(cursor)
+        consulta = consulta.filter(Q(fecha_subida__lt=fecha) | Q(fecha_subida=fecha, id__lt=presentacion_id))
+
+    filas = list(consulta.order_by('-fecha_subida', '-id').values(*CAMPOS_TARJETA)[:limite + 1])
+    siguiente = None
+    if len(filas) > limite:
+        filas = filas[:limite]
+        siguiente = codificar_cursor(filas[-1]['fecha_subida'], filas[-1]['id'])
+    return filas, siguiente
+
+
+def tarjeta(fila):
+    almacenamiento = Presentacion._meta.get_field('miniatura').storage
+    return {
+        'id': fila['id'],
+        'nombre': fila['nombre'],
+        'titulo': fila['titulo'],
+        'enlace_drive': fila['enlace_drive'],
+        'miniatura': fila['miniatura_url'] or (almacenamiento.url(fila['miniatura']) if fila['miniatura'] else None),
+        'fecha_subida': fila['fecha_subida'],
+        'estado': fila['estado'],
+    }
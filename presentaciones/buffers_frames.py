@@ -0,0 +1,175 @@
+import threading
+
+import cv2
+import numpy as np
+
+
+# Buffers por forma que puede crear el pool. Si todos siguen en uso se reserva uno suelto que no vuelve
+# al pool: nunca se recicla un frame que otra etapa (inferencia, HUD, display) todavía está leyendo.
+MAXIMO_POOL = 8
+CAPAS_MAXIMAS = 64
+FUENTE_HUD = cv2.FONT_HERSHEY_SIMPLEX
+
+
+class PoolFrames:
+    # Buffers preasignados por forma con lista de libres: cv2 escribe en ellos con dst= y la última etapa
+    # que usa el frame (o la cola que lo descarta) lo devuelve con liberar().
+    def __init__(self, maximo=MAXIMO_POOL):
+        self.maximo = maximo
+        self._libres = {}
+        self._creados = {}
+        self._propios = {}
+        self._lock = threading.Lock()
+        self.asignaciones = 0
+        self.sueltos = 0
+        self.bytes_asignados = 0
+
+    def tomar(self, forma, dtype=np.uint8):
+        clave = (tuple(forma), np.dtype(dtype).str)
+        with self._lock:
+            libres = self._libres.setdefault(clave, [])
+            if libres:
+                return libres.pop()
+            buffer = np.empty(forma, dtype)
+            self.asignaciones += 1
+            if self._creados.get(clave, 0) < self.maximo:
+                self._creados[clave] = self._creados.get(clave, 0) + 1
+                self._propios[id(buffer)] = (clave, buffer)
+                self.bytes_asignados += buffer.nbytes
+            else:
+                self.sueltos += 1
+            return buffer
+
+    def liberar(self, buffer):
+        with self._lock:
+            propio = self._propios.get(id(buffer))
+            # Los buffers sueltos y los arrays que no salieron del pool simplemente se ignoran.
+            if propio is None or propio[1] is not buffer:
+                return
+            libres = self._libres[propio[0]]
+            if not any(libre is buffer for libre in libres):
+                libres.append(buffer)
+
+
+class BufferReutilizable:
+    # Memoria plana que solo crece: cualquier forma que quepa se entrega como una vista contigua,
+    # así los recortes de tamaño variable (ROI) tampoco reservan memoria en cada frame.
+    def __init__(self, dtype=np.uint8):
+        self.dtype = np.dtype(dtype)
+        self._plano = np.empty(0, self.dtype)
+        self.asignaciones = 0
+
+    def vista(self, forma):
+        tamano = int(np.prod(forma))
+        if tamano > self._plano.size:
+            self._plano = np.empty(tamano, self.dtype)
+            self.asignaciones += 1
+        return self._plano[:tamano].reshape(forma)
+
+    @property
+    def bytes_asignados(self):
+        return self._plano.nbytes
+
+
+def espejar(frame, pool):
+    return cv2.flip(frame, 1, dst=pool.tomar(frame.shape, frame.dtype))
+
+
+def convertir_rgb(frame, buffer):
+    return cv2.cvtColor(frame, cv2.COLOR_BGR2RGB, dst=buffer.vista(frame.shape))
+
+
+class CapasHud:
+    # Textos y bandas fijas del HUD rasterizados una sola vez; en cada frame solo se copian sus píxeles.
+    def __init__(self):
+        self._capas = {}
+        self._franjas = {}
+        self._solidos = {}
+        self._mezcla = BufferReutilizable()
+
+    def capa(self, clave, forma, dibujar):
+        capa = self._capas.get(clave)
+        if capa is None:
+            if len(self._capas) >= CAPAS_MAXIMAS:
+                self._capas.clear()
+            # Se dibuja sobre dos fondos distintos: lo que coincide en ambos es lo que se dibujó.
+            negro = np.zeros(forma + (3,), np.uint8)
+            blanco = np.full(forma + (3,), 255, np.uint8)
+            dibujar(negro)
+            dibujar(blanco)
+            mascara = (negro == blanco).all(axis=2)[..., None]
+            capa = self._capas[clave] = (negro, mascara)
+        return capa
+
+    def _capa_texto(self, texto, escala, color, grosor):
+        (ancho, alto), base = cv2.getTextSize(texto, FUENTE_HUD, escala, grosor)
+        margen = grosor + 2
+        origen = (margen, alto + margen)
+        colores, mascara = self.capa(
+            ('texto', texto, escala, color, grosor),
+            (alto + base + 2 * margen, ancho + 2 * margen),
+            lambda lienzo: cv2.putText(lienzo, texto, origen, FUENTE_HUD, escala, color, grosor)
+        )
+        return colores, mascara, origen
+
+    def ancho_texto(self, texto, escala, grosor):
+        return cv2.getTextSize(texto, FUENTE_HUD, escala, grosor)[0][0]
+
+    def pegar(self, frame, colores, mascara, x, y, peso=None):
+        alto_frame, ancho_frame = frame.shape[:2]
+        alto, ancho = mascara.shape[:2]
+        x0, y0 = max(0, x), max(0, y)
+        x1, y1 = min(ancho_frame, x + ancho), min(alto_frame, y + alto)
+        if x0 >= x1 or y0 >= y1:
+            return
+        destino = frame[y0:y1, x0:x1]
+        recorte = (slice(y0 - y, y1 - y), slice(x0 - x, x1 - x))
+        colores, mascara = colores[recorte], mascara[recorte]
+        if peso is not None:
+            colores = cv2.addWeighted(destino, 1 - peso, colores, peso, 0,
+                                      dst=self._mezcla.vista(destino.shape))
+        np.copyto(destino, colores, where=mascara)
+
+    def texto(self, frame, texto, origen, escala, color, grosor, peso=None):
+        colores, mascara, (dx, dy) = self._capa_texto(texto, escala, color, grosor)
+        self.pegar(frame, colores, mascara, origen[0] - dx, origen[1] - dy, peso)
+
+    def banda(self, frame, clave, alto, dibujar):
+        ancho = frame.shape[1]
+        colores, mascara = self.capa(('banda', clave, ancho), (alto, ancho), dibujar)
+        self.pegar(frame, colores, mascara, 0, 0)
+
+    def mezclar_borde(self, frame, color, grosor, peso):
+        # Equivale a dibujar cv2.rectangle(..., grosor) en una copia y mezclar todo el frame con addWeighted,
+        # pero solo se tocan las cuatro franjas del borde: fuera de ellas la mezcla dejaba el frame igual.
+        alto, ancho = frame.shape[:2]
+        franjas = self._franjas.get((alto, ancho, grosor))
+        if franjas is None:
+            mascara = np.zeros((alto, ancho), np.uint8)
+            cv2.rectangle(mascara, (0, 0), (ancho, alto), 255, grosor)
+            arriba = int(np.argmin(mascara[:, ancho // 2]))
+            abajo = alto - int(np.argmin(mascara[::-1, ancho // 2]))
+            izquierda = int(np.argmin(mascara[alto // 2]))
+            derecha = ancho - int(np.argmin(mascara[alto // 2, ::-1]))
+            franjas = self._franjas[(alto, ancho, grosor)] = (
+                (slice(0, arriba), slice(0, ancho)),
+                (slice(abajo, alto), slice(0, ancho)),
+                (slice(arriba, abajo), slice(0, izquierda)),
+                (slice(arriba, abajo), slice(derecha, ancho)),
+            )
+
+        solido = self._solidos.get((alto, ancho, color))
+        if solido is None:
+            solido = self._solidos[(alto, ancho, color)] = np.full((alto, ancho, 3), color, np.uint8)
+
+        for franja in franjas:
+            region = frame[franja]
+            if region.size:
+                cv2.addWeighted(region, 1 - peso, solido[franja], peso, 0, dst=region)
+
+    def estadisticas(self):
+        return {
+            'capas': len(self._capas),
+            'bytes': sum(c.nbytes + m.nbytes for c, m in self._capas.values())
+                     + sum(s.nbytes for s in self._solidos.values()) + self._mezcla.bytes_asignados,
+        }
@@ -0,0 +1,227 @@
+import hashlib
+import json
+import logging
+import os
+import time
+from contextlib import contextmanager
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+# Fuera de MEDIA_ROOT: los archivos de Drive solo se sirven a su dueño desde la vista archivo_presentacion.
+DIRECTORIO_CACHE = getattr(settings, 'DRIVE_CACHE_DIR', os.path.join(settings.BASE_DIR, 'cache_drive'))
+TAMANO_MAXIMO_CACHE = getattr(settings, 'DRIVE_CACHE_MAX_MB', 1024) * 1024 * 1024
+ARCHIVO_ESTADISTICAS = 'estadisticas.json'
+ARCHIVO_BLOQUEO = '.cache.lock'
+
+
+@contextmanager
+def bloqueo_archivo(ruta):
+    with open(ruta, 'a+b') as archivo:
+        if os.name == 'nt':
+            import msvcrt
+            archivo.seek(0)
+            while True:
+                try:
+                    msvcrt.locking(archivo.fileno(), msvcrt.LK_LOCK, 1)
+                    break
+                except OSError:
+                    time.sleep(0.05)
+            try:
+                yield archivo
+            finally:
+                archivo.seek(0)
+                msvcrt.locking(archivo.fileno(), msvcrt.LK_UNLCK, 1)
+        else:
+            import fcntl
+            fcntl.flock(archivo.fileno(), fcntl.LOCK_EX)
+            try:
+                yield archivo
+            finally:
+                fcntl.flock(archivo.fileno(), fcntl.LOCK_UN)
+
+
+@contextmanager
+def bloqueo_entrada(ruta):
+    # El .lock de una entrada se borra junto con ella. Si otro proceso lo borró mientras se esperaba, el bloqueo
+    # obtenido es sobre un archivo que ya no está en el directorio y hay que tomarlo de nuevo.
+    while True:
+        with bloqueo_archivo(ruta) as archivo:
+            try:
+                vigente = os.path.samestat(os.fstat(archivo.fileno()), os.stat(ruta))
+            except OSError:
+                vigente = False
+            if vigente:
+                yield
+                return
+
+
+def hash_clave(texto):
+    return hashlib.sha256(texto.encode('utf-8')).hexdigest()[:24]
+
+
+def version_drive(metadata):
+    # Los archivos nativos de Google (Slides) no tienen md5Checksum; su versión es modifiedTime.
+    return metadata.get('md5Checksum') or metadata.get('modifiedTime') or ''
+
+
+class CacheDrive:
+    def __init__(self, directorio=DIRECTORIO_CACHE, tamano_maximo=TAMANO_MAXIMO_CACHE):
+        self.directorio = directorio
+        self.tamano_maximo = tamano_maximo
+
+    def _preparar(self):
+        os.makedirs(self.directorio, exist_ok=True)
+
+    def ruta(self, drive_id, version, extension):
+        return os.path.join(self.directorio, f"{hash_clave(drive_id)}-{hash_clave(version)}.{extension}")
+
+    def ruta_actual(self, drive_id):
+        if not os.path.isdir(self.directorio):
+            return None
+        prefijo = hash_clave(drive_id) + '-'
+        candidatas = [(uso, ruta) for uso, _, ruta in self._entradas() if os.path.basename(ruta).startswith(prefijo)]
+        return max(candidatas)[1] if candidatas else None
+
+    def contiene(self, drive_id, version, extension):
+        return os.path.exists(self.ruta(drive_id, version, extension))
+
+    def obtener(self, drive_id, version, extension, descargar, reanudable=False):
+        self._preparar()
+        ruta = self.ruta(drive_id, version, extension)
+
+        # Nunca se toma el bloqueo global mientras se tiene el de una entrada (la expulsión va al revés).
+        with bloqueo_entrada(ruta + '.lock'):
+            acierto = os.path.exists(ruta)
+            if acierto:
+                estado = os.stat(ruta)
+                tamano = estado.st_size
+                # El último uso va en atime; mtime se conserva para que el ETag del archivo no cambie.
+                os.utime(ruta, (time.time(), estado.st_mtime))
+            else:
+                tamano = self._descargar(ruta, descargar, reanudable)
+
+        if acierto:
+            self._registrar(aciertos=1, bytes_ahorrados=tamano)
+            return ruta, True
+
+        self._eliminar_versiones_anteriores(drive_id, ruta)
+        expulsados = self._expulsar(conservar=ruta)
+        self._registrar(fallos=1, bytes_descargados=tamano, expulsados=expulsados)
+        return ruta, False
+
+    def _descargar(self, ruta, descargar, reanudable):
+        # El parcial conserva el nombre de la versión: solo se reanuda si el archivo en Drive no cambió.
+        parcial = ruta + '.part'
+        inicio = os.path.getsize(parcial) if reanudable and os.path.exists(parcial) else 0
+        with open(parcial, 'ab' if inicio else 'wb') as archivo:
+            descargar(archivo, inicio)
+        os.replace(parcial, ruta)
+        return os.path.getsize(ruta)
+
+    def _entradas(self):
+        entradas = []
+        for nombre in os.listdir(self.directorio):
+            ruta = os.path.join(self.directorio, nombre)
+            if nombre.endswith(('.lock', '.tmp', '.part', '.json')) or not os.path.isfile(ruta):
+                continue
+            try:
+                estado = os.stat(ruta)
+            except OSError:
+                continue
+            entradas.append((max(estado.st_atime, estado.st_mtime), estado.st_size, ruta))
+        return entradas
+
+    def _eliminar(self, ruta):
+        bloqueo = ruta + '.lock'
+        try:
+            with bloqueo_entrada(bloqueo):
+                os.remove(ruta)
+                try:
+                    os.remove(bloqueo)
+                except OSError:
+                    # En Windows no se puede borrar mientras está abierto; se reutiliza si vuelve la entrada.
+                    pass
+            return True
+        except OSError:
+            # En Windows un archivo abierto por otro proceso no se puede borrar todavía.
+            return False
+
+    def _eliminar_versiones_anteriores(self, drive_id, actual):
+        prefijo = hash_clave(drive_id) + '-'
+        for _, _, ruta in self._entradas():
+            if ruta != actual and os.path.basename(ruta).startswith(prefijo):
+                self._eliminar(ruta)
+
+    def _expulsar(self, conservar=None):
+        with bloqueo_archivo(os.path.join(self.directorio, ARCHIVO_BLOQUEO)):
+            entradas = sorted(self._entradas())
+            total = sum(tamano for _, tamano, _ in entradas)
+            expulsados = 0
+            for _, tamano, ruta in entradas:
+                if total <= self.tamano_maximo:
+                    break
+                if ruta == conservar:
+                    continue
+                if self._eliminar(ruta):
+                    total -= tamano
+                    expulsados += 1
+            return expulsados
+
+    def _registrar(self, **incrementos):
+        ruta = os.path.join(self.directorio, ARCHIVO_ESTADISTICAS)
+        try:
+            with bloqueo_archivo(os.path.join(self.directorio, ARCHIVO_BLOQUEO)):
+                estadisticas = self._leer_estadisticas(ruta)
+                for clave, valor in incrementos.items():
+                    estadisticas[clave] = estadisticas.get(clave, 0) + valor
+                temporal = ruta + '.tmp'
+                with open(temporal, 'w', encoding='utf-8') as archivo:
+                    json.dump(estadisticas, archivo)
+                os.replace(temporal, ruta)
+        except OSError as e:
+            logger.warning(f"No se pudieron actualizar las estadísticas de la caché: {e}")
+
+    def registrar_descarga_evitada(self, tamano):
+        self._preparar()
+        self._registrar(descargas_evitadas=1, bytes_evitados=tamano)
+
+    def _leer_estadisticas(self, ruta):
+        try:
+            with open(ruta, encoding='utf-8') as archivo:
+                return json.load(archivo)
+        except (OSError, ValueError):
+            return {}
+
+    def estadisticas(self):
+        self._preparar()
+        estadisticas = {
+            'aciertos': 0,
+            'fallos': 0,
+            'bytes_ahorrados': 0,
+            'bytes_descargados': 0,
+            'expulsados': 0,
+            'descargas_evitadas': 0,
+            'bytes_evitados': 0,
+        }
+        estadisticas.update(self._leer_estadisticas(os.path.join(self.directorio, ARCHIVO_ESTADISTICAS)))
+        entradas = self._entradas()
+        consultas = estadisticas['aciertos'] + estadisticas['fallos']
+        estadisticas['tasa_aciertos'] = estadisticas['aciertos'] / consultas if consultas else 0.0
+        estadisticas['archivos'] = len(entradas)
+        estadisticas['tamano_bytes'] = sum(tamano for _, tamano, _ in entradas)
+        estadisticas['tamano_maximo_bytes'] = self.tamano_maximo
+        return estadisticas
+
+    def vaciar(self):
+        self._preparar()
+        eliminados = sum(1 for _, _, ruta in self._entradas() if self._eliminar(ruta))
+        with bloqueo_archivo(os.path.join(self.directorio, ARCHIVO_BLOQUEO)):
+            ruta = os.path.join(self.directorio, ARCHIVO_ESTADISTICAS)
+            if os.path.exists(ruta):
+                os.remove(ruta)
+        return eliminados
+
+
+cache_drive = CacheDrive()
@@ -0,0 +1,217 @@
+import asyncio
+import threading
+import time
+from collections import deque
+
+
+TAMANO_COLA_SUSCRIPTOR = 256
+CAPACIDAD_COLA_COMANDOS = 512
+# Una cola sin comandos ni lectores durante este tiempo se elimina del registro.
+INACTIVIDAD_MAXIMA_COLA = 600
+INTERVALO_LIMPIEZA_COLAS = 60
+# Los comandos que todos los lectores ya recibieron, o más viejos que la ventana, dejan de ocupar la cola.
+VENTANA_COMANDOS = 10
+# Un lector (stream o página en polling) que no informa su posición en este tiempo deja de contar.
+LECTOR_INACTIVO = 30
+MAXIMO_LECTORES = 32
+
+PREFIJOS_COMPUESTOS = (
+    'start_draw', 'stop_draw', 'start_erase', 'stop_erase',
+    'start_move', 'stop_move', 'toggle_draw_mode', 'clear_drawings',
+)
+
+# Solo importa la última posición: se fusionan con el comando anterior del mismo tipo.
+TIPOS_COALESCIBLES = ('puntero', 'moving', 'zoom')
+# Al desbordar la cola solo se descartan posiciones, que el siguiente comando vuelve a enviar. Los trazos y la
+# navegación nunca se descartan: si no queda ninguna posición que sacar se rechaza el comando nuevo.
+TIPOS_DESCARTABLES = TIPOS_COALESCIBLES
+
+
+def tipo_comando(comando):
+    for prefijo in PREFIJOS_COMPUESTOS:
+        if comando.startswith(prefijo):
+            return prefijo
+    return comando.split('_', 1)[0]
+
+
+def _encolar(cola, evento):
+    if cola.full():
+        try:
+            cola.get_nowait()
+        except asyncio.QueueEmpty:
+            pass
+    cola.put_nowait(evento)
+
+
+class ColaComandos:
+    def __init__(self, capacidad=CAPACIDAD_COLA_COMANDOS, ventana=VENTANA_COMANDOS):
+        self.capacidad = capacidad
+        self.ventana = ventana
+        self._lock = threading.Lock()
+        # (llegada, evento): la llegada es monotónica y no viaja al cliente.
+        self._comandos = deque()
+        self._lectores = {}
+        self._seq = 0
+        self.ultima_actividad = time.monotonic()
+        self.recibidos = 0
+        self.coalescidos = 0
+        self.descartados = 0
+        self.rechazados = 0
+
+    def agregar(self, comando, timestamp):
+        tipo = tipo_comando(comando)
+
+        with self._lock:
+            ahora = time.monotonic()
+            self.ultima_actividad = ahora
+            self.recibidos += 1
+            self._recortar(ahora)
+            coalescible = tipo in TIPOS_COALESCIBLES and self._comandos and \
+                tipo_comando(self._comandos[-1][1]['comando']) == tipo
+            # Llena solo de comandos que algún lector todavía no recibió: aceptar uno más pisaría uno sin leer.
+            if not coalescible and len(self._comandos) >= self.capacidad and not self._liberar_espacio():
+                self.rechazados += 1
+                return None
+
+            self._seq += 1
+            evento = {
+                'seq': self._seq,
+                'comando': comando,
+                'timestamp': timestamp,
+            }
+
+            if coalescible:
+                self._comandos[-1] = (ahora, evento)
+                self.coalescidos += 1
+                return evento
+
+            self._comandos.append((ahora, evento))
+            return evento
+
+    def _recortar(self, ahora):
+        for lector, (_, visto) in list(self._lectores.items()):
+            if ahora - visto > LECTOR_INACTIVO:
+                del self._lectores[lector]
+        leido = min((seq for seq, _ in self._lectores.values()), default=None)
+        while self._comandos:
+            llegada, evento = self._comandos[0]
+            if not (leido is not None and evento['seq'] <= leido) and ahora - llegada < self.ventana:
+                break
+            self._comandos.popleft()
+
+    def _liberar_espacio(self):
+        for indice, (_, evento) in enumerate(self._comandos):
+            if tipo_comando(evento['comando']) in TIPOS_DESCARTABLES:
+                del self._comandos[indice]
+                self.descartados += 1
+                return True
+        return False
+
+    def confirmar(self, lector, seq):
+        # El lector ya recibió todo hasta seq.
+        with self._lock:
+            ahora = time.monotonic()
+            self.ultima_actividad = ahora
+            if lector in self._lectores or len(self._lectores) < MAXIMO_LECTORES:
+                self._lectores[lector] = (seq, ahora)
+
+    def soltar(self, lector):
+        with self._lock:
+            self._lectores.pop(lector, None)
+
+    def desde(self, seq, lector=None):
+        if lector is not None:
+            self.confirmar(lector, seq)
+        with self._lock:
+            self.ultima_actividad = time.monotonic()
+            nuevos = []
+            for _, evento in reversed(self._comandos):
+                if evento['seq'] <= seq:
+                    break
+                nuevos.append(evento)
+            nuevos.reverse()
+            return nuevos
+
+    @property
+    def ultimo_seq(self):
+        with self._lock:
+            return self._seq
+
+    def estadisticas(self):
+        with self._lock:
+            return {
+                'recibidos': self.recibidos,
+                'coalescidos': self.coalescidos,
+                'descartados': self.descartados,
+                'rechazados': self.rechazados,
+                'en_cola': len(self._comandos),
+                'lectores': len(self._lectores),
+                'capacidad': self.capacidad,
+                'ultimo_seq': self._seq,
+            }
+
+
+class RegistroColas:
+    def __init__(self, inactividad_maxima=INACTIVIDAD_MAXIMA_COLA):
+        self.inactividad_maxima = inactividad_maxima
+        self._lock = threading.Lock()
+        self._colas = {}
+        self._ultima_limpieza = time.monotonic()
+
+    def obtener(self, sesion, crear=True):
+        with self._lock:
+            self._limpiar()
+            cola = self._colas.get(sesion)
+            if cola is None and crear:
+                cola = ColaComandos()
+                self._colas[sesion] = cola
+            return cola
+
+    def _limpiar(self):
+        ahora = time.monotonic()
+        if ahora - self._ultima_limpieza < INTERVALO_LIMPIEZA_COLAS:
+            return
+        self._ultima_limpieza = ahora
+        for sesion, cola in list(self._colas.items()):
+            if ahora - cola.ultima_actividad > self.inactividad_maxima:
+                del self._colas[sesion]
+
+    def eliminar(self, sesion):
+        with self._lock:
+            self._colas.pop(sesion, None)
+
+
+class CanalComandos:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._suscriptores = set()
+
+    def suscribir(self, sesion):
+        loop = asyncio.get_running_loop()
+        suscripcion = (sesion, loop, asyncio.Queue(maxsize=TAMANO_COLA_SUSCRIPTOR))
+        with self._lock:
+            self._suscriptores.add(suscripcion)
+        return suscripcion
+
+    def desuscribir(self, suscripcion):
+        with self._lock:
+            self._suscriptores.discard(suscripcion)
+
+    def numero_suscriptores(self):
+        with self._lock:
+            return len(self._suscriptores)
+
+    def publicar(self, sesion, evento):
+        with self._lock:
+            suscriptores = [s for s in self._suscriptores if s[0] == sesion]
+
+        for suscripcion in suscriptores:
+            _, loop, cola = suscripcion
+            try:
+                loop.call_soon_threadsafe(_encolar, cola, evento)
+            except RuntimeError:
+                self.desuscribir(suscripcion)
+
+
+colas_comandos = RegistroColas()
+canal_comandos = CanalComandos()
@@ -0,0 +1,103 @@
+import numpy as np
+
+
+MUNECA = 0
+PULGAR_MCP, PULGAR_IP, PULGAR_TIP = 2, 3, 4
+INDICE_MCP, INDICE_TIP = 5, 8
+MEDIO_MCP, MEDIO_TIP = 9, 12
+ANULAR_TIP = 16
+MENIQUE_TIP = 20
+
+# Índice, medio, anular y meñique.
+TIPS = np.array([8, 12, 16, 20])
+PIPS = np.array([6, 10, 14, 18])
+MCPS = np.array([5, 9, 13, 17])
+# Pulgar, índice, medio, anular y meñique.
+TODAS_LAS_PUNTAS = np.array([4, 8, 12, 16, 20])
+
+SIN_MANOS = np.zeros((0, 21, 3), dtype=np.float32)
+
+TOLERANCIAS_POR_DEFECTO = {
+    'pulgar_pistola': 0.05,
+    'direccion_pistola': 0.015,
+    'puno': 0.035,
+    'paz': 0.04,
+    'cuernos': 0.04,
+    'pinza_px': 30,
+}
+
+
+def landmarks_a_array(multi_hand_landmarks):
+    if not multi_hand_landmarks:
+        return SIN_MANOS
+    return np.array(
+        [[(p.x, p.y, p.z) for p in mano.landmark] for mano in multi_hand_landmarks],
+        dtype=np.float32
+    )
+
+
+class GestosFrame:
+    def __init__(self, manos, ancho_frame, alto_frame, tolerancias=None):
+        t = dict(TOLERANCIAS_POR_DEFECTO, **(tolerancias or {}))
+        self.manos = manos
+        self.num_manos = len(manos)
+
+        x = manos[:, :, 0]
+        y = manos[:, :, 1]
+
+        # Positivo = punta por debajo de la articulación (dedo doblado).
+        tip_pip = y[:, TIPS] - y[:, PIPS]
+        tip_mcp = y[:, TIPS] - y[:, MCPS]
+        pulgar_dx = np.abs(x[:, PULGAR_TIP] - x[:, PULGAR_IP])
+
+        escala = np.array([ancho_frame, alto_frame], dtype=np.float32)
+        puntas_px = manos[:, TODAS_LAS_PUNTAS, :2] * escala
+        self.distancias_puntas = np.linalg.norm(puntas_px[:, :, None, :] - puntas_px[:, None, :, :], axis=-1)
+
+        self.dedos_extendidos = (pulgar_dx > 0.04).astype(np.int8) + np.sum(tip_mcp < 0, axis=1)
+
+        self.paz = (
+            (tip_pip[:, 0] < -0.03) & (tip_pip[:, 1] < -0.03)
+            & (np.abs(x[:, INDICE_TIP] - x[:, MEDIO_TIP]) > t['paz'] * 1.3)
+            & (tip_pip[:, 2] > 0.01) & (tip_pip[:, 3] > 0.01)
+            & (pulgar_dx < t['paz'] * 1.5)
+        )
+
+        self.cuernos = (
+            (tip_pip[:, 0] < -0.025) & (tip_pip[:, 3] < -0.025)
+            & (tip_pip[:, 1] > 0) & (tip_pip[:, 2] > 0)
+            & (y[:, INDICE_TIP] < y[:, MEDIO_TIP] - 0.02)
+            & (y[:, MENIQUE_TIP] < y[:, ANULAR_TIP] - 0.02)
+        )
+
+        self.mano_abierta = ((pulgar_dx > 0.025).astype(np.int8) + np.sum(tip_pip < -0.01, axis=1)) >= 4
+
+        pistola = (
+            (y[:, INDICE_TIP] < y[:, INDICE_MCP])
+            & (np.abs(x[:, PULGAR_TIP] - x[:, PULGAR_MCP]) > t['pulgar_pistola'])
+            & np.all(tip_pip[:, 1:] > 0, axis=1)
+        )
+        direccion = x[:, INDICE_TIP] - x[:, INDICE_MCP]
+        self.pistola_derecha = pistola & (direccion > t['direccion_pistola'])
+        self.pistola_izquierda = pistola & (direccion < -t['direccion_pistola'])
+
+        self.puno = np.all(tip_pip > 0, axis=1) & (pulgar_dx < t['puno'])
+
+        self.pulgar_arriba = (
+            (y[:, PULGAR_TIP] < y[:, MUNECA] - 0.1)
+            & np.all(y[:, PULGAR_TIP, None] < y[:, TIPS] - 0.05, axis=1)
+            & (y[:, MUNECA] > y[:, MEDIO_MCP])
+            & np.all(tip_pip > 0.02, axis=1)
+        )
+
+        self.pinza = self.distancias_puntas[:, 0, 1] < t['pinza_px']
+
+        self.puntero = (manos[:, MUNECA, :2] + manos[:, MEDIO_MCP, :2]) / 2
+        self.indice = manos[:, INDICE_TIP, :2]
+        self.pulgares_px = manos[:, PULGAR_TIP, :2] * escala
+
+    def manos_abiertas(self):
+        return int(np.sum(self.dedos_extendidos >= 3))
+
+    def distancia_pulgares(self):
+        return float(np.linalg.norm(self.pulgares_px[0] - self.pulgares_px[1]))
@@ -0,0 +1,185 @@
+import logging
+import os
+import shutil
+import socket
+import time
+import traceback
+import uuid
+from datetime import timedelta
+
+from django.conf import settings
+from django.db.models import F
+from django.utils import timezone
+
+from .models import Trabajo
+
+logger = logging.getLogger(__name__)
+
+MAX_INTENTOS = getattr(settings, 'TRABAJOS_MAX_INTENTOS', 5)
+RETRASO_BASE = getattr(settings, 'TRABAJOS_RETRASO_BASE', 5)
+RETRASO_MAXIMO = getattr(settings, 'TRABAJOS_RETRASO_MAXIMO', 600)
+TIEMPO_ABANDONO = getattr(settings, 'TRABAJOS_TIEMPO_ABANDONO', 1800)
+DIRECTORIO_PENDIENTES = os.path.join(settings.MEDIA_ROOT, 'trabajos')
+ESTADOS_ACTIVOS = ('pendiente', 'en_proceso')
+
+_manejadores = {}
+
+
+def manejador(tipo, al_fallar=None):
+    def registrar(funcion):
+        _manejadores[tipo] = (funcion, al_fallar)
+        return funcion
+    return registrar
+
+
+def nombre_trabajador():
+    return f"{socket.gethostname()}-{os.getpid()}"
+
+
+def encolar(tipo, presentacion=None, datos=None, max_intentos=MAX_INTENTOS, retraso=0):
+    return Trabajo.objects.create(
+        tipo=tipo,
+        presentacion=presentacion,
+        datos=datos or {},
+        max_intentos=max_intentos,
+        ejecutar_despues=timezone.now() + timedelta(seconds=retraso),
+    )
+
+
+def trabajo_activo(tipo, presentacion):
+    return Trabajo.objects.filter(tipo=tipo, presentacion=presentacion, estado__in=ESTADOS_ACTIVOS).exists()
+
+
+def guardar_archivo_pendiente(ruta):
+    # La petición que encola borra sus temporales al terminar; el trabajo necesita su propia copia.
+    os.makedirs(DIRECTORIO_PENDIENTES, exist_ok=True)
+    destino = os.path.join(DIRECTORIO_PENDIENTES, f"{uuid.uuid4().hex}{os.path.splitext(ruta)[1].lower()}")
+    shutil.copyfile(ruta, destino)
+    return destino
+
+
+def liberar_archivo_pendiente(ruta, excluir=None):
+    if not ruta or os.path.dirname(os.path.abspath(ruta)) != os.path.abspath(DIRECTORIO_PENDIENTES):
+        return False
+    en_uso = Trabajo.objects.filter(estado__in=ESTADOS_ACTIVOS, datos__ruta=ruta)
+    if excluir is not None:
+        en_uso = en_uso.exclude(id=excluir.id)
+    if en_uso.exists():
+        return False
+    try:
+        os.remove(ruta)
+    except FileNotFoundError:
+        pass
+    return True
+
+
+def tomar_trabajo(trabajador=None, tipos=None):
+    trabajador = trabajador or nombre_trabajador()
+    ahora = timezone.now()
+    candidatos = Trabajo.objects.filter(estado='pendiente', ejecutar_despues__lte=ahora)
+    if tipos:
+        candidatos = candidatos.filter(tipo__in=tipos)
+
+    for trabajo_id in candidatos.order_by('ejecutar_despues', 'id').values_list('id', flat=True)[:10]:
+        # El UPDATE condicionado al estado es el que reparte: si otro trabajador ganó, afecta 0 filas.
+        tomado = Trabajo.objects.filter(id=trabajo_id, estado='pendiente').update(
+            estado='en_proceso',
+            trabajador=trabajador,
+            fecha_inicio=ahora,
+            intentos=F('intentos') + 1,
+        )
+        if tomado:
+            return Trabajo.objects.select_related('presentacion').get(id=trabajo_id)
+    return None
+
+
+def retraso_reintento(intentos):
+    return min(RETRASO_MAXIMO, RETRASO_BASE * 2 ** max(0, intentos - 1))
+
+
+def ejecutar(trabajo):
+    funcion, al_fallar = _manejadores.get(trabajo.tipo, (None, None))
+    try:
+        if funcion is None:
+            raise LookupError(f"No hay un manejador registrado para '{trabajo.tipo}'")
+        funcion(trabajo)
+    except Exception as e:
+        trabajo.error = f"{e}\n{traceback.format_exc()}"[-4000:]
+        if funcion is None or trabajo.intentos >= trabajo.max_intentos:
+            trabajo.estado = 'fallido'
+            trabajo.fecha_fin = timezone.now()
+            trabajo.save(update_fields=['estado', 'error', 'fecha_fin'])
+            logger.error(f"Trabajo {trabajo} fallido tras {trabajo.intentos} intentos: {e}")
+            if al_fallar:
+                try:
+                    al_fallar(trabajo)
+                except Exception as error_final:
+                    logger.error(f"Error limpiando el trabajo {trabajo}: {error_final}")
+        else:
+            retraso = retraso_reintento(trabajo.intentos)
+            trabajo.estado = 'pendiente'
+            trabajo.ejecutar_despues = timezone.now() + timedelta(seconds=retraso)
+            trabajo.save(update_fields=['estado', 'error', 'ejecutar_despues'])
+            logger.warning(f"Trabajo {trabajo} falló (intento {trabajo.intentos}), reintento en {retraso} s: {e}")
+        return False
+
+    trabajo.estado = 'completado'
+    trabajo.error = ''
+    trabajo.fecha_fin = timezone.now()
+    trabajo.save(update_fields=['estado', 'error', 'fecha_fin'])
+    return True
+
+
+def recuperar_abandonados(tiempo=TIEMPO_ABANDONO):
+    # Un trabajador que murió a mitad de un trabajo lo deja en_proceso para siempre.
+    limite = timezone.now() - timedelta(seconds=tiempo)
+    return Trabajo.objects.filter(estado='en_proceso', fecha_inicio__lt=limite).update(
+        estado='pendiente', ejecutar_despues=timezone.now(), trabajador=''
+    )
+
+
+def limpiar_pendientes(antiguedad=86400):
+    if not os.path.isdir(DIRECTORIO_PENDIENTES):
+        return 0
+    eliminados = 0
+    limite = time.time() - antiguedad
+    for nombre in os.listdir(DIRECTORIO_PENDIENTES):
+        ruta = os.path.join(DIRECTORIO_PENDIENTES, nombre)
+        try:
+            if os.path.getmtime(ruta) < limite and liberar_archivo_pendiente(ruta):
+                eliminados += 1
+        except OSError:
+            continue
+    return eliminados
+
+
+def _percentil(valores, fraccion):
+    if not valores:
+        return None
+    valores = sorted(valores)
+    return valores[int(fraccion * (len(valores) - 1))]
+
+
+def estadisticas(muestra=200):
+    ahora = timezone.now()
+    por_estado = dict.fromkeys(dict(Trabajo.ESTADO_CHOICES), 0)
+    for estado in Trabajo.objects.values_list('estado', flat=True):
+        por_estado[estado] += 1
+
+    listos = Trabajo.objects.filter(estado='pendiente', ejecutar_despues__lte=ahora)
+    mas_antiguo = listos.order_by('fecha_creacion').values_list('fecha_creacion', flat=True).first()
+
+    recientes = Trabajo.objects.filter(estado='completado', fecha_inicio__isnull=False, fecha_fin__isnull=False) \
+        .order_by('-fecha_fin').values_list('fecha_creacion', 'fecha_inicio', 'fecha_fin')[:muestra]
+    esperas = [(inicio - creacion).total_seconds() for creacion, inicio, _ in recientes]
+    duraciones = [(fin - inicio).total_seconds() for _, inicio, fin in recientes]
+
+    return {
+        'por_estado': por_estado,
+        'profundidad': listos.count(),
+        'espera_mas_antigua_s': (ahora - mas_antiguo).total_seconds() if mas_antiguo else 0.0,
+        'espera_media_s': sum(esperas) / len(esperas) if esperas else None,
+        'espera_p95_s': _percentil(esperas, 0.95),
+        'duracion_media_s': sum(duraciones) / len(duraciones) if duraciones else None,
+        'duracion_p95_s': _percentil(duraciones, 0.95),
+    }
@@ -0,0 +1,122 @@
+import json
+import logging
+import os
+import threading
+import time
+
+from django.conf import settings
+
+from .cache_drive import cache_drive, hash_clave
+from .google_drive_oauth import sesion_drive
+from .servir_archivos import hash_contenido
+
+logger = logging.getLogger(__name__)
+
+TAMANO_FRAGMENTO = getattr(settings, 'DRIVE_DESCARGA_FRAGMENTO_MB', 8) * 1024 * 1024
+TAMANO_BLOQUE = 1024 * 1024
+TIMEOUT_FRAGMENTO = 60
+INTERVALO_PROGRESO = 0.25
+
+_lock = threading.Lock()
+_descargas_activas = set()
+
+
+def descargar_a_archivo(archivo, request_drive, inicio=0, progreso=None, tamano_fragmento=TAMANO_FRAGMENTO,
+                        sesion=None):
+    # De la petición de la API solo se usan la URL y las cabeceras: cada fragmento es un GET con su propio Range
+    # hecho con una sesión autorizada, así una descarga parcial continúa desde inicio.
+    sesion = sesion or sesion_drive()
+    posicion, total = inicio, None
+    while total is None or posicion < total:
+        cabeceras = dict(request_drive.headers)
+        cabeceras['Range'] = f"bytes={posicion}-{posicion + tamano_fragmento - 1}"
+        with sesion.get(request_drive.uri, headers=cabeceras, stream=True, timeout=TIMEOUT_FRAGMENTO) as respuesta:
+            if respuesta.status_code == 416 and posicion:
+                # El parcial ya tenía el archivo completo.
+                break
+            respuesta.raise_for_status()
+
+            if respuesta.status_code == 206:
+                rango_total = respuesta.headers.get('Content-Range', '').rpartition('/')[2]
+                if rango_total.isdigit():
+                    total = int(rango_total)
+            else:
+                # Sin soporte de rangos (p. ej. exportaciones) llega el archivo entero desde el principio.
+                archivo.seek(0)
+                archivo.truncate()
+                posicion = 0
+
+            recibidos = 0
+            for bloque in respuesta.iter_content(TAMANO_BLOQUE):
+                archivo.write(bloque)
+                recibidos += len(bloque)
+            posicion += recibidos
+            if respuesta.status_code != 206 or not recibidos or (total is None and recibidos < tamano_fragmento):
+                total = posicion
+        if progreso:
+            progreso(posicion, total)
+
+
+def _ruta_progreso(drive_id):
+    return os.path.join(cache_drive.directorio, 'descargas', f"{hash_clave(drive_id)}.json")
+
+
+def leer_progreso(drive_id):
+    try:
+        with open(_ruta_progreso(drive_id), encoding='utf-8') as archivo:
+            return json.load(archivo)
+    except (OSError, ValueError):
+        return None
+
+
+def _escribir_progreso(drive_id, **datos):
+    ruta = _ruta_progreso(drive_id)
+    os.makedirs(os.path.dirname(ruta), exist_ok=True)
+    temporal = f"{ruta}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(temporal, 'w', encoding='utf-8') as archivo:
+        json.dump(datos, archivo)
+    os.replace(temporal, ruta)
+
+
+def iniciar_descarga(drive_id, version, extension, request_drive, reanudable):
+    with _lock:
+        if drive_id in _descargas_activas:
+            return False
+        _descargas_activas.add(drive_id)
+
+    _escribir_progreso(drive_id, estado='descargando', version=version, descargados=0, total=None)
+    hilo = threading.Thread(
+        target=_descargar,
+        args=(drive_id, version, extension, request_drive, reanudable),
+        name=f'descarga-drive-{drive_id}',
+        daemon=True
+    )
+    hilo.start()
+    return True
+
+
+def _descargar(drive_id, version, extension, request_drive, reanudable):
+    ultimo_reporte = [0.0]
+
+    def progreso(descargados, total):
+        ahora = time.monotonic()
+        if ahora - ultimo_reporte[0] >= INTERVALO_PROGRESO:
+            ultimo_reporte[0] = ahora
+            _escribir_progreso(drive_id, estado='descargando', version=version,
+                               descargados=descargados, total=total)
+
+    def descargar(archivo, inicio):
+        descargar_a_archivo(archivo, request_drive, inicio if reanudable else 0, progreso)
+
+    try:
+        ruta, _ = cache_drive.obtener(drive_id, version, extension, descargar, reanudable=reanudable)
+        tamano = os.path.getsize(ruta)
+        # Se calcula el ETag aquí para que la primera petición de rango no espere por el hash.
+        hash_contenido(ruta)
+        _escribir_progreso(drive_id, estado='lista', version=version, descargados=tamano, total=tamano)
+    except Exception as e:
+        logger.error(f"Error descargando {drive_id} de Drive: {e}")
+        _escribir_progreso(drive_id, estado='error', version=version, error=str(e))
+    finally:
+        with _lock:
+            _descargas_activas.discard(drive_id)
@@ -0,0 +1,90 @@
+import numpy as np
+
+
+SUAVIZADO_VELOCIDAD = 0.5
+MARGEN_PRESUPUESTO = 1.1
+MARGEN_REDUCCION = 0.6
+SUAVIZADO_INFERENCIA = 0.2
+
+
+class PredictorVelocidadConstante:
+    def __init__(self, suavizado=SUAVIZADO_VELOCIDAD):
+        self.suavizado = suavizado
+        self._posicion = None
+        self._velocidad = None
+        self._tiempo = None
+
+    def actualizar(self, manos, tiempo):
+        if not len(manos) or self._posicion is None or self._posicion.shape != manos.shape:
+            self._posicion = manos.copy() if len(manos) else None
+            self._velocidad = np.zeros_like(manos) if len(manos) else None
+            self._tiempo = tiempo
+            return
+
+        dt = tiempo - self._tiempo
+        if dt > 0:
+            velocidad = (manos - self._posicion) / dt
+            self._velocidad = self.suavizado * velocidad + (1 - self.suavizado) * self._velocidad
+        self._posicion = manos.copy()
+        self._tiempo = tiempo
+
+    def predecir(self, tiempo):
+        if self._posicion is None:
+            return None
+        prediccion = self._posicion + self._velocidad * (tiempo - self._tiempo)
+        np.clip(prediccion[:, :, :2], 0.0, 1.0, out=prediccion[:, :, :2])
+        return prediccion
+
+    def reiniciar(self):
+        self._posicion = None
+        self._velocidad = None
+        self._tiempo = None
+
+
+class ControlZancada:
+    def __init__(self, zancada=1, zancada_maxima=3, presupuesto=1 / 30, adaptativa=True):
+        self.zancada_base = max(1, zancada)
+        self.zancada = self.zancada_base
+        self.zancada_maxima = max(self.zancada_base, zancada_maxima)
+        self.presupuesto = presupuesto
+        self.adaptativa = adaptativa
+
+        self._frames_sin_inferir = 0
+        self._tiempo_inferencia = None
+        self.inferidos = 0
+        self.interpolados = 0
+
+    def debe_inferir(self, gesto_continuo):
+        if not gesto_continuo or self._frames_sin_inferir + 1 >= self.zancada:
+            self._frames_sin_inferir = 0
+            return True
+        self._frames_sin_inferir += 1
+        return False
+
+    def registrar_inferencia(self, duracion):
+        self.inferidos += 1
+        if self._tiempo_inferencia is None:
+            self._tiempo_inferencia = duracion
+        else:
+            self._tiempo_inferencia += SUAVIZADO_INFERENCIA * (duracion - self._tiempo_inferencia)
+
+        if not self.adaptativa:
+            return
+        # Una inferencia debe caber en el tiempo de los frames que cubre la zancada.
+        if self._tiempo_inferencia > self.presupuesto * self.zancada * MARGEN_PRESUPUESTO \
+                and self.zancada < self.zancada_maxima:
+            self.zancada += 1
+        elif self.zancada > self.zancada_base \
+                and self._tiempo_inferencia < self.presupuesto * (self.zancada - 1) * MARGEN_REDUCCION:
+            self.zancada -= 1
+
+    def registrar_interpolacion(self):
+        self.interpolados += 1
+
+    def estadisticas(self):
+        return {
+            'zancada': self.zancada,
+            'inferidos': self.inferidos,
+            'interpolados': self.interpolados,
+            'inferencia_ms': (self._tiempo_inferencia or 0.0) * 1000,
+        }
@@ -0,0 +1,137 @@
+import json
+import os
+
+import cv2
+import numpy as np
+
+from .clasificador_gestos import SIN_MANOS
+
+
+EXTENSIONES_IMAGEN = ('.png', '.jpg', '.jpeg', '.bmp', '.webp')
+FPS_POR_DEFECTO = 30.0
+
+
+class FuenteCamara:
+    en_vivo = True
+    espejar = True
+
+    def __init__(self, indice):
+        self.cap = cv2.VideoCapture(indice)
+        self.fps = FPS_POR_DEFECTO
+
+    def isOpened(self):
+        return self.cap.isOpened()
+
+    def leer(self, destino=None):
+        ret, frame = self.cap.read() if destino is None else self.cap.read(destino)
+        return ret, frame, None, None
+
+    def release(self):
+        self.cap.release()
+
+
+class FuenteVideo(FuenteCamara):
+    en_vivo = False
+
+    def __init__(self, ruta):
+        self.cap = cv2.VideoCapture(ruta)
+        self.fps = self.cap.get(cv2.CAP_PROP_FPS) or FPS_POR_DEFECTO
+        self.indice = 0
+
+    def leer(self, destino=None):
+        ret, frame = self.cap.read() if destino is None else self.cap.read(destino)
+        tiempo = self.indice / self.fps
+        self.indice += 1
+        return ret, frame, None, tiempo
+
+
+class FuenteImagenes:
+    en_vivo = False
+    espejar = True
+
+    def __init__(self, directorio, fps=FPS_POR_DEFECTO):
+        self.fps = fps
+        self.rutas = sorted(
+            os.path.join(directorio, nombre)
+            for nombre in os.listdir(directorio)
+            if nombre.lower().endswith(EXTENSIONES_IMAGEN)
+        )
+        self.indice = 0
+
+    def isOpened(self):
+        return self.indice < len(self.rutas)
+
+    def leer(self, destino=None):
+        if self.indice >= len(self.rutas):
+            return False, None, None, None
+        frame = cv2.imread(self.rutas[self.indice])
+        tiempo = self.indice / self.fps
+        self.indice += 1
+        return frame is not None, frame, None, tiempo
+
+    def release(self):
+        self.indice = len(self.rutas)
+
+
+class FuenteLandmarks:
+    en_vivo = False
+    espejar = False
+
+    def __init__(self, ruta, fps=FPS_POR_DEFECTO):
+        self.fps = fps
+        self.archivo = open(ruta, encoding='utf-8')
+        self.indice = 0
+
+    def isOpened(self):
+        return not self.archivo.closed
+
+    def leer(self, destino=None):
+        for linea in self.archivo:
+            linea = linea.strip()
+            if not linea:
+                continue
+            registro = json.loads(linea)
+            forma = (registro.get('alto', 480), registro.get('ancho', 640), 3)
+            if destino is not None and destino.shape == forma:
+                # El HUD del frame anterior se borra sobre el mismo buffer.
+                frame = destino
+                frame.fill(0)
+            else:
+                frame = np.zeros(forma, dtype=np.uint8)
+            tiempo = registro.get('t', self.indice / self.fps)
+            self.indice += 1
+            manos = np.array(registro['manos'], dtype=np.float32) if registro.get('manos') else SIN_MANOS
+            return True, frame, manos, tiempo
+        return False, None, None, None
+
+    def release(self):
+        self.archivo.close()
+
+
+def abrir_fuente(source, fps=FPS_POR_DEFECTO):
+    if source.isdigit():
+        return FuenteCamara(int(source))
+    if os.path.isdir(source):
+        return FuenteImagenes(source, fps)
+    if source.endswith('.jsonl'):
+        return FuenteLandmarks(source, fps)
+    return FuenteVideo(source)
+
+
+class GrabadorSesion:
+    def __init__(self, ruta):
+        self.archivo = open(ruta, 'w', encoding='utf-8')
+
+    def escribir(self, indice, tiempo, frame, manos, comandos):
+        alto, ancho = frame.shape[:2]
+        self.archivo.write(json.dumps({
+            'frame': indice,
+            't': round(tiempo, 4),
+            'ancho': ancho,
+            'alto': alto,
+            'manos': np.round(manos, 5).tolist(),
+            'comandos': comandos,
+        }) + '\n')
+
+    def cerrar(self):
+        self.archivo.close()
@@ -1,11 +1,12 @@
 import os
 import pickle
 import logging
-from googleapiclient.discovery import build
-from googleapiclient.http import MediaFileUpload
-from google_auth_oauthlib.flow import InstalledAppFlow
-from google.auth.transport.requests import Request
-from google.auth.exceptions import RefreshError
+import threading
+import time
+from contextvars import ContextVar
+from datetime import datetime, timedelta
+
+from .cache_drive import bloqueo_archivo
 
 logger = logging.getLogger(__name__)
 
@@ -14,42 +15,153 @@ SCOPES = ['https://www.googleapis.com/auth/drive.file']
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 CREDENTIALS_FILE = os.path.join(BASE_DIR, 'config', 'oauth.json')
 TOKEN_FILE = os.path.join(BASE_DIR, 'config', 'token.pickle')
+# El token se renueva con este margen para que no caduque a mitad de una subida o descarga.
+MARGEN_REFRESCO = timedelta(minutes=5)
+PARENT_FOLDER_ID = '1E4I8mIp6PAUaJdXIax9rplVBmdS3sbGR'
+DIRECTORIO_BLOQUEOS = os.path.join(BASE_DIR, 'config')
+
+_lock = threading.Lock()
+_lock_carpetas = threading.Lock()
+_credenciales = None
+_generacion = 0
+_hilo = threading.local()
+_tiempos = ContextVar('tiempos_drive', default=None)
+
+
+def iniciar_medicion():
+    tiempos = {'auth': 0.0, 'discovery': 0.0, 'llamadas_evitadas': 0}
+    _tiempos.set(tiempos)
+    return tiempos
+
+
+def contar(clave):
+    tiempos = _tiempos.get()
+    if tiempos is not None:
+        tiempos[clave] += 1
+
+
+def _medir(clave, inicio):
+    tiempos = _tiempos.get()
+    if tiempos is not None:
+        tiempos[clave] += time.perf_counter() - inicio
+
+
+def _por_caducar(creds):
+    if not creds.valid:
+        return True
+    # expiry de google-auth es un datetime UTC sin zona horaria.
+    return creds.expiry is not None and creds.expiry - datetime.utcnow() < MARGEN_REFRESCO
+
+
+def _obtener_credenciales():
+    global _credenciales, _generacion
+    inicio = time.perf_counter()
+    from google.auth.transport.requests import Request
+    from google_auth_oauthlib.flow import InstalledAppFlow
+
+    try:
+        with _lock:
+            creds = _credenciales
+            if creds is None and os.path.exists(TOKEN_FILE):
+                with open(TOKEN_FILE, 'rb') as token:
+                    creds = pickle.load(token)
+
+            if creds is None or _por_caducar(creds):
+                if creds and creds.refresh_token:
+                    creds.refresh(Request())
+                else:
+                    logger.info("Abriendo navegador para autenticación OAuth con Google Drive...")
+                    flow = InstalledAppFlow.from_client_secrets_file(CREDENTIALS_FILE, SCOPES)
+                    creds = flow.run_local_server(port=0)
+
+                with open(TOKEN_FILE, 'wb') as token:
+                    pickle.dump(creds, token)
+
+            if creds is not _credenciales:
+                _credenciales = creds
+                _generacion += 1
+            return creds, _generacion
+    finally:
+        _medir('auth', inicio)
+
+
+def construir_servicio(credentials, nombre='drive', version='v3'):
+    inicio = time.perf_counter()
+    try:
+        from googleapiclient.discovery import build
+        # static_discovery usa el documento incluido en la librería en lugar de descargarlo.
+        return build(nombre, version, credentials=credentials, static_discovery=True, cache_discovery=False)
+    finally:
+        _medir('discovery', inicio)
 
 
 def get_drive_service():
-    creds = None
+    creds, generacion = _obtener_credenciales()
 
-    if os.path.exists(TOKEN_FILE):
-        with open(TOKEN_FILE, 'rb') as token:
-            creds = pickle.load(token)
+    # httplib2 no es seguro entre hilos: cada hilo reutiliza su propio servicio y su conexión.
+    if getattr(_hilo, 'generacion', None) != generacion:
+        _hilo.service = construir_servicio(creds)
+        _hilo.generacion = generacion
+    return _hilo.service
 
-    if not creds or not creds.valid:
-        if creds and creds.expired and creds.refresh_token:
-            creds.refresh(Request())
-        else:
-            logger.info("Abriendo navegador para autenticación OAuth con Google Drive...")
-            flow = InstalledAppFlow.from_client_secrets_file(CREDENTIALS_FILE, SCOPES)
-            creds = flow.run_local_server(port=0)
 
-        with open(TOKEN_FILE, 'wb') as token:
-            pickle.dump(creds, token)
+def sesion_drive():
+    # Sesión HTTP autorizada (requests) para descargas por rangos; también una por hilo.
+    creds, generacion = _obtener_credenciales()
+    if getattr(_hilo, 'generacion_sesion', None) != generacion:
+        from google.auth.transport.requests import AuthorizedSession
+        _hilo.sesion = AuthorizedSession(creds)
+        _hilo.generacion_sesion = generacion
+    return _hilo.sesion
+
+
+def invalidar_credenciales():
+    global _credenciales, _generacion
+    with _lock:
+        _credenciales = None
+        _generacion += 1
+        if os.path.exists(TOKEN_FILE):
+            os.remove(TOKEN_FILE)
+
+
+def carpeta_no_encontrada(error):
+    from googleapiclient.errors import HttpError
+
+    return isinstance(error, HttpError) and error.resp.status == 404
 
-    service = build('drive', 'v3', credentials=creds)
-    return service
 
+def get_or_create_user_folder(user, revalidar=False):
+    # El ID de la carpeta se guarda en el usuario y se confía en él hasta que Drive responda 404.
+    if user.drive_folder_id and not revalidar:
+        contar('llamadas_evitadas')
+        return user.drive_folder_id
+
+    # Bloqueo entre hilos y procesos: dos primeras subidas simultáneas no deben crear dos carpetas.
+    with _lock_carpetas, bloqueo_archivo(os.path.join(DIRECTORIO_BLOQUEOS, f'.carpeta-{user.pk}.lock')):
+        carpeta_anterior = user.drive_folder_id
+        user.refresh_from_db(fields=['drive_folder_id'])
+        if user.drive_folder_id and user.drive_folder_id != carpeta_anterior:
+            # Otro proceso la resolvió mientras se esperaba el bloqueo.
+            contar('llamadas_evitadas')
+            return user.drive_folder_id
+
+        folder_id = _buscar_o_crear_carpeta(user)
+        if folder_id:
+            user.drive_folder_id = folder_id
+            user.save(update_fields=['drive_folder_id'])
+        return folder_id
+
+
+def _buscar_o_crear_carpeta(user):
+    from google.auth.exceptions import RefreshError
 
-def get_or_create_user_folder(user):
     try:
         service = get_drive_service()
     except RefreshError:
-        import os
-        if os.path.exists('token.json'):
-            os.remove('token.json')
+        invalidar_credenciales()
         print("Token inválido. Por favor, vuelve a autenticarte.")
         service = get_drive_service()
 
-    PARENT_FOLDER_ID = '1E4I8mIp6PAUaJdXIax9rplVBmdS3sbGR'
-
     user_folder_name = user.username
     try:
         query = f"name = '{user_folder_name}' and '{PARENT_FOLDER_ID}' in parents and mimeType = 'application/vnd.google-apps.folder' and trashed = false"
@@ -76,15 +188,17 @@ def get_or_create_user_folder(user):
 
 
 def upload_to_drive(filepath, filename, folder_id):
+    from google.auth.exceptions import RefreshError
+
     try:
         service = get_drive_service()
     except RefreshError:
-        import os
-        if os.path.exists('token.json'):
-            os.remove('token.json')
+        invalidar_credenciales()
         print("Token inválido. Por favor, vuelve a autenticarte.")
         service = get_drive_service()
 
+    from googleapiclient.http import MediaFileUpload
+
     file_metadata = {'name': filename, 'parents': [folder_id]}
     media = MediaFileUpload(filepath, resumable=True)
 
@@ -1,11 +1,13 @@
 import os
 import json
-from google.oauth2.credentials import Credentials
-from google_auth_oauthlib.flow import Flow
-from googleapiclient.discovery import build
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from django.conf import settings
+from .google_drive_oauth import construir_servicio
 
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 OAUTH2_CREDENTIALS_FILE = os.path.join(BASE_DIR, 'config', 'oauth2.json')
+HILOS_IMPORTACION = getattr(settings, 'IMPORTACION_HILOS', 8)
 
 SCOPES = [
     'https://www.googleapis.com/auth/presentations.readonly',
@@ -17,6 +19,8 @@ def get_oauth_flow(redirect_uri):
     if not os.path.exists(OAUTH2_CREDENTIALS_FILE):
         raise FileNotFoundError(f"No se encuentra el archivo {OAUTH2_CREDENTIALS_FILE}")
     
+    from google_auth_oauthlib.flow import Flow
+    
     flow = Flow.from_client_secrets_file(
         OAUTH2_CREDENTIALS_FILE,
         scopes=SCOPES,
@@ -52,8 +56,10 @@ def get_credentials_from_code(code, state, redirect_uri):
     }
 
 
-def get_user_presentations(credentials_dict):
-    credentials = Credentials(
+def credenciales_desde_dict(credentials_dict):
+    from google.oauth2.credentials import Credentials
+
+    return Credentials(
         token=credentials_dict['token'],
         refresh_token=credentials_dict.get('refresh_token'),
         token_uri=credentials_dict['token_uri'],
@@ -61,32 +67,17 @@ def get_user_presentations(credentials_dict):
         client_secret=credentials_dict['client_secret'],
         scopes=credentials_dict['scopes']
     )
-    
-    drive_service = build('drive', 'v3', credentials=credentials)
-    
-    results = drive_service.files().list(
-        q="mimeType='application/vnd.google-apps.presentation' and trashed=false",
-        pageSize=100,
-        fields="files(id, name, webViewLink, thumbnailLink, createdTime, modifiedTime)",
-        orderBy="modifiedTime desc"
-    ).execute()
-    
-    presentations = results.get('files', [])
-    
-    return presentations
 
 
-def copy_presentation_to_drive(presentation_id, destination_folder_id, credentials_dict):
-    credentials = Credentials(
-        token=credentials_dict['token'],
-        refresh_token=credentials_dict.get('refresh_token'),
-        token_uri=credentials_dict['token_uri'],
-        client_id=credentials_dict['client_id'],
-        client_secret=credentials_dict['client_secret'],
-        scopes=credentials_dict['scopes']
-    )
-    
-    drive_service = build('drive', 'v3', credentials=credentials)
+def get_account_id(credentials_dict):
+    drive_service = construir_servicio(credenciales_desde_dict(credentials_dict))
+    about = drive_service.about().get(fields='user(permissionId)').execute()
+    return about['user']['permissionId']
+
+
+def copy_presentation_to_drive(presentation_id, destination_folder_id, credentials_dict, drive_service=None):
+    if drive_service is None:
+        drive_service = construir_servicio(credenciales_desde_dict(credentials_dict))
     
     copied_file = drive_service.files().copy(
         fileId=presentation_id,
@@ -97,4 +88,26 @@ def copy_presentation_to_drive(presentation_id, destination_folder_id, credentia
         'id': copied_file['id'],
         'name': copied_file['name'],
         'webView': f"https://docs.google.com/presentation/d/{copied_file['id']}/edit"
-    }
\ No newline at end of file
+    }
+
+
+def copy_presentations_to_drive(presentation_ids, destination_folder_id, credentials_dict, max_hilos=HILOS_IMPORTACION):
+    # Cada hilo crea un único cliente (httplib2 no es seguro entre hilos) y lo reutiliza en todas sus copias.
+    local = threading.local()
+
+    def copiar(presentation_id):
+        if not hasattr(local, 'drive_service'):
+            local.drive_service = construir_servicio(credenciales_desde_dict(credentials_dict))
+        return copy_presentation_to_drive(presentation_id, destination_folder_id, credentials_dict,
+                                          drive_service=local.drive_service)
+
+    resultados = {}
+    with ThreadPoolExecutor(max_workers=max(1, min(max_hilos, len(presentation_ids)))) as pool:
+        futuros = {pool.submit(copiar, presentation_id): presentation_id for presentation_id in presentation_ids}
+        for futuro in as_completed(futuros):
+            try:
+                resultados[futuros[futuro]] = futuro.result()
+            except Exception as e:
+                # Un fallo se devuelve como resultado para no cancelar el resto de copias.
+                resultados[futuros[futuro]] = e
+    return resultados
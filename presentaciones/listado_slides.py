@@ -0,0 +1,167 @@
+import json
+import logging
+import os
+
+from django.conf import settings
+
+from .cache_drive import bloqueo_archivo, hash_clave
+from .google_slides_import import construir_servicio, credenciales_desde_dict
+
+logger = logging.getLogger(__name__)
+
+# Fuera de MEDIA_ROOT: el listado expone los nombres de los archivos de Drive de cada cuenta.
+DIRECTORIO_LISTADOS = getattr(settings, 'SLIDES_LISTADOS_DIR', os.path.join(settings.BASE_DIR, 'listados_slides'))
+VERSION_LISTADO = 2
+TAMANO_PAGINA = getattr(settings, 'SLIDES_TAMANO_PAGINA', 48)
+TAMANO_PAGINA_DRIVE = 200
+MIME_PRESENTACION = 'application/vnd.google-apps.presentation'
+CONSULTA = f"mimeType='{MIME_PRESENTACION}' and trashed=false"
+# thumbnailLink no se guarda: es una URL firmada que caduca en pocas horas y se pide al mostrar cada página.
+CAMPOS_ARCHIVO = 'id, name, mimeType, trashed, webViewLink, createdTime, modifiedTime'
+
+
+class ListadoSlides:
+    # Listado de Google Slides de una cuenta, guardado en disco y actualizado con la API de cambios de Drive:
+    # la primera visita solo pide la primera página y las siguientes solo lo que cambió desde la anterior.
+
+    def __init__(self, credentials_dict):
+        self.credentials_dict = credentials_dict
+        cuenta = credentials_dict.get('cuenta') or credentials_dict.get('refresh_token') or credentials_dict['token']
+        self.ruta = os.path.join(DIRECTORIO_LISTADOS, f"{hash_clave(cuenta)}.json")
+        self._servicio = None
+
+    @property
+    def servicio(self):
+        if self._servicio is None:
+            self._servicio = construir_servicio(credenciales_desde_dict(self.credentials_dict))
+        return self._servicio
+
+    def _leer(self):
+        try:
+            with open(self.ruta, encoding='utf-8') as archivo:
+                listado = json.load(archivo)
+        except (OSError, ValueError):
+            return None
+        # Los listados anteriores guardaban thumbnailLink: se vuelven a pedir.
+        return listado if listado.get('version') == VERSION_LISTADO else None
+
+    def _guardar(self, listado):
+        temporal = self.ruta + '.tmp'
+        with open(temporal, 'w', encoding='utf-8') as archivo:
+            json.dump(listado, archivo)
+        os.replace(temporal, self.ruta)
+
+    def pagina(self, desde=0, cantidad=TAMANO_PAGINA):
+        from googleapiclient.errors import HttpError
+
+        os.makedirs(DIRECTORIO_LISTADOS, exist_ok=True)
+        with bloqueo_archivo(self.ruta + '.lock'):
+            listado = self._leer()
+            if listado is not None and desde == 0:
+                try:
+                    self._aplicar_cambios(listado)
+                except HttpError as e:
+                    # Un token de cambios caducado obliga a listar de nuevo desde el principio.
+                    logger.warning(f"No se pudieron aplicar los cambios de Drive, se vuelve a listar: {e}")
+                    listado = None
+            if listado is None:
+                listado = self._listado_nuevo()
+
+            # Las páginas de Drive se piden solo a medida que el desplazamiento las necesita.
+            while len(listado['presentaciones']) < desde + cantidad and not listado['completo']:
+                self._cargar_pagina(listado)
+
+            self._guardar(listado)
+
+        presentaciones = listado['presentaciones']
+        hay_mas = len(presentaciones) > desde + cantidad or not listado['completo']
+        return self._con_miniaturas(presentaciones[desde:desde + cantidad]), hay_mas
+
+    def buscar(self, ids):
+        listado = self._leer() or {'presentaciones': []}
+        ids = set(ids)
+        return {p['id']: p for p in self._con_miniaturas([p for p in listado['presentaciones'] if p['id'] in ids])}
+
+    def _con_miniaturas(self, presentaciones):
+        # Una sola petición por lotes para los enlaces de miniatura vigentes de lo que se va a mostrar.
+        miniaturas = {}
+
+        def guardar(_, respuesta, error):
+            if error is None and respuesta.get('thumbnailLink'):
+                miniaturas[respuesta['id']] = respuesta['thumbnailLink']
+
+        if presentaciones:
+            try:
+                lote = self.servicio.new_batch_http_request(callback=guardar)
+                for presentacion in presentaciones:
+                    lote.add(self.servicio.files().get(fileId=presentacion['id'], fields='id, thumbnailLink'))
+                lote.execute()
+            except Exception as e:
+                logger.warning(f"No se pudieron obtener las miniaturas de Drive: {e}")
+        return [dict(presentacion, thumbnailLink=miniaturas.get(presentacion['id'])) for presentacion in presentaciones]
+
+    def _listado_nuevo(self):
+        # El token de cambios se pide antes de listar para no perder lo que cambie mientras tanto.
+        token = self.servicio.changes().getStartPageToken().execute()['startPageToken']
+        return {'version': VERSION_LISTADO, 'presentaciones': [], 'siguiente_pagina': None,
+                'token_cambios': token, 'completo': False}
+
+    def _cargar_pagina(self, listado):
+        respuesta = self.servicio.files().list(
+            q=CONSULTA,
+            pageSize=TAMANO_PAGINA_DRIVE,
+            pageToken=listado['siguiente_pagina'],
+            fields=f"nextPageToken, files({CAMPOS_ARCHIVO})",
+            orderBy='modifiedTime desc'
+        ).execute()
+
+        conocidas = {p['id'] for p in listado['presentaciones']}
+        listado['presentaciones'].extend(
+            self._resumen(archivo) for archivo in respuesta.get('files', []) if archivo['id'] not in conocidas
+        )
+        listado['siguiente_pagina'] = respuesta.get('nextPageToken')
+        listado['completo'] = not listado['siguiente_pagina']
+
+    def _aplicar_cambios(self, listado):
+        token = listado['token_cambios']
+        por_id = {p['id']: p for p in listado['presentaciones']}
+        modificadas = []
+
+        while token:
+            respuesta = self.servicio.changes().list(
+                pageToken=token,
+                pageSize=1000,
+                spaces='drive',
+                fields=f"nextPageToken, newStartPageToken, changes(fileId, removed, file({CAMPOS_ARCHIVO}))"
+            ).execute()
+
+            for cambio in respuesta.get('changes', []):
+                archivo = cambio.get('file')
+                por_id.pop(cambio['fileId'], None)
+                if cambio.get('removed') or not archivo or archivo.get('trashed') \
+                        or archivo.get('mimeType') != MIME_PRESENTACION:
+                    continue
+                modificadas.append(self._resumen(archivo))
+
+            if 'newStartPageToken' in respuesta:
+                listado['token_cambios'] = respuesta['newStartPageToken']
+                break
+            token = respuesta.get('nextPageToken')
+
+        # Lo modificado pasa al principio, igual que en el orden por modifiedTime de Drive.
+        vistas = set()
+        nuevas = []
+        for presentacion in sorted(modificadas, key=lambda p: p.get('modifiedTime') or '', reverse=True):
+            if presentacion['id'] not in vistas:
+                vistas.add(presentacion['id'])
+                nuevas.append(presentacion)
+        listado['presentaciones'] = nuevas + [p for p in listado['presentaciones'] if p['id'] in por_id]
+
+    def _resumen(self, archivo):
+        return {
+            'id': archivo['id'],
+            'name': archivo.get('name', ''),
+            'webViewLink': archivo.get('webViewLink'),
+            'createdTime': archivo.get('createdTime'),
+            'modifiedTime': archivo.get('modifiedTime'),
+        }
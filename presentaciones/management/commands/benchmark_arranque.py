@@ -0,0 +1,116 @@
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+PRESUPUESTO_IMPORTACION_MS = getattr(settings, 'ARRANQUE_PRESUPUESTO_MS', 1500)
+PRESUPUESTO_RSS_MB = getattr(settings, 'ARRANQUE_PRESUPUESTO_RSS_MB', 120)
+# Solo los usa el detector, la conversión de PPTX o los trabajos en segundo plano; un worker web no debe cargarlos.
+MODULOS_DIFERIDOS = (
+    'cv2', 'mediapipe', 'numpy', 'comtypes', 'pdf2image', 'PIL',
+    'googleapiclient', 'googleapiclient.errors', 'googleapiclient.discovery', 'googleapiclient.http',
+    'google_auth_oauthlib',
+)
+
+# Lo mismo que hace un worker antes de atender la primera petición: setup, URLconf (carga todas las vistas) y WSGI.
+CODIGO_ARRANQUE = """
+import json, os, sys
+import django
+django.setup()
+from django.urls import get_resolver
+get_resolver().url_patterns
+from django.core.wsgi import get_wsgi_application
+get_wsgi_application()
+try:
+    import psutil
+    rss = psutil.Process().memory_info().rss
+except ImportError:
+    with open('/proc/self/statm') as f:
+        rss = int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+print(json.dumps({'rss': rss, 'modulos': sorted(sys.modules)}))
+"""
+
+
+def analizar_importtime(salida):
+    # Formato de cada línea: "import time: <self us> | <acumulado us> | <sangría><módulo>".
+    modulos = []
+    for linea in salida.splitlines():
+        if not linea.startswith('import time:'):
+            continue
+        columnas = linea[len('import time:'):].split('|', 2)
+        if len(columnas) != 3 or not columnas[0].strip().isdigit():
+            # La cabecera "self [us] | cumulative | imported package".
+            continue
+        propio, acumulado, crudo = columnas
+        crudo = crudo[1:]
+        modulos.append({
+            'nombre': crudo.strip(),
+            'propio_us': int(propio),
+            'acumulado_us': int(acumulado),
+            'nivel': (len(crudo) - len(crudo.lstrip())) // 2,
+        })
+    return modulos
+
+
+class Command(BaseCommand):
+    help = "Mide el arranque en frío de un worker (python -X importtime) y falla si supera el presupuesto"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--repeticiones', type=int, default=3)
+        parser.add_argument('--presupuesto-ms', type=float, default=PRESUPUESTO_IMPORTACION_MS,
+                            help='Tiempo máximo de importación')
+        parser.add_argument('--presupuesto-rss-mb', type=float, default=PRESUPUESTO_RSS_MB,
+                            help='Memoria residente máxima del worker tras arrancar')
+        parser.add_argument('--top', type=int, default=15)
+
+    def _arrancar(self):
+        entorno = dict(os.environ, DJANGO_SETTINGS_MODULE=os.environ.get('DJANGO_SETTINGS_MODULE', 'CPG.settings'))
+        inicio = time.perf_counter()
+        proceso = subprocess.run(
+            [sys.executable, '-X', 'importtime', '-c', CODIGO_ARRANQUE],
+            cwd=settings.BASE_DIR, env=entorno, capture_output=True, text=True
+        )
+        duracion = time.perf_counter() - inicio
+        if proceso.returncode != 0:
+            raise CommandError(f"El arranque falló:\n{proceso.stderr[-2000:]}")
+        resultado = json.loads(proceso.stdout.strip().splitlines()[-1])
+        return duracion, analizar_importtime(proceso.stderr), resultado
+
+    def handle(self, *args, **options):
+        mediciones = [self._arrancar() for _ in range(max(1, options['repeticiones']))]
+        # La mediana de cada métrica evita que una repetición con la caché de disco fría domine el resultado.
+        pared_ms = statistics.median(duracion for duracion, _, _ in mediciones) * 1000
+        importacion_ms = statistics.median(
+            sum(m['acumulado_us'] for m in modulos if m['nivel'] == 0) for _, modulos, _ in mediciones
+        ) / 1000
+        rss_mb = statistics.median(resultado['rss'] for _, _, resultado in mediciones) / (1024 * 1024)
+
+        _, modulos, resultado = mediciones[-1]
+        por_paquete = defaultdict(int)
+        for modulo in modulos:
+            por_paquete[modulo['nombre'].split('.')[0]] += modulo['propio_us']
+
+        self.stdout.write(f"Arranque (mediana de {len(mediciones)}): {pared_ms:.0f} ms de pared, "
+                          f"{importacion_ms:.0f} ms importando {len(modulos)} módulos, RSS {rss_mb:.1f} MB")
+        self.stdout.write(f"{'paquete':<32} {'ms':>8}")
+        for paquete, microsegundos in sorted(por_paquete.items(), key=lambda p: -p[1])[:options['top']]:
+            self.stdout.write(f"{paquete:<32} {microsegundos / 1000:>8.1f}")
+
+        cargados = [nombre for nombre in MODULOS_DIFERIDOS if nombre in resultado['modulos']]
+        errores = []
+        if cargados:
+            errores.append(f"módulos que deberían cargarse bajo demanda: {', '.join(cargados)}")
+        if importacion_ms > options['presupuesto_ms']:
+            errores.append(f"importación {importacion_ms:.0f} ms > {options['presupuesto_ms']:.0f} ms")
+        if rss_mb > options['presupuesto_rss_mb']:
+            errores.append(f"RSS {rss_mb:.1f} MB > {options['presupuesto_rss_mb']:.0f} MB")
+
+        if errores:
+            raise CommandError("Arranque fuera de presupuesto: " + '; '.join(errores))
+        self.stdout.write(self.style.SUCCESS("Arranque dentro del presupuesto"))
@@ -0,0 +1,101 @@
+import statistics
+import time
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.db.models import Q
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from presentaciones.biblioteca import pagina_biblioteca, codificar_cursor, CAMPOS_TARJETA, TAMANO_PAGINA
+from presentaciones.models import Presentacion
+
+
+class Command(BaseCommand):
+    help = "Compara la paginación por OFFSET con la paginación por clave de la biblioteca sobre datos sembrados"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--filas', type=int, default=100000)
+        parser.add_argument('--repeticiones', type=int, default=20)
+        parser.add_argument('--tamano-pagina', type=int, default=TAMANO_PAGINA)
+
+    def handle(self, *args, **options):
+        # Todo se hace dentro de una transacción que se revierte: la base de datos queda como estaba.
+        with transaction.atomic():
+            usuario = self._sembrar(options['filas'])
+            self._medir(usuario, options['filas'], options['tamano_pagina'], options['repeticiones'])
+            transaction.set_rollback(True)
+
+    def _sembrar(self, filas):
+        usuario = get_user_model().objects.create(username=f"benchmark-biblioteca-{time.time_ns()}")
+        campo_fecha = Presentacion._meta.get_field('fecha_subida')
+        inicio = time.perf_counter()
+        ahora = timezone.now()
+
+        # auto_now_add pisaría las fechas sembradas; se desactiva solo mientras se insertan.
+        campo_fecha.auto_now_add = False
+        try:
+            for desde in range(0, filas, 5000):
+                Presentacion.objects.bulk_create([
+                    Presentacion(
+                        usuario=usuario,
+                        nombre=f"presentacion-{i}.pdf",
+                        drive_id=f"drive-{i}",
+                        ubicacion='drive',
+                        # Cada 7 filas se repite la fecha para ejercitar el desempate por id.
+                        fecha_subida=ahora - timedelta(minutes=i // 7),
+                    )
+                    for i in range(desde, min(desde + 5000, filas))
+                ])
+        finally:
+            campo_fecha.auto_now_add = True
+
+        self.stdout.write(f"Sembradas {filas} filas en {time.perf_counter() - inicio:.1f} s")
+        return usuario
+
+    def _cronometrar(self, funcion, repeticiones):
+        tiempos = []
+        with CaptureQueriesContext(connection) as consultas:
+            funcion()
+        for _ in range(repeticiones):
+            inicio = time.perf_counter()
+            funcion()
+            tiempos.append((time.perf_counter() - inicio) * 1000)
+        return statistics.median(tiempos), len(consultas.captured_queries)
+
+    def _medir(self, usuario, filas, tamano, repeticiones):
+        ordenadas = Presentacion.objects.filter(usuario=usuario).order_by('-fecha_subida', '-id')
+        paginas = filas // tamano
+        profundidades = sorted({0, 10, 100, 1000, paginas // 2, max(0, paginas - 1)})
+
+        self.stdout.write(f"{'página':>8} {'OFFSET ms':>10} {'consultas':>10} {'clave ms':>10} {'consultas':>10}")
+        for pagina in profundidades:
+            desplazamiento = pagina * tamano
+            if desplazamiento >= filas:
+                continue
+
+            def por_offset():
+                # Lo que hacía el inicio: modelos completos y OFFSET.
+                list(ordenadas[desplazamiento:desplazamiento + tamano])
+
+            cursor = None
+            if desplazamiento:
+                anterior = ordenadas.values('fecha_subida', 'id')[desplazamiento - 1]
+                cursor = codificar_cursor(anterior['fecha_subida'], anterior['id'])
+
+            def por_clave():
+                pagina_biblioteca(usuario, cursor, tamano)
+
+            ms_offset, consultas_offset = self._cronometrar(por_offset, repeticiones)
+            ms_clave, consultas_clave = self._cronometrar(por_clave, repeticiones)
+            self.stdout.write(f"{pagina:>8} {ms_offset:>10.2f} {consultas_offset:>10} "
+                              f"{ms_clave:>10.2f} {consultas_clave:>10}")
+
+        self.stdout.write("Plan de la consulta por clave:")
+        fila = ordenadas.values('fecha_subida', 'id')[filas // 2]
+        plan = Presentacion.objects.filter(usuario=usuario).filter(
+            Q(fecha_subida__lt=fila['fecha_subida']) | Q(fecha_subida=fila['fecha_subida'], id__lt=fila['id'])
+        ).order_by('-fecha_subida', '-id').values(*CAMPOS_TARJETA)[:tamano].explain()
+        self.stdout.write(plan)
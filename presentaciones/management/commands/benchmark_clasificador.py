@@ -0,0 +1,42 @@
+import json
+import time
+
+import numpy as np
+from django.core.management.base import BaseCommand, CommandError
+
+from presentaciones.clasificador_gestos import GestosFrame, SIN_MANOS
+
+
+class Command(BaseCommand):
+    help = "Mide el costo por frame del clasificador de gestos sobre landmarks grabados"
+
+    def add_arguments(self, parser):
+        parser.add_argument('landmarks', help='Archivo .jsonl grabado con detectar_gestos --record')
+        parser.add_argument('--repeticiones', type=int, default=20)
+
+    def handle(self, *args, **options):
+        frames = []
+        with open(options['landmarks'], encoding='utf-8') as f:
+            for linea in f:
+                if not linea.strip():
+                    continue
+                registro = json.loads(linea)
+                manos = np.array(registro['manos'], dtype=np.float32) if registro.get('manos') else SIN_MANOS
+                frames.append((manos, registro.get('ancho', 640), registro.get('alto', 480)))
+
+        if not frames:
+            raise CommandError("El archivo no contiene frames")
+
+        con_manos = sum(1 for manos, _, _ in frames if len(manos))
+        tiempos = []
+        for _ in range(options['repeticiones']):
+            inicio = time.perf_counter()
+            for manos, ancho, alto in frames:
+                GestosFrame(manos, ancho, alto)
+            tiempos.append((time.perf_counter() - inicio) / len(frames))
+
+        tiempos.sort()
+        self.stdout.write(f"Frames: {len(frames)} ({con_manos} con manos), repeticiones: {options['repeticiones']}")
+        self.stdout.write(f"Clasificación por frame: mediana {tiempos[len(tiempos) // 2] * 1e6:.1f} µs, "
+                          f"mínimo {tiempos[0] * 1e6:.1f} µs")
+        self.stdout.write(f"Capacidad: {1 / tiempos[len(tiempos) // 2]:.0f} frames/s")
@@ -0,0 +1,137 @@
+import os
+import re
+import tempfile
+import threading
+import time
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from io import BytesIO
+
+import httplib2
+import requests
+from django.core.management.base import BaseCommand, CommandError
+from googleapiclient.http import HttpRequest, MediaIoBaseDownload
+
+from presentaciones.descargas_drive import descargar_a_archivo, TAMANO_FRAGMENTO
+
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+
+def rss_actual():
+    if psutil:
+        return psutil.Process().memory_info().rss
+    with open('/proc/self/statm') as f:
+        return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+
+
+class MuestreadorMemoria:
+    def __init__(self, intervalo=0.01):
+        self.intervalo = intervalo
+        self.base = rss_actual()
+        self.pico = self.base
+        self._detener = threading.Event()
+        self._hilo = threading.Thread(target=self._bucle, daemon=True)
+
+    def __enter__(self):
+        self._hilo.start()
+        return self
+
+    def __exit__(self, *args):
+        self._detener.set()
+        self._hilo.join()
+
+    def _bucle(self):
+        while not self._detener.is_set():
+            self.pico = max(self.pico, rss_actual())
+            time.sleep(self.intervalo)
+
+
+def crear_servidor(ruta):
+    tamano = os.path.getsize(ruta)
+
+    class Manejador(BaseHTTPRequestHandler):
+        def do_GET(self):
+            rango = re.match(r'bytes=(\d+)-(\d*)', self.headers.get('Range', ''))
+            inicio, fin = 0, tamano - 1
+            if rango:
+                inicio = int(rango.group(1))
+                fin = min(int(rango.group(2)) if rango.group(2) else tamano - 1, tamano - 1)
+                self.send_response(206)
+                self.send_header('Content-Range', f'bytes {inicio}-{fin}/{tamano}')
+            else:
+                self.send_response(200)
+            self.send_header('Content-Length', str(fin - inicio + 1))
+            self.end_headers()
+            with open(ruta, 'rb') as f:
+                f.seek(inicio)
+                restante = fin - inicio + 1
+                while restante:
+                    bloque = f.read(min(restante, 1024 * 1024))
+                    self.wfile.write(bloque)
+                    restante -= len(bloque)
+
+        def log_message(self, *args):
+            pass
+
+    servidor = ThreadingHTTPServer(('127.0.0.1', 0), Manejador)
+    threading.Thread(target=servidor.serve_forever, daemon=True).start()
+    return servidor
+
+
+class Command(BaseCommand):
+    help = "Compara memoria pico de la descarga en memoria contra la descarga por fragmentos a disco"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--tamano-mb', type=int, default=200)
+        parser.add_argument('--fragmento-mb', type=int, default=TAMANO_FRAGMENTO // (1024 * 1024))
+
+    def handle(self, *args, **options):
+        if not psutil and not os.path.exists('/proc/self/statm'):
+            raise CommandError("Se necesita psutil para medir la memoria en esta plataforma")
+
+        mb = 1024 * 1024
+        fragmento = options['fragmento_mb'] * mb
+        with tempfile.TemporaryDirectory() as directorio:
+            origen = os.path.join(directorio, 'origen.pdf')
+            with open(origen, 'wb') as f:
+                bloque = os.urandom(mb)
+                for _ in range(options['tamano_mb']):
+                    f.write(bloque)
+
+            servidor = crear_servidor(origen)
+            url = f"http://127.0.0.1:{servidor.server_address[1]}/origen.pdf"
+
+            def nueva_peticion():
+                return HttpRequest(httplib2.Http(), lambda respuesta, contenido: contenido, url)
+
+            def en_memoria(destino):
+                with open(destino, 'wb') as f:
+                    fh = BytesIO()
+                    downloader = MediaIoBaseDownload(fh, nueva_peticion(), chunksize=fragmento)
+                    done = False
+                    while not done:
+                        status, done = downloader.next_chunk()
+                    fh.seek(0)
+                    f.write(fh.read())
+
+            def a_disco(destino):
+                with open(destino, 'wb') as f, requests.Session() as sesion:
+                    descargar_a_archivo(f, nueva_peticion(), tamano_fragmento=fragmento, sesion=sesion)
+
+            self.stdout.write(f"Archivo: {options['tamano_mb']} MB | fragmento: {options['fragmento_mb']} MB")
+            self.stdout.write(f"{'modo':<12} {'segundos':>9} {'RSS pico +MB':>13}")
+            # Primero a disco: la memoria liberada por el modo en memoria no siempre vuelve al sistema.
+            for nombre, descargar in (('streaming', a_disco), ('memoria', en_memoria)):
+                destino = os.path.join(directorio, f'{nombre}.pdf')
+                inicio = time.perf_counter()
+                with MuestreadorMemoria() as muestreador:
+                    descargar(destino)
+                duracion = time.perf_counter() - inicio
+                if os.path.getsize(destino) != os.path.getsize(origen):
+                    raise CommandError(f"La descarga en modo {nombre} quedó incompleta")
+                self.stdout.write(f"{nombre:<12} {duracion:>9.2f} {(muestreador.pico - muestreador.base) / mb:>13.1f}")
+                os.remove(destino)
+
+            servidor.shutdown()
@@ -0,0 +1,179 @@
+import statistics
+import time
+import tracemalloc
+
+import cv2
+from django.core.management.base import BaseCommand, CommandError
+
+from presentaciones.buffers_frames import espejar, convertir_rgb
+from presentaciones.fuentes_gestos import FuenteVideo
+from presentaciones.management.commands.detectar_gestos import Command as Detector
+from presentaciones.transporte_gestos import TransporteNulo
+
+# Cada PERIODO_MODO segundos del video se alterna el modo dibujo, con su destello de 0,5 s,
+# y cada dos cambios se pasa al siguiente estado; así se ejercitan todas las capas del HUD.
+PERIODO_MODO = 2.0
+ESTADOS = (
+    (None, "PUNTERO", (255, 255, 0)),
+    ('esta_dibujando', "DIBUJANDO", (0, 255, 0)),
+    ('esta_borrando', "BORRANDO", (0, 165, 255)),
+    ('esta_moviendo', "MOVIENDO", (255, 0, 255)),
+)
+
+
+def estado_simulado(tiempo):
+    ciclo = int(tiempo // PERIODO_MODO)
+    return ciclo, ciclo % 2 == 1, ESTADOS[(ciclo // 2) % len(ESTADOS)]
+
+
+def hud_original(frame, modo_dibujo, alpha, estado_texto, color_estado):
+    # Lo que hacía el detector antes: copia completa del frame para el destello y todos los textos
+    # rasterizados en cada frame. Devuelve los buffers de frame que reservó.
+    alto_frame, ancho_frame = frame.shape[:2]
+    asignados = 0
+    if alpha is not None:
+        overlay = frame.copy()
+        asignados += 1
+        color = (0, 255, 0) if modo_dibujo else (0, 0, 255)
+        texto = "MODO DIBUJO: ACTIVADO" if modo_dibujo else "MODO DIBUJO: DESACTIVADO"
+        cv2.rectangle(overlay, (0, 0), (ancho_frame, alto_frame), color, 30)
+        tamaño = cv2.getTextSize(texto, cv2.FONT_HERSHEY_SIMPLEX, 1.8, 5)[0]
+        cv2.putText(overlay, texto, ((ancho_frame - tamaño[0]) // 2, alto_frame // 2),
+                    cv2.FONT_HERSHEY_SIMPLEX, 1.8, color, 5)
+        cv2.addWeighted(overlay, alpha * 0.7, frame, 1 - (alpha * 0.7), 0, frame)
+
+    if modo_dibujo:
+        cv2.rectangle(frame, (0, 0), (ancho_frame, 90), (0, 100, 255), -1)
+        cv2.rectangle(frame, (0, 0), (ancho_frame, 90), (255, 255, 255), 4)
+        tamaño = cv2.getTextSize("MODO DIBUJO ACTIVADO", cv2.FONT_HERSHEY_SIMPLEX, 1.3, 3)[0]
+        cv2.putText(frame, "MODO DIBUJO ACTIVADO", ((ancho_frame - tamaño[0]) // 2, 38),
+                    cv2.FONT_HERSHEY_SIMPLEX, 1.3, (255, 255, 255), 3)
+        tamaño = cv2.getTextSize(estado_texto, cv2.FONT_HERSHEY_SIMPLEX, 1.0, 2)[0]
+        cv2.putText(frame, estado_texto, ((ancho_frame - tamaño[0]) // 2, 70),
+                    cv2.FONT_HERSHEY_SIMPLEX, 1.0, color_estado, 2)
+        cv2.rectangle(frame, (0, 90), (20, alto_frame), (0, 255, 0), -1)
+        cv2.rectangle(frame, (ancho_frame - 20, 90), (ancho_frame, alto_frame), (0, 255, 0), -1)
+        cv2.putText(frame, "PAZ =Salir | CUERNOS =Dibujar | MANO =Borrar | PUNO =Puntero | PINZA =Mover | MENIQUE =Limpiar",
+                    (10, alto_frame - 30), cv2.FONT_HERSHEY_SIMPLEX, 0.4, (255, 255, 255), 1)
+    else:
+        cv2.rectangle(frame, (0, 0), (ancho_frame, 55), (50, 50, 50), -1)
+        cv2.rectangle(frame, (0, 0), (ancho_frame, 55), (100, 100, 100), 3)
+        tamaño = cv2.getTextSize("MODO NAVEGACION", cv2.FONT_HERSHEY_SIMPLEX, 1.1, 2)[0]
+        cv2.putText(frame, "MODO NAVEGACION", ((ancho_frame - tamaño[0]) // 2, 38),
+                    cv2.FONT_HERSHEY_SIMPLEX, 1.1, (200, 200, 200), 2)
+        cv2.putText(frame, "PAZ =Activar Dibujo | Pistola =Navegar | Puno =Puntero | 2 Manos=Zoom",
+                    (10, alto_frame - 30), cv2.FONT_HERSHEY_SIMPLEX, 0.45, (200, 200, 200), 1)
+    return asignados
+
+
+class Command(BaseCommand):
+    help = "Mide asignaciones y tiempo por frame del espejado, la conversión a RGB y el HUD del detector"
+
+    def add_arguments(self, parser):
+        parser.add_argument('video', help='Video grabado con la cámara del detector')
+        parser.add_argument('--max-frames', type=int, default=300)
+
+    def _detector(self):
+        detector = Detector()
+        detector.transporte = TransporteNulo()
+        return detector
+
+    def _frame_original(self, contexto, fuente):
+        ret, frame, _, tiempo = fuente.leer()
+        if not ret:
+            return False
+        frame = cv2.flip(frame, 1)
+        cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+        asignados = 3
+
+        ciclo, modo_dibujo, (_, estado_texto, color_estado) = estado_simulado(tiempo)
+        transcurrido = tiempo - ciclo * PERIODO_MODO
+        alpha = 1.0 - transcurrido / 0.5 if ciclo and transcurrido < 0.5 else None
+        asignados += hud_original(frame, modo_dibujo, alpha, estado_texto, color_estado)
+        contexto['detector'].mostrar_estadisticas_envio(frame, frame.shape[0])
+        return asignados
+
+    def _frame_preasignado(self, contexto, fuente):
+        detector = contexto['detector']
+        antes = detector.pool_frames.asignaciones + detector.buffer_rgb.asignaciones \
+            + detector.hud.estadisticas()['capas']
+        lectura = contexto.get('lectura')
+        ret, frame, _, tiempo = fuente.leer(lectura)
+        if not ret:
+            return False
+        asignados = int(frame is not lectura)
+        contexto['lectura'] = frame
+        frame = espejar(frame, detector.pool_frames)
+        convertir_rgb(frame, detector.buffer_rgb)
+
+        ciclo, modo_dibujo, (atributo, _, _) = estado_simulado(tiempo)
+        detector.tiempo_fuente = tiempo
+        detector.modo_dibujo_activo = modo_dibujo
+        for campo in ('esta_dibujando', 'esta_borrando', 'esta_moviendo'):
+            setattr(detector, campo, campo == atributo)
+        detector.mostrar_feedback_toggle = ciclo > 0
+        detector.tiempo_inicio_feedback = ciclo * PERIODO_MODO
+        detector.dibujar_hud(frame, frame.shape[1], frame.shape[0])
+        detector.pool_frames.liberar(frame)
+
+        despues = detector.pool_frames.asignaciones + detector.buffer_rgb.asignaciones \
+            + detector.hud.estadisticas()['capas']
+        return asignados + despues - antes
+
+    def _pasada(self, ruta, max_frames, procesar, medir_memoria):
+        fuente = FuenteVideo(ruta)
+        if not fuente.isOpened():
+            raise CommandError(f"No se puede abrir {ruta}")
+        contexto = {'detector': self._detector()}
+        tiempos, asignaciones, picos = [], [], []
+        try:
+            while len(tiempos) < max_frames:
+                if medir_memoria:
+                    base = tracemalloc.get_traced_memory()[0]
+                    tracemalloc.reset_peak()
+                inicio = time.perf_counter()
+                asignados = procesar(contexto, fuente)
+                if asignados is False:
+                    break
+                tiempos.append((time.perf_counter() - inicio) * 1000)
+                asignaciones.append(asignados)
+                if medir_memoria:
+                    picos.append(tracemalloc.get_traced_memory()[1] - base)
+        finally:
+            fuente.release()
+        return tiempos, asignaciones, picos
+
+    def _medir(self, ruta, max_frames, procesar):
+        tiempos, asignaciones, _ = self._pasada(ruta, max_frames, procesar, False)
+        if not tiempos:
+            raise CommandError("El video no contiene frames")
+        # tracemalloc (que ve las reservas de NumPy y OpenCV) frena el bucle: la memoria se mide en otra pasada.
+        tracemalloc.start()
+        try:
+            _, _, picos = self._pasada(ruta, max_frames, procesar, True)
+        finally:
+            tracemalloc.stop()
+        return {
+            'frames': len(tiempos),
+            'media_ms': statistics.mean(tiempos),
+            'p95_ms': sorted(tiempos)[int(0.95 * (len(tiempos) - 1))],
+            'asignaciones': statistics.mean(asignaciones),
+            'estables': statistics.mean(asignaciones[len(asignaciones) // 2:]),
+            'pico_kb': statistics.mean(picos) / 1024 if picos else 0.0,
+        }
+
+    def handle(self, *args, **options):
+        resultados = {
+            'original': self._medir(options['video'], options['max_frames'], self._frame_original),
+            'preasignado': self._medir(options['video'], options['max_frames'], self._frame_preasignado),
+        }
+        # La lectura del video se incluye en el tiempo: es el mismo en ambos modos.
+        self.stdout.write(f"Frames: {resultados['original']['frames']} (lectura, espejo, RGB y HUD)")
+        self.stdout.write(f"{'modo':<12} {'ms/frame':>9} {'p95 ms':>8} {'buffers/frame':>14} "
+                          f"{'(2ª mitad)':>11} {'pico KB/frame':>14}")
+        for modo, r in resultados.items():
+            self.stdout.write(f"{modo:<12} {r['media_ms']:>9.2f} {r['p95_ms']:>8.2f} {r['asignaciones']:>14.2f} "
+                              f"{r['estables']:>11.2f} {r['pico_kb']:>14.1f}")
+        original, preasignado = resultados['original'], resultados['preasignado']
+        if preasignado['media_ms'] > 0:
+            self.stdout.write(f"Aceleración: {original['media_ms'] / preasignado['media_ms']:.2f}x")
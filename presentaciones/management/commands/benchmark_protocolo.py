@@ -0,0 +1,110 @@
+import base64
+import json
+import math
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from presentaciones.protocolo_comandos import codificar, decodificar, separar
+
+
+def comandos_sinteticos(cantidad):
+    # Una sesión típica: puntero, zoom, trazos punto a punto y agrupados, y algo de navegación.
+    comandos = []
+    i = 0
+    while len(comandos) < cantidad:
+        x, y = 0.5 + 0.3 * math.cos(i / 20), 0.5 + 0.3 * math.sin(i / 15)
+        fase = (i // 50) % 5
+        if fase == 0:
+            comandos.append(f"puntero_{x:.3f}_{y:.3f}")
+        elif fase == 1:
+            comandos.append(f"zoom_{1 + (i % 50) / 50:.2f}_{x:.3f}_{y:.3f}")
+        elif fase == 2:
+            comandos.append(f"start_draw_{x:.3f}_{y:.3f}" if i % 50 == 0 else f"drawing_{x:.3f}_{y:.3f}")
+        elif fase == 3:
+            puntos = ''.join(f"_{x + k * 0.002:.3f}_{y:.3f}" for k in range(4))
+            comandos.append(f"drawing{puntos}")
+        else:
+            comandos.append("next" if i % 25 == 0 else f"moving_{x:.3f}_{y:.3f}")
+        i += 1
+    return comandos
+
+
+def comandos_grabados(ruta):
+    comandos = []
+    with open(ruta, encoding='utf-8') as archivo:
+        for linea in archivo:
+            if linea.strip():
+                comandos.extend(json.loads(linea).get('comandos', []))
+    return comandos
+
+
+class Command(BaseCommand):
+    help = "Compara tamaño y velocidad de codificación de los comandos de gestos en JSON y en binario"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sesion', default=None,
+                            help='Usar los comandos de una sesión grabada con detectar_gestos --record')
+        parser.add_argument('--comandos', type=int, default=10000, help='Comandos sintéticos si no hay sesión')
+        parser.add_argument('--repeticiones', type=int, default=5)
+
+    def _cronometrar(self, funcion, repeticiones):
+        mejor = float('inf')
+        for _ in range(repeticiones):
+            inicio = time.perf_counter()
+            funcion()
+            mejor = min(mejor, time.perf_counter() - inicio)
+        return mejor
+
+    def handle(self, *args, **options):
+        comandos = comandos_grabados(options['sesion']) if options['sesion'] \
+            else comandos_sinteticos(options['comandos'])
+        # Solo los comandos del esquema: los demás seguirían viajando en JSON.
+        comandos = [c for c in comandos if self._valido(c)]
+        if not comandos:
+            raise CommandError("No hay comandos para comparar")
+
+        ahora = time.time()
+        eventos = [{'seq': seq, 'comando': c, 'timestamp': ahora} for seq, c in enumerate(comandos, 1)]
+        cuerpos_json = [json.dumps({'comando': c, 'sesion': 'benchmark'}).encode('utf-8') for c in comandos]
+        cuerpos_binarios = [codificar(c, e['seq'], ahora) for c, e in zip(comandos, eventos)]
+        eventos_json = [json.dumps(e) for e in eventos]
+        eventos_sse = [base64.b64encode(b).decode('ascii') for b in cuerpos_binarios]
+
+        repeticiones = options['repeticiones']
+        tiempos = {
+            'json': (
+                self._cronometrar(lambda: [json.dumps({'comando': c, 'sesion': 'benchmark'}).encode('utf-8')
+                                           for c in comandos], repeticiones),
+                # Decodificar incluye separar tipo y valores, lo que antes hacía presentar.js con split.
+                self._cronometrar(lambda: [separar(json.loads(c)['comando']) for c in cuerpos_json], repeticiones),
+            ),
+            'binario': (
+                self._cronometrar(lambda: [codificar(c, e['seq'], ahora) for c, e in zip(comandos, eventos)],
+                                  repeticiones),
+                self._cronometrar(lambda: [decodificar(b) for b in cuerpos_binarios], repeticiones),
+            ),
+        }
+
+        total = len(comandos)
+        tamanos = {
+            'json': (sum(map(len, cuerpos_json)), sum(map(len, eventos_json))),
+            'binario': (sum(map(len, cuerpos_binarios)), sum(map(len, cuerpos_binarios))),
+        }
+        self.stdout.write(f"Comandos: {total} ({'sesión grabada' if options['sesion'] else 'sintéticos'})")
+        self.stdout.write(f"{'formato':<9} {'B/comando':>10} {'B/evento':>9} {'codificar/s':>12} {'decodificar/s':>14}")
+        for formato in ('json', 'binario'):
+            codificar_s, decodificar_s = tiempos[formato]
+            cuerpo, evento = tamanos[formato]
+            self.stdout.write(f"{formato:<9} {cuerpo / total:>10.1f} {evento / total:>9.1f} "
+                              f"{total / codificar_s:>12.0f} {total / decodificar_s:>14.0f}")
+        self.stdout.write(f"Evento SSE en base64: {sum(map(len, eventos_sse)) / total:.1f} B/evento")
+        self.stdout.write(f"Tamaño binario / JSON: {tamanos['binario'][0] / tamanos['json'][0]:.2f} (cuerpo), "
+                          f"{tamanos['binario'][1] / tamanos['json'][1]:.2f} (evento)")
+
+    def _valido(self, comando):
+        try:
+            separar(comando)
+            return True
+        except ValueError:
+            return False
@@ -0,0 +1,100 @@
+import time
+
+import cv2
+import mediapipe as mp
+import numpy as np
+from django.core.management.base import BaseCommand, CommandError
+
+from presentaciones.clasificador_gestos import GestosFrame, landmarks_a_array
+from presentaciones.roi_manos import InferenciaAdaptativa, ANCHO_INFERENCIA, INTERVALO_BUSQUEDA
+
+mp_hands = mp.solutions.hands
+
+GESTOS_COMPARADOS = ('paz', 'cuernos', 'mano_abierta', 'pistola_derecha', 'pistola_izquierda',
+                     'puno', 'pulgar_arriba', 'pinza')
+
+
+def crear_hands():
+    return mp_hands.Hands(
+        min_detection_confidence=0.7,
+        min_tracking_confidence=0.5,
+        max_num_hands=2
+    )
+
+
+class Command(BaseCommand):
+    help = "Compara throughput y precisión de la inferencia adaptativa contra el frame completo"
+
+    def add_arguments(self, parser):
+        parser.add_argument('video', help='Video grabado con una o dos manos')
+        parser.add_argument('--ancho-inferencia', type=int, default=ANCHO_INFERENCIA)
+        parser.add_argument('--intervalo-busqueda', type=int, default=INTERVALO_BUSQUEDA)
+        parser.add_argument('--max-frames', type=int, default=None)
+
+    def leer_frames(self, ruta, max_frames):
+        cap = cv2.VideoCapture(ruta)
+        if not cap.isOpened():
+            raise CommandError(f"No se puede abrir {ruta}")
+        frames = []
+        while max_frames is None or len(frames) < max_frames:
+            ret, frame = cap.read()
+            if not ret:
+                break
+            frames.append(cv2.flip(frame, 1))
+        cap.release()
+        return frames
+
+    def handle(self, *args, **options):
+        frames = self.leer_frames(options['video'], options['max_frames'])
+        if not frames:
+            raise CommandError("El video no contiene frames")
+        alto, ancho = frames[0].shape[:2]
+
+        with crear_hands() as hands:
+            inicio = time.perf_counter()
+            base = [landmarks_a_array(hands.process(cv2.cvtColor(f, cv2.COLOR_BGR2RGB)).multi_hand_landmarks)
+                    for f in frames]
+            tiempo_base = time.perf_counter() - inicio
+
+        with crear_hands() as hands:
+            adaptativa = InferenciaAdaptativa(hands, ancho_inferencia=options['ancho_inferencia'],
+                                              intervalo_busqueda=options['intervalo_busqueda'])
+            inicio = time.perf_counter()
+            adaptados = [adaptativa.procesar(f) for f in frames]
+            tiempo_adaptativo = time.perf_counter() - inicio
+
+        misma_cantidad = 0
+        errores_px = []
+        gestos_iguales = 0
+        for manos_base, manos_adapt in zip(base, adaptados):
+            if len(manos_base) != len(manos_adapt):
+                continue
+            misma_cantidad += 1
+            if len(manos_base):
+                # Emparejar manos por la muñeca más cercana.
+                orden = np.argsort(manos_base[:, 0, 0])
+                orden_adapt = np.argsort(manos_adapt[:, 0, 0])
+                diferencia = (manos_base[orden, :, :2] - manos_adapt[orden_adapt, :, :2]) * (ancho, alto)
+                errores_px.append(float(np.linalg.norm(diferencia, axis=-1).mean()))
+
+                g_base = GestosFrame(manos_base[orden], ancho, alto)
+                g_adapt = GestosFrame(manos_adapt[orden_adapt], ancho, alto)
+                if all(np.array_equal(getattr(g_base, g), getattr(g_adapt, g)) for g in GESTOS_COMPARADOS):
+                    gestos_iguales += 1
+            else:
+                gestos_iguales += 1
+
+        total = len(frames)
+        self.stdout.write(f"Frames: {total} ({ancho}x{alto})")
+        self.stdout.write(f"{'modo':<12} {'FPS':>8} {'ms/frame':>9}")
+        self.stdout.write(f"{'completo':<12} {total / tiempo_base:>8.1f} {tiempo_base / total * 1000:>9.2f}")
+        self.stdout.write(f"{'adaptativo':<12} {total / tiempo_adaptativo:>8.1f} {tiempo_adaptativo / total * 1000:>9.2f}")
+        self.stdout.write(f"Aceleración: {tiempo_base / tiempo_adaptativo:.2f}x")
+        self.stdout.write(f"Mismo número de manos: {misma_cantidad / total:.1%}")
+        self.stdout.write(f"Mismos gestos clasificados: {gestos_iguales / total:.1%}")
+        if errores_px:
+            self.stdout.write(f"Error medio de landmarks: {np.mean(errores_px):.1f} px "
+                              f"(p95 {np.percentile(errores_px, 95):.1f} px)")
+        roi = adaptativa.estadisticas()
+        self.stdout.write(f"Inferencias en recorte: {roi['inferencias_roi']}, búsquedas completas: "
+                          f"{roi['busquedas_completas']}, pérdidas: {roi['perdidas']}")
@@ -0,0 +1,195 @@
+import json
+import os
+import statistics
+import threading
+import time
+from urllib.parse import urlencode
+
+import requests
+from django.core.management.base import BaseCommand, CommandError
+
+
+def tiempo_cpu_proceso(pid):
+    try:
+        import psutil
+        tiempos = psutil.Process(pid).cpu_times()
+        return tiempos.user + tiempos.system
+    except ImportError:
+        pass
+
+    ruta_stat = f"/proc/{pid}/stat"
+    if not os.path.exists(ruta_stat):
+        return None
+    with open(ruta_stat) as f:
+        campos = f.read().rsplit(')', 1)[1].split()
+    ticks = os.sysconf(os.sysconf_names['SC_CLK_TCK'])
+    return (int(campos[11]) + int(campos[12])) / ticks
+
+
+def percentil(valores, p):
+    if not valores:
+        return 0.0
+    ordenados = sorted(valores)
+    indice = min(len(ordenados) - 1, int(round(p / 100 * (len(ordenados) - 1))))
+    return ordenados[indice]
+
+
+class ReceptorPolling(threading.Thread):
+    def __init__(self, url, intervalo, al_recibir):
+        super().__init__(daemon=True)
+        self.url = url
+        self.intervalo = intervalo
+        self.al_recibir = al_recibir
+        self.detener = threading.Event()
+        self.peticiones = 0
+
+    def run(self):
+        sesion = requests.Session()
+        ultimo_seq = None
+        while not self.detener.is_set():
+            inicio = time.perf_counter()
+            try:
+                params = {'desde': ultimo_seq} if ultimo_seq is not None else {}
+                data = sesion.get(self.url, params=params, timeout=1).json()
+                self.peticiones += 1
+                for evento in data.get('comandos', []):
+                    self.al_recibir(evento['comando'])
+                ultimo_seq = data.get('ultimo_seq', ultimo_seq)
+            except requests.RequestException:
+                pass
+            espera = self.intervalo - (time.perf_counter() - inicio)
+            if espera > 0:
+                self.detener.wait(espera)
+
+
+class ReceptorStream(threading.Thread):
+    def __init__(self, url, al_recibir):
+        super().__init__(daemon=True)
+        self.url = url
+        self.al_recibir = al_recibir
+        self.detener = threading.Event()
+        self.conectado = threading.Event()
+        self.error = None
+        self.peticiones = 0
+
+    def run(self):
+        try:
+            with requests.get(self.url, stream=True, timeout=(2, 30)) as response:
+                if response.status_code != 200:
+                    self.error = f"HTTP {response.status_code}"
+                    self.conectado.set()
+                    return
+                self.peticiones += 1
+                self.conectado.set()
+                for linea in response.iter_lines(decode_unicode=True):
+                    if self.detener.is_set():
+                        break
+                    if linea and linea.startswith('data: '):
+                        data = json.loads(linea[6:])
+                        if data.get('comando'):
+                            self.al_recibir(data['comando'])
+        except requests.RequestException as e:
+            self.error = str(e)
+            self.conectado.set()
+
+
+class Command(BaseCommand):
+    help = "Compara latencia y CPU del servidor entre polling y stream SSE de comandos"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--url', default='http://127.0.0.1:8000',
+                            help='URL base del servidor Django en ejecución')
+        parser.add_argument('--duracion', type=float, default=30.0,
+                            help='Segundos de prueba por transporte')
+        parser.add_argument('--intervalo-envio', type=float, default=0.05,
+                            help='Segundos entre comandos simulados del detector')
+        parser.add_argument('--intervalo-polling', type=float, default=0.1)
+        parser.add_argument('--pid-servidor', type=int, default=None,
+                            help='PID del servidor para medir su uso de CPU')
+        parser.add_argument('--transportes', default='polling,stream')
+        parser.add_argument('--sesion', required=True,
+                            help='Sesión de un detector registrado (la de una página de presentación abierta)')
+
+    def handle(self, *args, **options):
+        base = options['url'].rstrip('/')
+        consulta = urlencode({'sesion': options['sesion']})
+        url_comando = f"{base}/comando-gesto/?{consulta}"
+        url_stream = f"{base}/comando-gesto/stream/?{consulta}"
+
+        resultados = []
+        for transporte in options['transportes'].split(','):
+            transporte = transporte.strip()
+            if transporte == 'polling':
+                resultados.append(self.medir(transporte, url_comando, options,
+                    lambda al_recibir: ReceptorPolling(url_comando, options['intervalo_polling'], al_recibir)))
+            elif transporte == 'stream':
+                resultados.append(self.medir(transporte, url_comando, options,
+                    lambda al_recibir: ReceptorStream(url_stream, al_recibir)))
+            else:
+                raise CommandError(f"Transporte desconocido: {transporte}")
+
+        self.stdout.write("=" * 60)
+        self.stdout.write(f"{'transporte':<10} {'recibidos':>10} {'perdidos':>9} {'p50 ms':>8} "
+                          f"{'p95 ms':>8} {'peticiones':>11} {'CPU s/min':>10}")
+        for r in resultados:
+            cpu = f"{r['cpu_por_minuto']:.2f}" if r['cpu_por_minuto'] is not None else 'n/d'
+            self.stdout.write(f"{r['transporte']:<10} {r['recibidos']:>10} {r['perdidos']:>9} "
+                              f"{r['p50']:>8.1f} {r['p95']:>8.1f} {r['peticiones']:>11} {cpu:>10}")
+
+    def medir(self, transporte, url_comando, options, crear_receptor):
+        enviados = {}
+        latencias = []
+        lock = threading.Lock()
+
+        def al_recibir(comando):
+            ahora = time.perf_counter()
+            with lock:
+                inicio = enviados.pop(comando, None)
+            if inicio is not None:
+                latencias.append((ahora - inicio) * 1000)
+
+        receptor = crear_receptor(al_recibir)
+        receptor.start()
+        if isinstance(receptor, ReceptorStream):
+            receptor.conectado.wait(5)
+            if receptor.error:
+                raise CommandError(f"Stream no disponible ({receptor.error}). "
+                                   "Ejecuta el servidor con uvicorn CPG.asgi:application")
+
+        pid = options['pid_servidor']
+        cpu_inicio = tiempo_cpu_proceso(pid) if pid else None
+        self.stdout.write(f"Midiendo {transporte} durante {options['duracion']:.0f}s...")
+
+        sesion = requests.Session()
+        total_enviados = 0
+        inicio_prueba = time.perf_counter()
+        while time.perf_counter() - inicio_prueba < options['duracion']:
+            total_enviados += 1
+            comando = f"drawing_{(total_enviados % 1000) / 1000:.3f}_{(total_enviados // 1000) % 1000 / 1000:.3f}"
+            with lock:
+                enviados[comando] = time.perf_counter()
+            try:
+                sesion.post(url_comando, json={'comando': comando}, timeout=1)
+            except requests.RequestException:
+                pass
+            time.sleep(options['intervalo_envio'])
+
+        time.sleep(0.5)
+        duracion_real = time.perf_counter() - inicio_prueba
+        receptor.detener.set()
+
+        cpu_por_minuto = None
+        if cpu_inicio is not None:
+            cpu_fin = tiempo_cpu_proceso(pid)
+            if cpu_fin is not None:
+                cpu_por_minuto = (cpu_fin - cpu_inicio) / duracion_real * 60
+
+        return {
+            'transporte': transporte,
+            'recibidos': len(latencias),
+            'perdidos': total_enviados - len(latencias),
+            'p50': statistics.median(latencias) if latencias else 0.0,
+            'p95': percentil(latencias, 95),
+            'peticiones': receptor.peticiones,
+            'cpu_por_minuto': cpu_por_minuto,
+        }
@@ -0,0 +1,131 @@
+import io
+import json
+
+import numpy as np
+from django.core.management.base import BaseCommand, CommandError, OutputWrapper
+
+from presentaciones.canal_comandos import tipo_comando
+from presentaciones.fuentes_gestos import FuenteLandmarks, FPS_POR_DEFECTO
+from presentaciones.management.commands.detectar_gestos import Command as Detector
+from presentaciones.transporte_gestos import TransporteNulo, AgrupadorComandos
+
+TIPOS_CONTINUOS = ('puntero', 'moving', 'drawing', 'erasing')
+
+
+class TransporteRegistro(TransporteNulo):
+    def __init__(self, latencia_ms=0.0):
+        super().__init__(latencia_ms)
+        self.comandos = []
+
+    def enviar(self, comando, tipo_comando):
+        self.comandos.append(comando)
+        return super().enviar(comando, tipo_comando)
+
+
+def reconstruir_trazos(comandos):
+    # Los mismos trazos que arma presentar.js: el punto de start_* y luego todos los de drawing_/erasing_.
+    trazos = []
+    actual = None
+    for comando in comandos:
+        tipo = tipo_comando(comando)
+        if tipo in ('start_draw', 'start_erase'):
+            partes = comando.split('_')
+            actual = [(float(partes[2]), float(partes[3]))]
+            trazos.append(actual)
+        elif tipo in ('drawing', 'erasing') and actual is not None:
+            valores = [float(v) for v in comando.split('_')[1:]]
+            actual.extend(zip(valores[::2], valores[1::2]))
+        elif tipo in ('stop_draw', 'stop_erase'):
+            actual = None
+    return trazos
+
+
+def distancias_a_polilinea(puntos, polilinea):
+    puntos = np.asarray(puntos, dtype=np.float64)
+    polilinea = np.asarray(polilinea, dtype=np.float64)
+    if len(polilinea) == 1:
+        return np.linalg.norm(puntos - polilinea[0], axis=1)
+    inicio, fin = polilinea[:-1][None], polilinea[1:][None]
+    segmento = fin - inicio
+    relativo = puntos[:, None, :] - inicio
+    t = np.clip((relativo * segmento).sum(-1) / np.maximum((segmento * segmento).sum(-1), 1e-12), 0, 1)
+    return np.linalg.norm(relativo - t[..., None] * segmento, axis=-1).min(axis=1)
+
+
+class Command(BaseCommand):
+    help = "Compara cuántos mensajes genera una sesión de dibujo grabada con y sin agrupar los puntos continuos"
+
+    def add_arguments(self, parser):
+        parser.add_argument('sesion', help='Landmarks grabados con detectar_gestos --record (.jsonl)')
+        parser.add_argument('--fps', type=float, default=FPS_POR_DEFECTO)
+        parser.add_argument('--latencia-ms', type=float, nargs='+', default=[0.0, 50.0, 150.0],
+                            help='Latencias simuladas del servidor con las que se agrupa')
+
+    def _reproducir(self, ruta, fps, agrupar, latencia_ms):
+        detector = Detector()
+        detector.stdout = OutputWrapper(io.StringIO())
+        detector.transporte = TransporteRegistro(latencia_ms)
+        if agrupar:
+            detector.agrupador = AgrupadorComandos(detector.transmitir, detector.transporte.latencia_reciente)
+
+        fuente = FuenteLandmarks(ruta, fps)
+        forma = None
+        try:
+            while True:
+                ret, frame, manos, tiempo = fuente.leer()
+                if not ret:
+                    break
+                forma = frame.shape[:2]
+                detector.tiempo_fuente = tiempo
+                detector.comandos_frame = []
+                detector.procesar_manos(frame, manos)
+                if detector.agrupador:
+                    detector.agrupador.revisar(tiempo)
+            if detector.agrupador:
+                detector.agrupador.vaciar(detector.ahora())
+        finally:
+            fuente.release()
+        return detector.transporte.comandos, forma
+
+    def _fidelidad(self, referencia, agrupados, forma):
+        alto, ancho = forma
+        trazos_ref = reconstruir_trazos(referencia)
+        trazos_agr = reconstruir_trazos(agrupados)
+        if len(trazos_ref) != len(trazos_agr):
+            return None
+        distancias = [
+            distancias_a_polilinea(np.asarray(ref) * (ancho, alto), np.asarray(agr) * (ancho, alto))
+            for ref, agr in zip(trazos_ref, trazos_agr)
+        ]
+        distancias = np.concatenate(distancias) if distancias else np.zeros(1)
+        return float(distancias.mean()), float(distancias.max())
+
+    def handle(self, *args, **options):
+        referencia, forma = self._reproducir(options['sesion'], options['fps'], False, 0.0)
+        if forma is None:
+            raise CommandError("La sesión no contiene frames")
+        if not reconstruir_trazos(referencia):
+            self.stdout.write(self.style.WARNING("La sesión no contiene trazos de dibujo o borrado"))
+
+        def resumen(comandos):
+            continuos = [c for c in comandos if tipo_comando(c) in TIPOS_CONTINUOS]
+            bytes_enviados = sum(len(json.dumps({'comando': c})) for c in comandos)
+            return len(comandos), len(continuos), bytes_enviados
+
+        mensajes_ref, continuos_ref, bytes_ref = resumen(referencia)
+        self.stdout.write(f"Sesión: {options['sesion']} ({forma[1]}x{forma[0]})")
+        self.stdout.write(f"{'modo':<22} {'mensajes':>9} {'continuos':>10} {'bytes':>9} {'reducción':>10} "
+                          f"{'error medio px':>15} {'error máx px':>13}")
+        self.stdout.write(f"{'un punto por mensaje':<22} {mensajes_ref:>9} {continuos_ref:>10} {bytes_ref:>9} "
+                          f"{'1.00x':>10} {'-':>15} {'-':>13}")
+
+        for latencia in options['latencia_ms']:
+            agrupados, _ = self._reproducir(options['sesion'], options['fps'], True, latencia)
+            mensajes, continuos, bytes_enviados = resumen(agrupados)
+            fidelidad = self._fidelidad(referencia, agrupados, forma)
+            reduccion = f"{mensajes_ref / mensajes:.2f}x" if mensajes else '-'
+            error_medio, error_maximo = (f"{fidelidad[0]:.2f}", f"{fidelidad[1]:.2f}") if fidelidad else ('-', '-')
+            self.stdout.write(f"{f'agrupado RTT {latencia:.0f} ms':<22} {mensajes:>9} {continuos:>10} "
+                              f"{bytes_enviados:>9} {reduccion:>10} {error_medio:>15} {error_maximo:>13}")
+            if fidelidad is None:
+                self.stdout.write(self.style.WARNING("  El número de trazos no coincide con la referencia"))
@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand
+
+from presentaciones.cache_drive import cache_drive
+
+
+class Command(BaseCommand):
+    help = "Muestra las estadísticas de la caché local de presentaciones de Drive"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--vaciar', action='store_true', help='Eliminar todas las presentaciones en caché')
+
+    def handle(self, *args, **options):
+        if options['vaciar']:
+            eliminados = cache_drive.vaciar()
+            self.stdout.write(f"Eliminados {eliminados} archivos de {cache_drive.directorio}")
+            return
+
+        estadisticas = cache_drive.estadisticas()
+        mb = 1024 * 1024
+        self.stdout.write(f"Directorio: {cache_drive.directorio}")
+        self.stdout.write(f"Archivos: {estadisticas['archivos']} "
+                          f"({estadisticas['tamano_bytes'] / mb:.1f} / {estadisticas['tamano_maximo_bytes'] / mb:.0f} MB)")
+        self.stdout.write(f"Aciertos: {estadisticas['aciertos']} | Fallos: {estadisticas['fallos']} "
+                          f"| Tasa de aciertos: {estadisticas['tasa_aciertos']:.1%}")
+        self.stdout.write(f"Descargado: {estadisticas['bytes_descargados'] / mb:.1f} MB | "
+                          f"Ahorrado: {estadisticas['bytes_ahorrados'] / mb:.1f} MB | "
+                          f"Expulsados: {estadisticas['expulsados']}")
+        self.stdout.write(f"Miniaturas generadas sin descargar de Drive: {estadisticas['descargas_evitadas']} "
+                          f"({estadisticas['bytes_evitados'] / mb:.1f} MB evitados)")
@@ -1,14 +1,26 @@
 import cv2
 import mediapipe as mp
-from django.core.management.base import BaseCommand
-import requests
+from django.core.management.base import BaseCommand, CommandError
+import os
 import time
 import math
+import threading
+from contextlib import nullcontext
+from presentaciones.transporte_gestos import TransporteComandos, TransporteNulo, LatidoDetector, AgrupadorComandos
+from presentaciones.fuentes_gestos import abrir_fuente, FuenteLandmarks, GrabadorSesion
+from presentaciones.clasificador_gestos import GestosFrame, landmarks_a_array
+from presentaciones.roi_manos import InferenciaAdaptativa, ANCHO_INFERENCIA, INTERVALO_BUSQUEDA
+from presentaciones.filtros_landmarks import PredictorVelocidadConstante, ControlZancada
+from presentaciones.pipeline_gestos import UltimoValor, ColaDescarte, EstadisticasEtapa, HiloCaptura
+from presentaciones.protocolo_comandos import FORMATOS, FORMATO_POR_DEFECTO
+from presentaciones.buffers_frames import PoolFrames, BufferReutilizable, CapasHud, espejar, convertir_rgb
 
 URL_ACTUALIZAR_COMANDO = "http://127.0.0.1:8000/comando-gesto/"
+URL_LATIDO_DETECTOR = "http://127.0.0.1:8000/detector/latido/"
 
 mp_hands = mp.solutions.hands
-mp_drawing = mp.solutions.drawing_utils
+
+FIN_PIPELINE = object()
 
 class Command(BaseCommand):
     help = "Detector de gestos con sistema de dibujo mejorado"
@@ -35,8 +47,19 @@ class Command(BaseCommand):
             'stop_move': 0.1,
         }
         
-        self.ultimos_tiempos = {key: 0 for key in self.COOLDOWNS.keys()}
-        self.errores_consecutivos = 0
+        self.ultimos_tiempos = {key: float('-inf') for key in self.COOLDOWNS.keys()}
+        self.transporte = None
+        self.agrupador = None
+        self.grabador = None
+        self.comandos_frame = []
+        self.tiempo_fuente = None
+        self.inferencia_adaptativa = None
+        self.latido = None
+        self.predictor = PredictorVelocidadConstante()
+        self.control_zancada = ControlZancada()
+        self.pool_frames = PoolFrames()
+        self.buffer_rgb = BufferReutilizable()
+        self.hud = CapasHud()
         
         self.modo_dibujo_activo = False
         self.esta_dibujando = False
@@ -50,20 +73,39 @@ class Command(BaseCommand):
         self.TOLERANCIA_PUNO = 0.035
         self.TOLERANCIA_PAZ = 0.04
         self.TOLERANCIA_CUERNOS = 0.04
+        self.tolerancias = {
+            'pulgar_pistola': self.TOLERANCIA_PULGAR_PISTOLA,
+            'direccion_pistola': self.TOLERANCIA_DIRECCION_PISTOLA,
+            'puno': self.TOLERANCIA_PUNO,
+            'paz': self.TOLERANCIA_PAZ,
+            'cuernos': self.TOLERANCIA_CUERNOS,
+        }
 
         self.mostrar_feedback_toggle = False
         self.tiempo_inicio_feedback = 0
         self.duracion_feedback = 0.5
 
+        self.distancia_referencia = None
+        self.zoom_activo = False
+        self.ultimo_zoom = 1.0
+        self.contador_zoom = 0
+        self.punto_zoom_x = 0.5
+        self.punto_zoom_y = 0.5
+        self.puntero_activo = False
+
+    def ahora(self):
+        # Con fuentes grabadas el reloj es el de la grabación, para que los cooldowns sean deterministas.
+        return self.tiempo_fuente if self.tiempo_fuente is not None else time.time()
+
     def puede_enviar_comando(self, tipo_comando):
-        tiempo_actual = time.time()
+        tiempo_actual = self.ahora()
         tiempo_ultimo = self.ultimos_tiempos.get(tipo_comando, 0)
         cooldown = self.COOLDOWNS.get(tipo_comando, 0.1)
         puede_enviar = (tiempo_actual - tiempo_ultimo) >= cooldown
         return puede_enviar
 
     def obtener_tiempo_restante(self, tipo_comando):
-        tiempo_actual = time.time()
+        tiempo_actual = self.ahora()
         tiempo_ultimo = self.ultimos_tiempos.get(tipo_comando, 0)
         cooldown = self.COOLDOWNS.get(tipo_comando, 0.1)
         
@@ -73,574 +115,629 @@ class Command(BaseCommand):
     def enviar_comando(self, comando, tipo_comando):
         if not self.puede_enviar_comando(tipo_comando):
             return False
-        try:
-            response = requests.post(
-                URL_ACTUALIZAR_COMANDO, 
-                json={"comando": comando},
-                timeout=0.5)
-            if response.status_code == 200:
-                self.ultimos_tiempos[tipo_comando] = time.time() 
-
-                self.errores_consecutivos = 0
-                if tipo_comando in ['next', 'prev', 'toggle_draw_mode', 'clear_drawings']:
-                    self.stdout.write(f"Comando enviado: {comando}")
-                return True
-            else:
-                self.errores_consecutivos += 1
-                if self.errores_consecutivos <= 3:
-                    self.stderr.write(f"HTTP {response.status_code}")
-                return False
-        except requests.exceptions.Timeout:
-            self.errores_consecutivos += 1
-            if self.errores_consecutivos == 1:
-                self.stderr.write(f"Timeouts detectados (normal)")
-            return False
-
-        except requests.exceptions.ConnectionError:
-            self.errores_consecutivos += 1
-            if self.errores_consecutivos <= 3:
-                self.stderr.write(f"Error de conexión: {URL_ACTUALIZAR_COMANDO}")
-            return False
-
-        except Exception as e:
-            self.errores_consecutivos += 1
-            if self.errores_consecutivos <= 2:
-                self.stderr.write(f" Error: {type(e).__name__}")
+        if self.agrupador:
+            # Los puntos acumulados salen antes, p. ej. el final del trazo antes de stop_draw.
+            self.agrupador.vaciar(self.ahora())
+            self.agrupador.reiniciar()
+        return self.transmitir(comando, tipo_comando)
+
+    def enviar_punto(self, tipo_comando, x, y):
+        if self.agrupador:
+            self.agrupador.agregar(tipo_comando, x, y, self.ahora())
+        else:
+            self.enviar_comando(f"{tipo_comando}_{x:.3f}_{y:.3f}", tipo_comando)
+
+    def transmitir(self, comando, tipo_comando):
+        if not self.transporte.enviar(comando, tipo_comando):
             return False
 
-    def calcular_distancia(self, punto1, punto2, ancho_frame, alto_frame):
-        x1, y1 = punto1.x * ancho_frame, punto1.y * alto_frame
-        x2, y2 = punto2.x * ancho_frame, punto2.y * alto_frame
-        return math.sqrt((x2 - x1)**2 + (y2 - y1)**2)
-
-    def detectar_gesto_paz(self, hand_landmarks):
-        landmarks = hand_landmarks.landmark
-        
-        indice_extendido = landmarks[8].y < landmarks[6].y - 0.03
-        medio_extendido = landmarks[12].y < landmarks[10].y - 0.03
-        separacion_dedos = abs(landmarks[8].x - landmarks[12].x) > self.TOLERANCIA_PAZ * 1.3
-        anular_doblado = landmarks[16].y > landmarks[14].y + 0.01
-        menique_doblado = landmarks[20].y > landmarks[18].y + 0.01
-        pulgar_controlado = abs(landmarks[4].x - landmarks[3].x) < self.TOLERANCIA_PAZ * 1.5
-        
-        return (indice_extendido and medio_extendido and separacion_dedos and 
-                anular_doblado and menique_doblado and pulgar_controlado)
-
-    def detectar_gesto_cuernos(self, hand_landmarks):
-        landmarks = hand_landmarks.landmark
-        
-        indice_extendido = landmarks[8].y < landmarks[6].y - 0.025
-        menique_extendido = landmarks[20].y < landmarks[18].y - 0.025
-        medio_doblado = landmarks[12].y > landmarks[10].y
-        anular_doblado = landmarks[16].y > landmarks[14].y
-        indice_mas_alto = landmarks[8].y < landmarks[12].y - 0.02
-        menique_mas_alto = landmarks[20].y < landmarks[16].y - 0.02
-        
-        return (indice_extendido and menique_extendido and 
-                medio_doblado and anular_doblado and 
-                indice_mas_alto and menique_mas_alto)
-
-    def detectar_mano_abierta_completa(self, hand_landmarks):
-        landmarks = hand_landmarks.landmark
-        
-        pulgar_extendido = abs(landmarks[4].x - landmarks[3].x) > 0.025
-        indice_extendido = landmarks[8].y < landmarks[6].y - 0.01
-        medio_extendido = landmarks[12].y < landmarks[10].y - 0.01
-        anular_extendido = landmarks[16].y < landmarks[14].y - 0.01
-        menique_extendido = landmarks[20].y < landmarks[18].y - 0.01
-        
-        dedos_extendidos = sum([
-            pulgar_extendido, indice_extendido, medio_extendido, 
-            anular_extendido, menique_extendido
-        ])
-        
-        return dedos_extendidos >= 4
-
-    def detectar_gesto_pistola(self, hand_landmarks):
-        landmarks = hand_landmarks.landmark
-        
-        pulgar_tip = landmarks[mp_hands.HandLandmark.THUMB_TIP]
-        pulgar_mcp = landmarks[mp_hands.HandLandmark.THUMB_MCP]
-        indice_tip = landmarks[mp_hands.HandLandmark.INDEX_FINGER_TIP]
-        indice_mcp = landmarks[mp_hands.HandLandmark.INDEX_FINGER_MCP]
-        medio_tip = landmarks[mp_hands.HandLandmark.MIDDLE_FINGER_TIP]
-        medio_pip = landmarks[mp_hands.HandLandmark.MIDDLE_FINGER_PIP]
-        anular_tip = landmarks[mp_hands.HandLandmark.RING_FINGER_TIP]
-        anular_pip = landmarks[mp_hands.HandLandmark.RING_FINGER_PIP]
-        menique_tip = landmarks[mp_hands.HandLandmark.PINKY_TIP]
-        menique_pip = landmarks[mp_hands.HandLandmark.PINKY_PIP]
-        
-        indice_extendido = indice_tip.y < indice_mcp.y
-        pulgar_extendido = abs(pulgar_tip.x - pulgar_mcp.x) > self.TOLERANCIA_PULGAR_PISTOLA
-        medio_doblado = medio_tip.y > medio_pip.y
-        anular_doblado = anular_tip.y > anular_pip.y
-        menique_doblado = menique_tip.y > menique_pip.y
-        
-        if indice_extendido and pulgar_extendido and medio_doblado and anular_doblado and menique_doblado:
-            if indice_tip.x > indice_mcp.x + self.TOLERANCIA_DIRECCION_PISTOLA:
-                return 'pistola_derecha'
-            elif indice_tip.x < indice_mcp.x - self.TOLERANCIA_DIRECCION_PISTOLA:
-                return 'pistola_izquierda'
-        
-        return None
-
-    def detectar_puno(self, hand_landmarks):
-        landmarks = hand_landmarks.landmark
-        
-        indice_doblado = landmarks[8].y > landmarks[6].y
-        medio_doblado = landmarks[12].y > landmarks[10].y
-        anular_doblado = landmarks[16].y > landmarks[14].y
-        menique_doblado = landmarks[20].y > landmarks[18].y
-        pulgar_doblado = abs(landmarks[4].x - landmarks[3].x) < self.TOLERANCIA_PUNO
-        
-        return (indice_doblado and medio_doblado and anular_doblado and 
-                menique_doblado and pulgar_doblado)
-
-    def obtener_posicion_puntero(self, hand_landmarks):
-        centro_palma = hand_landmarks.landmark[0]
-        dedo_medio_mcp = hand_landmarks.landmark[9]
-        
-        centro_x = (centro_palma.x + dedo_medio_mcp.x) / 2
-        centro_y = (centro_palma.y + dedo_medio_mcp.y) / 2
-        
-        return centro_x, centro_y
-    
-    def obtener_posicion_indice(self, hand_landmarks):
-        indice_tip = hand_landmarks.landmark[8]
-        return indice_tip.x, indice_tip.y
-
-    def detectar_manos_abiertas(self, hands_results):
-        if not hands_results.multi_hand_landmarks:
-            return 0, []
-        
-        manos_abiertas = 0
-        dedos_por_mano = []
-        
-        for hand_landmarks in hands_results.multi_hand_landmarks:
-            dedos = self.contar_dedos_extendidos(hand_landmarks)
-            dedos_por_mano.append(dedos)
-            if dedos >= 3:
-                manos_abiertas += 1
-        
-        return manos_abiertas, dedos_por_mano
-
-    def contar_dedos_extendidos(self, hand_landmarks):
-        landmarks = hand_landmarks.landmark
-        dedos = 0
-        
-        if abs(landmarks[4].x - landmarks[3].x) > 0.04:
-            dedos += 1
-        
-        finger_tips = [8, 12, 16, 20]
-        finger_mcps = [5, 9, 13, 17]
-        
-        for i, tip in enumerate(finger_tips):
-            if landmarks[tip].y < landmarks[finger_mcps[i]].y:
-                dedos += 1
-        
-        return dedos
-    
-    def detectar_pulgar_arriba(self, hand_landmarks):
-        landmarks = hand_landmarks.landmark
-        margen_seguridad = 0.05
-        
-        pulgar_arriba = landmarks[4].y < landmarks[0].y - 0.1
-        
-        pulgar_mas_alto = (landmarks[4].y < landmarks[8].y - margen_seguridad and 
-                        landmarks[4].y < landmarks[12].y - margen_seguridad and
-                        landmarks[4].y < landmarks[16].y - margen_seguridad and
-                        landmarks[4].y < landmarks[20].y - margen_seguridad)
-
-        indice_doblado = landmarks[8].y > landmarks[6].y + 0.02
-        medio_doblado = landmarks[12].y > landmarks[10].y + 0.02
-        anular_doblado = landmarks[16].y > landmarks[14].y + 0.02
-        menique_doblado = landmarks[20].y > landmarks[18].y + 0.02
-
-        orientacion_vertical = landmarks[0].y > landmarks[9].y
-        
-        return (pulgar_arriba and pulgar_mas_alto and orientacion_vertical and
-                indice_doblado and medio_doblado and anular_doblado and menique_doblado)
-    
-    def detectar_gesto_pinza(self, hand_landmarks, ancho_frame, alto_frame):
-        landmarks = hand_landmarks.landmark
-        
-        pulgar_tip = landmarks[4]
-        indice_tip = landmarks[8]
-        
-        distancia = self.calcular_distancia(pulgar_tip, indice_tip, ancho_frame, alto_frame)
-        return distancia < 30
+        self.ultimos_tiempos[tipo_comando] = self.ahora()
+        self.comandos_frame.append(comando)
+        if tipo_comando in ['next', 'prev', 'toggle_draw_mode', 'clear_drawings']:
+            self.stdout.write(f"Comando enviado: {comando}")
+        return True
+
+    def mostrar_estadisticas_envio(self, frame, alto_frame):
+        stats = self.transporte.estadisticas()
+        texto = (f"TX {stats['enviados']} | ERR {stats['errores']} | "
+                 f"COLA {stats['en_cola']} | {stats['latencia_media_ms']:.1f}ms "
+                 f"(p95 {stats['latencia_p95_ms']:.1f}ms)")
+        color = (0, 0, 255) if stats['errores'] and self.transporte.errores_consecutivos else (180, 180, 180)
+        cv2.putText(frame, texto, (10, alto_frame - 55),
+                    cv2.FONT_HERSHEY_SIMPLEX, 0.45, color, 1)
+
+    def resumen_envio(self):
+        stats = self.transporte.estadisticas()
+        self.stdout.write("="*60)
+        self.stdout.write("Resumen de envío de comandos:")
+        self.stdout.write(f"  Enviados: {stats['enviados']}")
+        self.stdout.write(f"  Errores: {stats['errores']} {stats['errores_por_tipo'] or ''}")
+        self.stdout.write(f"  Descartados por cola llena: {stats['descartados']}")
+        self.stdout.write(f"  Caducados antes de enviarse: {stats['caducados']}")
+        self.stdout.write(f"  Latencia media: {stats['latencia_media_ms']:.1f} ms (p95 {stats['latencia_p95_ms']:.1f} ms)")
+        if self.agrupador:
+            agrupados = self.agrupador.estadisticas()
+            self.stdout.write(f"  Puntos continuos: {agrupados['recibidos']} recibidos, {agrupados['filtrados']} "
+                              f"bajo el umbral, {agrupados['puntos_enviados']} enviados en {agrupados['mensajes']} mensajes "
+                              f"(intervalo final {agrupados['intervalo_ms']:.0f} ms)")
+        self.stdout.write("="*60)
 
     def mostrar_feedback_toggle_modo(self, frame, ancho_frame, alto_frame):
-        tiempo_actual = time.time()
+        tiempo_actual = self.ahora()
         
         if self.mostrar_feedback_toggle:
             tiempo_transcurrido = tiempo_actual - self.tiempo_inicio_feedback
             
             if tiempo_transcurrido < self.duracion_feedback:
                 alpha = 1.0 - (tiempo_transcurrido / self.duracion_feedback)
-                overlay = frame.copy()
                 
                 if self.modo_dibujo_activo:
-                    cv2.rectangle(overlay, (0, 0), (ancho_frame, alto_frame), (0, 255, 0), 30)
                     texto = "MODO DIBUJO: ACTIVADO"
                     color = (0, 255, 0)
                 else:
-                    cv2.rectangle(overlay, (0, 0), (ancho_frame, alto_frame), (0, 0, 255), 30)
                     texto = "MODO DIBUJO: DESACTIVADO"
                     color = (0, 0, 255)
                 
-                tamaño_texto = cv2.getTextSize(texto, cv2.FONT_HERSHEY_SIMPLEX, 1.8, 5)[0]
-                x_centrado = (ancho_frame - tamaño_texto[0]) // 2
+                # Solo se mezclan el borde y el texto, sin copiar ni recorrer el frame completo.
+                self.hud.mezclar_borde(frame, color, 30, alpha * 0.7)
+                x_centrado = (ancho_frame - self.hud.ancho_texto(texto, 1.8, 5)) // 2
                 y_centrado = alto_frame // 2
-                
-                cv2.putText(overlay, texto, (x_centrado, y_centrado),
-                           cv2.FONT_HERSHEY_SIMPLEX, 1.8, color, 5)
-                
-                cv2.addWeighted(overlay, alpha * 0.7, frame, 1 - (alpha * 0.7), 0, frame)
+                self.hud.texto(frame, texto, (x_centrado, y_centrado), 1.8, color, 5, peso=alpha * 0.7)
             else:
                 self.mostrar_feedback_toggle = False
 
-    def handle(self, *args, **kwargs):
-        self.stdout.write("="*60)
-        self.stdout.write("Iniciando detector de gestos...")
-        self.stdout.write(f"URL: {URL_ACTUALIZAR_COMANDO}")
-        self.stdout.write("="*60)
-        
-        cap = cv2.VideoCapture(0)
-        if not cap.isOpened():
-            self.stderr.write("Error: No se puede abrir la cámara.")
-            return
-
-        distancia_referencia = None
-        zoom_activo = False
-        ultimo_zoom = 1.0
-        contador_zoom = 0
-        
-        punto_zoom_x = 0.5
-        punto_zoom_y = 0.5
-        puntero_activo = False
-
-        with mp_hands.Hands(
-            min_detection_confidence=0.7,
-            min_tracking_confidence=0.5,
-            max_num_hands=2
-        ) as hands:
-            while cap.isOpened():
-                ret, frame = cap.read()
-                if not ret:
-                    break
+    def dibujar_manos(self, frame, manos):
+        alto_frame, ancho_frame, _ = frame.shape
+        for mano in manos:
+            puntos = [(int(x * ancho_frame), int(y * alto_frame)) for x, y in mano[:, :2].tolist()]
+            for inicio, fin in mp_hands.HAND_CONNECTIONS:
+                cv2.line(frame, puntos[inicio], puntos[fin], (0, 255, 0), 2)
+            for punto in puntos:
+                cv2.circle(frame, punto, 2, (0, 0, 255), -1)
 
-                frame = cv2.flip(frame, 1)
-                alto_frame, ancho_frame, _ = frame.shape
-                rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-                results = hands.process(rgb)
-
-                if results.multi_hand_landmarks:
-                    num_manos = len(results.multi_hand_landmarks)
-                    manos_abiertas, dedos_por_mano = self.detectar_manos_abiertas(results)
-                    
-                    if num_manos == 2 and manos_abiertas >= 1 and not self.modo_dibujo_activo:
-                        puntero_activo = False
-                        contador_zoom += 1
-                        
-                        if contador_zoom >= self.FRAMES_PREPARACION_ZOOM:
-                            zoom_activo = True
-                            
-                            pulgar1 = results.multi_hand_landmarks[0].landmark[mp_hands.HandLandmark.THUMB_TIP]
-                            pulgar2 = results.multi_hand_landmarks[1].landmark[mp_hands.HandLandmark.THUMB_TIP]
-                            
-                            distancia_actual = self.calcular_distancia(pulgar1, pulgar2, ancho_frame, alto_frame)
-                            
-                            if distancia_referencia is None:
-                                distancia_referencia = distancia_actual
-                                ultimo_zoom = 1.0
-                            
-                            factor_zoom = distancia_actual / distancia_referencia
-                            factor_zoom = max(0.3, min(4.0, factor_zoom))
-                            
-                            if abs(factor_zoom - ultimo_zoom) > self.SENSIBILIDAD_ZOOM:
-                                comando_zoom = f"zoom_{factor_zoom:.1f}_{punto_zoom_x:.2f}_{punto_zoom_y:.2f}"
-                                if self.enviar_comando(comando_zoom, 'zoom'):
-                                    ultimo_zoom = factor_zoom
-                            
-                            cv2.putText(frame, f"ZOOM: {factor_zoom:.1f}x", (10, 30),
-                                        cv2.FONT_HERSHEY_SIMPLEX, 1, (255, 0, 0), 2)
-                            
-                            pulgar1_px = (int(pulgar1.x * ancho_frame), int(pulgar1.y * alto_frame))
-                            pulgar2_px = (int(pulgar2.x * ancho_frame), int(pulgar2.y * alto_frame))
-                            cv2.line(frame, pulgar1_px, pulgar2_px, (255, 0, 0), 5)
-                            cv2.circle(frame, pulgar1_px, 12, (0, 255, 0), -1)
-                            cv2.circle(frame, pulgar2_px, 12, (0, 255, 0), -1)
-                    
-                    elif num_manos == 1:
-                        contador_zoom = 0
-                        hand_landmarks = results.multi_hand_landmarks[0]
-                        
-                        if zoom_activo:
-                            zoom_activo = False
-                            distancia_referencia = None
-                            self.enviar_comando("zoom_1.0_0.5_0.5", 'reset')
-                            ultimo_zoom = 1.0
-                        
-                        if self.modo_dibujo_activo:
-                            if self.detectar_gesto_paz(hand_landmarks):
-                                if self.enviar_comando("toggle_draw_mode", 'toggle_draw_mode'):
-                                    self.modo_dibujo_activo = not self.modo_dibujo_activo
-                                    self.esta_dibujando = False
-                                    self.esta_borrando = False
-                                    self.esta_moviendo = False
-                                    
-                                    self.mostrar_feedback_toggle = True
-                                    self.tiempo_inicio_feedback = time.time()
-                                    
-                                    self.stdout.write(f"{'='*50}")
-                                    self.stdout.write(f"MODO DIBUJO: {'ACTIVADO ' if self.modo_dibujo_activo else 'DESACTIVADO '}")
-                                    self.stdout.write(f"{'='*50}")
-
-                                else:
-                                    tiempo_restante = self.obtener_tiempo_restante('toggle_draw_mode')
-                                    cv2.putText(frame, f"SALIR EN COOLDOWN: {tiempo_restante:.2f}s", (10, 170),
-                                        cv2.FONT_HERSHEY_SIMPLEX, 0.8, (0, 165, 255), 2)
-                        
-                            else:
-                                punto_base_x, punto_base_y = self.obtener_posicion_puntero(hand_landmarks)
-                                
-                                if self.detectar_pulgar_arriba(hand_landmarks):
-                                    if self.enviar_comando("clear_drawings", 'clear_drawings'):
-                                        cv2.putText(frame, "LIMPIANDO DIBUJOS", (10, 130),
-                                                    cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 255, 255), 3)
-                                        self.esta_dibujando = False
-                                        self.esta_borrando = False
-                                        self.esta_moviendo = False
-
-                                elif self.detectar_gesto_pinza(hand_landmarks, ancho_frame, alto_frame):
-                                    if not self.esta_moviendo:
-                                        self.esta_moviendo = True
-                                        self.esta_dibujando = False
-                                        self.esta_borrando = False
-                                        comando_move = f"start_move_{punto_base_x:.3f}_{punto_base_y:.3f}"
-                                        self.enviar_comando(comando_move, 'start_move')
-                                    else:
-                                        comando_move = f"moving_{punto_base_x:.3f}_{punto_base_y:.3f}"
-                                        self.enviar_comando(comando_move, 'moving')
-
-                                    puntero_px = (int(punto_base_x * ancho_frame), int(punto_base_y * alto_frame))
-                                    cv2.circle(frame, puntero_px, 20, (255, 0, 255), 3)
-
-                                elif self.detectar_gesto_cuernos(hand_landmarks):
-                                    draw_x, draw_y = self.obtener_posicion_indice(hand_landmarks)
-                                    
-                                    if self.esta_moviendo:
-                                        self.esta_moviendo = False
-                                        self.enviar_comando("stop_move", 'stop_move')
-                                
-                                    if not self.esta_dibujando:
-                                        self.esta_dibujando = True
-                                        self.esta_borrando = False
-                                        comando_draw = f"start_draw_{draw_x:.3f}_{draw_y:.3f}"
-                                        self.enviar_comando(comando_draw, 'start_draw')
-                                    else:
-                                        comando_draw = f"drawing_{draw_x:.3f}_{draw_y:.3f}"
-                                        self.enviar_comando(comando_draw, 'drawing')
-                                    
-                                    indice_px = (int(draw_x * ancho_frame), int(draw_y * alto_frame))
-                                    cv2.circle(frame, indice_px, 25, (0, 255, 0), -1)
-                                    cv2.circle(frame, indice_px, 27, (255, 255, 255), 2)
-                                    cv2.line(frame, (indice_px[0] - 10, indice_px[1]), (indice_px[0] + 10, indice_px[1]), (255, 255, 255), 2)
-                                    cv2.line(frame, (indice_px[0], indice_px[1] - 10), (indice_px[0], indice_px[1] + 10), (255, 255, 255), 2)
-
-                                elif self.detectar_mano_abierta_completa(hand_landmarks):
-                                    if self.esta_moviendo:
-                                        self.esta_moviendo = False
-                                        self.enviar_comando("stop_move", 'stop_move')
-                                    if not self.esta_borrando:
-                                        self.esta_borrando = True
-                                        self.esta_dibujando = False
-                                        comando_erase = f"start_erase_{punto_base_x:.3f}_{punto_base_y:.3f}"
-                                        self.enviar_comando(comando_erase, 'start_erase')
-                                    else:
-                                        comando_erase = f"erasing_{punto_base_x:.3f}_{punto_base_y:.3f}"
-                                        self.enviar_comando(comando_erase, 'erasing')
-                                    
-                                    puntero_px = (int(punto_base_x * ancho_frame), int(punto_base_y * alto_frame))
-                                    cv2.circle(frame, puntero_px, 25, (0, 0, 255), 4)
-                                
-                                elif self.detectar_puno(hand_landmarks):
-                                    if self.esta_dibujando:
-                                        self.esta_dibujando = False
-                                        comando_stop = f"stop_draw_{punto_base_x:.3f}_{punto_base_y:.3f}"
-                                        self.enviar_comando(comando_stop, 'stop_draw')
-                                    elif self.esta_borrando:
-                                        self.esta_borrando = False
-                                        comando_stop = f"stop_erase_{punto_base_x:.3f}_{punto_base_y:.3f}"
-                                        self.enviar_comando(comando_stop, 'stop_erase')
-                                    elif self.esta_moviendo:
-                                        self.esta_moviendo = False
-                                        self.enviar_comando("stop_move", 'stop_move')
-                                    
-                                    puntero_activo = True
-                                    comando_puntero = f"puntero_{punto_base_x:.3f}_{punto_base_y:.3f}"
-                                    self.enviar_comando(comando_puntero, 'puntero')
-                                    
-                                    puntero_px = (int(punto_base_x * ancho_frame), int(punto_base_y * alto_frame))
-                                    cv2.circle(frame, puntero_px, 25, (0, 255, 255), 3)
-                                    cv2.circle(frame, puntero_px, 5, (0, 0, 255), -1)
-                                
-                                else:
-                                    if self.esta_dibujando:
-                                        self.esta_dibujando = False
-                                        comando_stop = f"stop_draw_{punto_base_x:.3f}_{punto_base_y:.3f}"
-                                        self.enviar_comando(comando_stop, 'stop_draw')
-                                    elif self.esta_borrando:
-                                        self.esta_borrando = False
-                                        comando_stop = f"stop_erase_{punto_base_x:.3f}_{punto_base_y:.3f}"
-                                        self.enviar_comando(comando_stop, 'stop_erase')
-                                    elif self.esta_moviendo:
-                                        self.esta_moviendo = False
-                                        self.enviar_comando("stop_move", 'stop_move')
-                        
-
-                        elif self.detectar_gesto_paz(hand_landmarks):
-                            if self.enviar_comando("toggle_draw_mode", 'toggle_draw_mode'):
-                                self.modo_dibujo_activo = not self.modo_dibujo_activo
+    def procesar_manos(self, frame, manos):
+        alto_frame, ancho_frame, _ = frame.shape
+        gestos = GestosFrame(manos, ancho_frame, alto_frame, self.tolerancias)
+
+        if gestos.num_manos:
+            num_manos = gestos.num_manos
+            manos_abiertas = gestos.manos_abiertas()
+
+            if num_manos == 2 and manos_abiertas >= 1 and not self.modo_dibujo_activo:
+                self.puntero_activo = False
+                self.contador_zoom += 1
+
+                if self.contador_zoom >= self.FRAMES_PREPARACION_ZOOM:
+                    self.zoom_activo = True
+
+                    distancia_actual = gestos.distancia_pulgares()
+
+                    if self.distancia_referencia is None:
+                        self.distancia_referencia = distancia_actual
+                        self.ultimo_zoom = 1.0
+
+                    factor_zoom = distancia_actual / self.distancia_referencia
+                    factor_zoom = max(0.3, min(4.0, factor_zoom))
+
+                    if abs(factor_zoom - self.ultimo_zoom) > self.SENSIBILIDAD_ZOOM:
+                        comando_zoom = f"zoom_{factor_zoom:.1f}_{self.punto_zoom_x:.2f}_{self.punto_zoom_y:.2f}"
+                        if self.enviar_comando(comando_zoom, 'zoom'):
+                            self.ultimo_zoom = factor_zoom
+
+                    cv2.putText(frame, f"ZOOM: {factor_zoom:.1f}x", (10, 30),
+                                cv2.FONT_HERSHEY_SIMPLEX, 1, (255, 0, 0), 2)
+
+                    pulgar1_px, pulgar2_px = [tuple(punto) for punto in gestos.pulgares_px.astype(int).tolist()[:2]]
+                    cv2.line(frame, pulgar1_px, pulgar2_px, (255, 0, 0), 5)
+                    cv2.circle(frame, pulgar1_px, 12, (0, 255, 0), -1)
+                    cv2.circle(frame, pulgar2_px, 12, (0, 255, 0), -1)
+
+            elif num_manos == 1:
+                self.contador_zoom = 0
+                if self.zoom_activo:
+                    self.zoom_activo = False
+                    self.distancia_referencia = None
+                    self.enviar_comando("zoom_1.0_0.5_0.5", 'reset')
+                    self.ultimo_zoom = 1.0
+
+                if self.modo_dibujo_activo:
+                    if gestos.paz[0]:
+                        if self.enviar_comando("toggle_draw_mode", 'toggle_draw_mode'):
+                            self.modo_dibujo_activo = not self.modo_dibujo_activo
+                            self.esta_dibujando = False
+                            self.esta_borrando = False
+                            self.esta_moviendo = False
+
+                            self.mostrar_feedback_toggle = True
+                            self.tiempo_inicio_feedback = self.ahora()
+
+                            self.stdout.write(f"{'='*50}")
+                            self.stdout.write(f"MODO DIBUJO: {'ACTIVADO ' if self.modo_dibujo_activo else 'DESACTIVADO '}")
+                            self.stdout.write(f"{'='*50}")
+
+                        else:
+                            tiempo_restante = self.obtener_tiempo_restante('toggle_draw_mode')
+                            cv2.putText(frame, f"SALIR EN COOLDOWN: {tiempo_restante:.2f}s", (10, 170),
+                                cv2.FONT_HERSHEY_SIMPLEX, 0.8, (0, 165, 255), 2)
+
+                    else:
+                        punto_base_x, punto_base_y = gestos.puntero[0].tolist()
+
+                        if gestos.pulgar_arriba[0]:
+                            if self.enviar_comando("clear_drawings", 'clear_drawings'):
+                                cv2.putText(frame, "LIMPIANDO DIBUJOS", (10, 130),
+                                            cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 255, 255), 3)
                                 self.esta_dibujando = False
                                 self.esta_borrando = False
                                 self.esta_moviendo = False
-                                self.mostrar_feedback_toggle = True
-                                self.tiempo_inicio_feedback = time.time()
-                                self.stdout.write(f"{'='*50}")
-                                self.stdout.write(f"MODO DIBUJO: {'ACTIVADO ✓' if self.modo_dibujo_activo else 'DESACTIVADO ✗'}")
-                                self.stdout.write(f"{'='*50}")
+
+                        elif gestos.pinza[0]:
+                            if not self.esta_moviendo:
+                                self.esta_moviendo = True
+                                self.esta_dibujando = False
+                                self.esta_borrando = False
+                                comando_move = f"start_move_{punto_base_x:.3f}_{punto_base_y:.3f}"
+                                self.enviar_comando(comando_move, 'start_move')
                             else:
-                                tiempo_restante = self.obtener_tiempo_restante('toggle_draw_mode')
-                                cv2.putText(frame, f"ENTRAR EN COOLDOWN: {tiempo_restante:.2f}s", (10, 170),
-                                            cv2.FONT_HERSHEY_SIMPLEX, 0.8, (0, 165, 255), 2)
-                        
-                        else:
-                            gesto_pistola = self.detectar_gesto_pistola(hand_landmarks)
-                            
-                            if gesto_pistola == 'pistola_derecha':
-                                puntero_activo = False
-                                if self.enviar_comando("next", 'next'):
-                                    cv2.putText(frame, "SIGUIENTE >", (10, 130),
-                                                cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 255, 0), 3)
-                                else:
-                                    tiempo_restante = self.obtener_tiempo_restante('next')
-                                    cv2.putText(frame, f"Cooldown: {tiempo_restante:.2f}s", (10, 130),
-                                                cv2.FONT_HERSHEY_SIMPLEX, 0.8, (0, 165, 255), 2)
-                            
-                            elif gesto_pistola == 'pistola_izquierda':
-                                puntero_activo = False
-                                if self.enviar_comando("prev", 'prev'):
-                                    cv2.putText(frame, "<< ANTERIOR", (10, 130),
-                                                cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 255, 0), 3)
-                                else:
-                                    tiempo_restante = self.obtener_tiempo_restante('prev')
-                                    cv2.putText(frame, f"Cooldown: {tiempo_restante:.2f}s", (10, 130),
-                                                cv2.FONT_HERSHEY_SIMPLEX, 0.8, (0, 165, 255), 2)
-                            
-                            elif self.detectar_puno(hand_landmarks):
-                                puntero_activo = True
-                                punto_zoom_x, punto_zoom_y = self.obtener_posicion_puntero(hand_landmarks)
-                                
-                                comando_puntero = f"puntero_{punto_zoom_x:.3f}_{punto_zoom_y:.3f}"
-                                self.enviar_comando(comando_puntero, 'puntero')
-                                
-                                puntero_px = (int(punto_zoom_x * ancho_frame), int(punto_zoom_y * alto_frame))
-                                cv2.circle(frame, puntero_px, 25, (0, 255, 255), 3)
-                                cv2.circle(frame, puntero_px, 5, (0, 0, 255), -1)
-                            
+                                self.enviar_punto('moving', punto_base_x, punto_base_y)
+
+                            puntero_px = (int(punto_base_x * ancho_frame), int(punto_base_y * alto_frame))
+                            cv2.circle(frame, puntero_px, 20, (255, 0, 255), 3)
+
+                        elif gestos.cuernos[0]:
+                            draw_x, draw_y = gestos.indice[0].tolist()
+
+                            if self.esta_moviendo:
+                                self.esta_moviendo = False
+                                self.enviar_comando("stop_move", 'stop_move')
+
+                            if not self.esta_dibujando:
+                                self.esta_dibujando = True
+                                self.esta_borrando = False
+                                comando_draw = f"start_draw_{draw_x:.3f}_{draw_y:.3f}"
+                                self.enviar_comando(comando_draw, 'start_draw')
                             else:
-                                puntero_activo = False
-                    
-                    else:
-                        puntero_activo = False
-                        contador_zoom = 0
-                        if zoom_activo:
-                            zoom_activo = False
-                            distancia_referencia = None
-                            self.enviar_comando("zoom_1.0_0.5_0.5", 'reset')
-                            ultimo_zoom = 1.0
-
-                    for hand_landmarks in results.multi_hand_landmarks:
-                        mp_drawing.draw_landmarks(
-                            frame, hand_landmarks, mp_hands.HAND_CONNECTIONS,
-                            mp_drawing.DrawingSpec(color=(0, 0, 255), thickness=2, circle_radius=2),
-                            mp_drawing.DrawingSpec(color=(0, 255, 0), thickness=2)
-                        )
+                                self.enviar_punto('drawing', draw_x, draw_y)
 
-                else:
-                    puntero_activo = False
-                    contador_zoom = 0
-                    if zoom_activo:
-                        zoom_activo = False
-                        distancia_referencia = None
-                        self.enviar_comando("zoom_1.0_0.5_0.5", 'reset')
-                        ultimo_zoom = 1.0
-                    
-                    if self.esta_dibujando:
+                            indice_px = (int(draw_x * ancho_frame), int(draw_y * alto_frame))
+                            cv2.circle(frame, indice_px, 25, (0, 255, 0), -1)
+                            cv2.circle(frame, indice_px, 27, (255, 255, 255), 2)
+                            cv2.line(frame, (indice_px[0] - 10, indice_px[1]), (indice_px[0] + 10, indice_px[1]), (255, 255, 255), 2)
+                            cv2.line(frame, (indice_px[0], indice_px[1] - 10), (indice_px[0], indice_px[1] + 10), (255, 255, 255), 2)
+
+                        elif gestos.mano_abierta[0]:
+                            if self.esta_moviendo:
+                                self.esta_moviendo = False
+                                self.enviar_comando("stop_move", 'stop_move')
+                            if not self.esta_borrando:
+                                self.esta_borrando = True
+                                self.esta_dibujando = False
+                                comando_erase = f"start_erase_{punto_base_x:.3f}_{punto_base_y:.3f}"
+                                self.enviar_comando(comando_erase, 'start_erase')
+                            else:
+                                self.enviar_punto('erasing', punto_base_x, punto_base_y)
+
+                            puntero_px = (int(punto_base_x * ancho_frame), int(punto_base_y * alto_frame))
+                            cv2.circle(frame, puntero_px, 25, (0, 0, 255), 4)
+
+                        elif gestos.puno[0]:
+                            if self.esta_dibujando:
+                                self.esta_dibujando = False
+                                comando_stop = f"stop_draw_{punto_base_x:.3f}_{punto_base_y:.3f}"
+                                self.enviar_comando(comando_stop, 'stop_draw')
+                            elif self.esta_borrando:
+                                self.esta_borrando = False
+                                comando_stop = f"stop_erase_{punto_base_x:.3f}_{punto_base_y:.3f}"
+                                self.enviar_comando(comando_stop, 'stop_erase')
+                            elif self.esta_moviendo:
+                                self.esta_moviendo = False
+                                self.enviar_comando("stop_move", 'stop_move')
+
+                            self.puntero_activo = True
+                            self.enviar_punto('puntero', punto_base_x, punto_base_y)
+
+                            puntero_px = (int(punto_base_x * ancho_frame), int(punto_base_y * alto_frame))
+                            cv2.circle(frame, puntero_px, 25, (0, 255, 255), 3)
+                            cv2.circle(frame, puntero_px, 5, (0, 0, 255), -1)
+
+                        else:
+                            if self.esta_dibujando:
+                                self.esta_dibujando = False
+                                comando_stop = f"stop_draw_{punto_base_x:.3f}_{punto_base_y:.3f}"
+                                self.enviar_comando(comando_stop, 'stop_draw')
+                            elif self.esta_borrando:
+                                self.esta_borrando = False
+                                comando_stop = f"stop_erase_{punto_base_x:.3f}_{punto_base_y:.3f}"
+                                self.enviar_comando(comando_stop, 'stop_erase')
+                            elif self.esta_moviendo:
+                                self.esta_moviendo = False
+                                self.enviar_comando("stop_move", 'stop_move')
+
+
+                elif gestos.paz[0]:
+                    if self.enviar_comando("toggle_draw_mode", 'toggle_draw_mode'):
+                        self.modo_dibujo_activo = not self.modo_dibujo_activo
                         self.esta_dibujando = False
-                        self.enviar_comando("stop_draw_0.5_0.5", 'stop_draw')
-                    elif self.esta_borrando:
                         self.esta_borrando = False
-                        self.enviar_comando("stop_erase_0.5_0.5", 'stop_erase')
-                    elif self.esta_moviendo:
                         self.esta_moviendo = False
-                        self.enviar_comando("stop_move", 'stop_move')
-
-                self.mostrar_feedback_toggle_modo(frame, ancho_frame, alto_frame)
-                
-                if self.modo_dibujo_activo:
-                    cv2.rectangle(frame, (0, 0), (ancho_frame, 90), (0, 100, 255), -1)
-                    cv2.rectangle(frame, (0, 0), (ancho_frame, 90), (255, 255, 255), 4)
-                    
-                    texto_principal = "MODO DIBUJO ACTIVADO"
-                    tamaño_texto = cv2.getTextSize(texto_principal, cv2.FONT_HERSHEY_SIMPLEX, 1.3, 3)[0]
-                    x_centrado = (ancho_frame - tamaño_texto[0]) // 2
-                    cv2.putText(frame, texto_principal, (x_centrado, 38),
-                               cv2.FONT_HERSHEY_SIMPLEX, 1.3, (255, 255, 255), 3)
-                    
-                    if self.esta_dibujando:
-                        estado_texto = "DIBUJANDO"
-                        color_estado = (0, 255, 0)
-                    elif self.esta_borrando:
-                        estado_texto = "BORRANDO"
-                        color_estado = (0, 165, 255)
-                    elif self.esta_moviendo:
-                        estado_texto = "MOVIENDO"
-                        color_estado = (255, 0, 255)
+                        self.mostrar_feedback_toggle = True
+                        self.tiempo_inicio_feedback = self.ahora()
+                        self.stdout.write(f"{'='*50}")
+                        self.stdout.write(f"MODO DIBUJO: {'ACTIVADO ✓' if self.modo_dibujo_activo else 'DESACTIVADO ✗'}")
+                        self.stdout.write(f"{'='*50}")
                     else:
-                        estado_texto = "PUNTERO"
-                        color_estado = (255, 255, 0)
-                    
-                    tamaño_estado = cv2.getTextSize(estado_texto, cv2.FONT_HERSHEY_SIMPLEX, 1.0, 2)[0]
-                    x_estado = (ancho_frame - tamaño_estado[0]) // 2
-                    cv2.putText(frame, estado_texto, (x_estado, 70),
-                               cv2.FONT_HERSHEY_SIMPLEX, 1.0, color_estado, 2)
-                    
-                    cv2.rectangle(frame, (0, 90), (20, alto_frame), (0, 255, 0), -1)
-                    cv2.rectangle(frame, (ancho_frame - 20, 90), (ancho_frame, alto_frame), (0, 255, 0), -1)
-                else:
-                    cv2.rectangle(frame, (0, 0), (ancho_frame, 55), (50, 50, 50), -1)
-                    cv2.rectangle(frame, (0, 0), (ancho_frame, 55), (100, 100, 100), 3)
-                    
-                    texto_nav = "MODO NAVEGACION"
-                    tamaño_nav = cv2.getTextSize(texto_nav, cv2.FONT_HERSHEY_SIMPLEX, 1.1, 2)[0]
-                    x_nav = (ancho_frame - tamaño_nav[0]) // 2
-                    cv2.putText(frame, texto_nav, (x_nav, 38),
-                               cv2.FONT_HERSHEY_SIMPLEX, 1.1, (200, 200, 200), 2)
-
-                config_y = alto_frame - 30
-                if not self.modo_dibujo_activo:
-                    cv2.putText(frame, "PAZ =Activar Dibujo | Pistola =Navegar | Puno =Puntero | 2 Manos=Zoom", 
-                        (10, config_y), cv2.FONT_HERSHEY_SIMPLEX, 0.45, (200, 200, 200), 1)
+                        tiempo_restante = self.obtener_tiempo_restante('toggle_draw_mode')
+                        cv2.putText(frame, f"ENTRAR EN COOLDOWN: {tiempo_restante:.2f}s", (10, 170),
+                                    cv2.FONT_HERSHEY_SIMPLEX, 0.8, (0, 165, 255), 2)
+
                 else:
-                    cv2.putText(frame, "PAZ =Salir | CUERNOS =Dibujar | MANO =Borrar | PUNO =Puntero | PINZA =Mover | MENIQUE =Limpiar", 
-                        (10, config_y), cv2.FONT_HERSHEY_SIMPLEX, 0.4, (255, 255, 255), 1)
+                    if gestos.pistola_derecha[0]:
+                        self.puntero_activo = False
+                        if self.enviar_comando("next", 'next'):
+                            cv2.putText(frame, "SIGUIENTE >", (10, 130),
+                                        cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 255, 0), 3)
+                        else:
+                            tiempo_restante = self.obtener_tiempo_restante('next')
+                            cv2.putText(frame, f"Cooldown: {tiempo_restante:.2f}s", (10, 130),
+                                        cv2.FONT_HERSHEY_SIMPLEX, 0.8, (0, 165, 255), 2)
 
-                cv2.imshow("Detector con Gestos Mejorados", frame)
-                if cv2.waitKey(1) & 0xFF == 27:
+                    elif gestos.pistola_izquierda[0]:
+                        self.puntero_activo = False
+                        if self.enviar_comando("prev", 'prev'):
+                            cv2.putText(frame, "<< ANTERIOR", (10, 130),
+                                        cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 255, 0), 3)
+                        else:
+                            tiempo_restante = self.obtener_tiempo_restante('prev')
+                            cv2.putText(frame, f"Cooldown: {tiempo_restante:.2f}s", (10, 130),
+                                        cv2.FONT_HERSHEY_SIMPLEX, 0.8, (0, 165, 255), 2)
+
+                    elif gestos.puno[0]:
+                        self.puntero_activo = True
+                        self.punto_zoom_x, self.punto_zoom_y = gestos.puntero[0].tolist()
+
+                        self.enviar_punto('puntero', self.punto_zoom_x, self.punto_zoom_y)
+
+                        puntero_px = (int(self.punto_zoom_x * ancho_frame), int(self.punto_zoom_y * alto_frame))
+                        cv2.circle(frame, puntero_px, 25, (0, 255, 255), 3)
+                        cv2.circle(frame, puntero_px, 5, (0, 0, 255), -1)
+
+                    else:
+                        self.puntero_activo = False
+
+            else:
+                self.puntero_activo = False
+                self.contador_zoom = 0
+                if self.zoom_activo:
+                    self.zoom_activo = False
+                    self.distancia_referencia = None
+                    self.enviar_comando("zoom_1.0_0.5_0.5", 'reset')
+                    self.ultimo_zoom = 1.0
+
+            self.dibujar_manos(frame, manos)
+
+        else:
+            self.puntero_activo = False
+            self.contador_zoom = 0
+            if self.zoom_activo:
+                self.zoom_activo = False
+                self.distancia_referencia = None
+                self.enviar_comando("zoom_1.0_0.5_0.5", 'reset')
+                self.ultimo_zoom = 1.0
+
+            if self.esta_dibujando:
+                self.esta_dibujando = False
+                self.enviar_comando("stop_draw_0.5_0.5", 'stop_draw')
+            elif self.esta_borrando:
+                self.esta_borrando = False
+                self.enviar_comando("stop_erase_0.5_0.5", 'stop_erase')
+            elif self.esta_moviendo:
+                self.esta_moviendo = False
+                self.enviar_comando("stop_move", 'stop_move')
+
+        self.dibujar_hud(frame, ancho_frame, alto_frame)
+
+    def dibujar_banda_dibujo(self, lienzo, estado_texto, color_estado):
+        ancho_frame = lienzo.shape[1]
+        cv2.rectangle(lienzo, (0, 0), (ancho_frame, 90), (0, 100, 255), -1)
+        cv2.rectangle(lienzo, (0, 0), (ancho_frame, 90), (255, 255, 255), 4)
+
+        texto_principal = "MODO DIBUJO ACTIVADO"
+        tamaño_texto = cv2.getTextSize(texto_principal, cv2.FONT_HERSHEY_SIMPLEX, 1.3, 3)[0]
+        x_centrado = (ancho_frame - tamaño_texto[0]) // 2
+        cv2.putText(lienzo, texto_principal, (x_centrado, 38),
+                   cv2.FONT_HERSHEY_SIMPLEX, 1.3, (255, 255, 255), 3)
+
+        tamaño_estado = cv2.getTextSize(estado_texto, cv2.FONT_HERSHEY_SIMPLEX, 1.0, 2)[0]
+        x_estado = (ancho_frame - tamaño_estado[0]) // 2
+        cv2.putText(lienzo, estado_texto, (x_estado, 70),
+                   cv2.FONT_HERSHEY_SIMPLEX, 1.0, color_estado, 2)
+
+    def dibujar_banda_navegacion(self, lienzo):
+        ancho_frame = lienzo.shape[1]
+        cv2.rectangle(lienzo, (0, 0), (ancho_frame, 55), (50, 50, 50), -1)
+        cv2.rectangle(lienzo, (0, 0), (ancho_frame, 55), (100, 100, 100), 3)
+
+        texto_nav = "MODO NAVEGACION"
+        tamaño_nav = cv2.getTextSize(texto_nav, cv2.FONT_HERSHEY_SIMPLEX, 1.1, 2)[0]
+        x_nav = (ancho_frame - tamaño_nav[0]) // 2
+        cv2.putText(lienzo, texto_nav, (x_nav, 38),
+                   cv2.FONT_HERSHEY_SIMPLEX, 1.1, (200, 200, 200), 2)
+
+    def dibujar_hud(self, frame, ancho_frame, alto_frame):
+        self.mostrar_feedback_toggle_modo(frame, ancho_frame, alto_frame)
+
+        # Las bandas y los textos fijos se rasterizan una vez y luego solo se copian al frame.
+        if self.modo_dibujo_activo:
+            if self.esta_dibujando:
+                estado_texto = "DIBUJANDO"
+                color_estado = (0, 255, 0)
+            elif self.esta_borrando:
+                estado_texto = "BORRANDO"
+                color_estado = (0, 165, 255)
+            elif self.esta_moviendo:
+                estado_texto = "MOVIENDO"
+                color_estado = (255, 0, 255)
+            else:
+                estado_texto = "PUNTERO"
+                color_estado = (255, 255, 0)
+
+            # El borde de 4 px de la banda llega hasta la fila 92.
+            self.hud.banda(frame, ('dibujo', estado_texto), 94,
+                           lambda lienzo: self.dibujar_banda_dibujo(lienzo, estado_texto, color_estado))
+
+            cv2.rectangle(frame, (0, 90), (20, alto_frame), (0, 255, 0), -1)
+            cv2.rectangle(frame, (ancho_frame - 20, 90), (ancho_frame, alto_frame), (0, 255, 0), -1)
+        else:
+            self.hud.banda(frame, ('navegacion',), 58, self.dibujar_banda_navegacion)
+
+        config_y = alto_frame - 30
+        if not self.modo_dibujo_activo:
+            self.hud.texto(frame, "PAZ =Activar Dibujo | Pistola =Navegar | Puno =Puntero | 2 Manos=Zoom", 
+                (10, config_y), 0.45, (200, 200, 200), 1)
+        else:
+            self.hud.texto(frame, "PAZ =Salir | CUERNOS =Dibujar | MANO =Borrar | PUNO =Puntero | PINZA =Mover | MENIQUE =Limpiar", 
+                (10, config_y), 0.4, (255, 255, 255), 1)
+
+        self.mostrar_estadisticas_envio(frame, alto_frame)
+
+    def add_arguments(self, parser):
+        parser.add_argument('--source', default='0',
+                            help='Índice de cámara, video, directorio de imágenes o landmarks grabados (.jsonl)')
+        parser.add_argument('--record', default=None,
+                            help='Guardar landmarks y comandos emitidos en un archivo .jsonl')
+        parser.add_argument('--headless', action='store_true',
+                            help='Procesar sin mostrar la ventana de OpenCV')
+        parser.add_argument('--dry-run', action='store_true',
+                            help='No enviar comandos al servidor')
+        parser.add_argument('--fps', type=float, default=30.0,
+                            help='FPS supuestos para directorios de imágenes y landmarks sin tiempo')
+        parser.add_argument('--adaptativo', action='store_true',
+                            help='Reducir la resolución de inferencia y seguir las manos con un recorte')
+        parser.add_argument('--ancho-inferencia', type=int, default=ANCHO_INFERENCIA)
+        parser.add_argument('--intervalo-busqueda', type=int, default=INTERVALO_BUSQUEDA,
+                            help='Frames entre búsquedas en el frame completo en modo adaptativo')
+        parser.add_argument('--sesion', default=None,
+                            help='Sesión de la página de presentación que recibe los comandos; sin ella no se envían')
+        parser.add_argument('--zancada', type=int, default=1,
+                            help='Ejecutar la red cada N frames durante puntero, dibujo, borrado y movimiento')
+        parser.add_argument('--zancada-maxima', type=int, default=3,
+                            help='Zancada máxima cuando la inferencia excede el presupuesto por frame')
+        parser.add_argument('--formato', choices=FORMATOS, default=FORMATO_POR_DEFECTO,
+                            help='Codificación de los comandos enviados al servidor (json para depurar)')
+        parser.add_argument('--sin-agrupar', action='store_true',
+                            help='Enviar cada punto de puntero, dibujo, borrado y movimiento en su propio mensaje')
+        parser.add_argument('--nice', type=int, default=0,
+                            help='Incremento de niceness del proceso (Linux/macOS)')
+        parser.add_argument('--limite-memoria', type=int, default=None,
+                            help='Límite de memoria virtual en MB (Linux/macOS)')
+
+    def gesto_continuo(self):
+        return (self.puntero_activo or self.esta_dibujando or self.esta_borrando or self.esta_moviendo) \
+            and not self.zoom_activo
+
+    def inferir(self, hands, frame):
+        if self.inferencia_adaptativa:
+            return self.inferencia_adaptativa.procesar(frame)
+        rgb = convertir_rgb(frame, self.buffer_rgb)
+        return landmarks_a_array(hands.process(rgb).multi_hand_landmarks)
+
+    def bucle_inferencia(self, entrada, salida, usar_mediapipe, options):
+        try:
+            contexto = mp_hands.Hands(
+                min_detection_confidence=0.7,
+                min_tracking_confidence=0.5,
+                max_num_hands=2
+            ) if usar_mediapipe else nullcontext()
+
+            with contexto as hands:
+                if usar_mediapipe and options['adaptativo']:
+                    self.inferencia_adaptativa = InferenciaAdaptativa(
+                        hands,
+                        ancho_inferencia=options['ancho_inferencia'],
+                        intervalo_busqueda=options['intervalo_busqueda']
+                    )
+
+                while not self.detener.is_set():
+                    elemento = entrada.tomar(timeout=0.5)
+                    if elemento is None:
+                        if entrada.cerrado:
+                            break
+                        continue
+
+                    indice, capturado, frame, manos, tiempo = elemento
+                    inicio = time.perf_counter()
+                    self.estadisticas_espera.registrar(inicio - capturado)
+                    self.tiempo_fuente = tiempo
+                    self.comandos_frame = []
+
+                    if manos is None:
+                        manos = None if self.control_zancada.debe_inferir(self.gesto_continuo()) \
+                            else self.predictor.predecir(self.ahora())
+                        if manos is None:
+                            inicio_red = time.perf_counter()
+                            manos = self.inferir(hands, frame)
+                            self.control_zancada.registrar_inferencia(time.perf_counter() - inicio_red)
+                            self.predictor.actualizar(manos, self.ahora())
+                        else:
+                            self.control_zancada.registrar_interpolacion()
+                    self.procesar_manos(frame, manos)
+                    if self.agrupador:
+                        self.agrupador.revisar(self.ahora())
+
+                    if self.grabador:
+                        self.grabador.escribir(indice, self.ahora(), frame, manos, self.comandos_frame)
+
+                    cv2.putText(frame, f"FPS {self.estadisticas_inferencia.fps():.1f}", (frame.shape[1] - 110, frame.shape[0] - 55),
+                                cv2.FONT_HERSHEY_SIMPLEX, 0.45, (180, 180, 180), 1)
+                    self.estadisticas_inferencia.registrar(time.perf_counter() - inicio)
+                    salida.poner((indice, capturado, frame))
+                    if self.latido:
+                        # El primer frame procesado confirma cámara y modelo listos.
+                        self.latido.listo()
+        except Exception as e:
+            if self.latido:
+                self.latido.fallido(f"Error en la inferencia: {e}")
+            raise
+        finally:
+            salida.poner(FIN_PIPELINE)
+
+    def liberar_elemento(self, elemento):
+        if isinstance(elemento, tuple):
+            self.pool_frames.liberar(elemento[2])
+
+    def bucle_display(self, salida, inferencia, headless):
+        while True:
+            elemento = salida.tomar(timeout=0.5)
+            if elemento is FIN_PIPELINE:
+                break
+            if elemento is None:
+                if not inferencia.is_alive():
                     break
+                continue
 
-        cap.release()
-        cv2.destroyAllWindows()
\ No newline at end of file
+            indice, capturado, frame = elemento
+            inicio = time.perf_counter()
+            if not headless:
+                # imshow copia la imagen a la ventana: después el buffer ya puede reutilizarse.
+                cv2.imshow("Detector con Gestos Mejorados", frame)
+            self.pool_frames.liberar(frame)
+            if not headless and cv2.waitKey(1) & 0xFF == 27:
+                break
+            fin = time.perf_counter()
+            self.estadisticas_display.registrar(fin - inicio)
+            self.estadisticas_total.registrar(fin - capturado)
+
+    def resumen_pipeline(self, captura, entrada, salida, duracion):
+        self.stdout.write("Resumen del pipeline:")
+        self.stdout.write(f"  {'etapa':<18} {'frames':>7} {'media ms':>9} {'p95 ms':>8}")
+        for estadisticas in (captura.estadisticas, self.estadisticas_espera, self.estadisticas_inferencia,
+                             self.estadisticas_display, self.estadisticas_total):
+            r = estadisticas.resumen()
+            self.stdout.write(f"  {r['etapa']:<18} {r['frames']:>7} {r['media_ms']:>9.1f} {r['p95_ms']:>8.1f}")
+        procesados = self.estadisticas_total.total
+        self.stdout.write(f"  FPS promedio: {procesados / duracion if duracion > 0 else 0:.1f}")
+        self.stdout.write(f"  Frames descartados: captura->inferencia {entrada.descartados}, "
+                          f"inferencia->display {salida.descartados}")
+        zancada = self.control_zancada.estadisticas()
+        if zancada['interpolados']:
+            self.stdout.write(f"  Zancada final: {zancada['zancada']} | {zancada['inferidos']} inferidos, "
+                              f"{zancada['interpolados']} interpolados | red {zancada['inferencia_ms']:.1f} ms")
+        if self.inferencia_adaptativa:
+            roi = self.inferencia_adaptativa.estadisticas()
+            self.stdout.write(f"  Inferencia adaptativa: {roi['inferencias_roi']} en recorte, "
+                              f"{roi['busquedas_completas']} en frame completo, {roi['perdidas']} pérdidas de seguimiento")
+        self.stdout.write("="*60)
+
+    def limitar_recursos(self, nice, limite_mb):
+        if nice and hasattr(os, 'nice'):
+            os.nice(nice)
+        if limite_mb:
+            try:
+                import resource
+            except ImportError:
+                self.stderr.write("El límite de memoria solo está disponible en Linux/macOS")
+                return
+            limite = limite_mb * 1024 * 1024
+            resource.setrlimit(resource.RLIMIT_AS, (limite, limite))
+
+    def handle(self, *args, **options):
+        self.limitar_recursos(options['nice'], options['limite_memoria'])
+        self.stdout.write("="*60)
+        self.stdout.write("Iniciando detector de gestos...")
+        self.stdout.write(f"URL: {URL_ACTUALIZAR_COMANDO}")
+        if options['sesion']:
+            self.stdout.write(f"Sesión: {options['sesion']}")
+        self.stdout.write("="*60)
+        
+        if options['sesion'] and not options['dry_run']:
+            self.latido = LatidoDetector(URL_LATIDO_DETECTOR, options['sesion'])
+
+        fuente = abrir_fuente(options['source'], options['fps'])
+        if not fuente.isOpened():
+            if self.latido:
+                self.latido.fallido("No se detectó cámara")
+            raise CommandError(f"No se puede abrir la fuente {options['source']}.")
+
+        if options['dry_run'] or not options['sesion']:
+            if not options['dry_run']:
+                self.stdout.write("Sin --sesion: los comandos no se envían al servidor")
+            self.transporte = TransporteNulo()
+        else:
+            self.transporte = TransporteComandos(URL_ACTUALIZAR_COMANDO, registro=self.stderr.write,
+                                                 sesion=options['sesion'], formato=options['formato']).iniciar()
+        if not options['sin_agrupar']:
+            self.agrupador = AgrupadorComandos(self.transmitir, self.transporte.latencia_reciente)
+        if options['record']:
+            self.grabador = GrabadorSesion(options['record'])
+
+        self.control_zancada = ControlZancada(
+            zancada=options['zancada'],
+            zancada_maxima=options['zancada_maxima'],
+            presupuesto=1 / fuente.fps,
+            adaptativa=fuente.en_vivo
+        )
+
+        # En vivo se conserva solo el frame más reciente; con fuentes grabadas se procesan todos.
+        # Los frames descartados por las colas vuelven al pool; los mostrados, al salir del display.
+        entrada = UltimoValor(descartar=fuente.en_vivo, al_descartar=self.liberar_elemento)
+        salida = ColaDescarte(capacidad=1, descartar=fuente.en_vivo, al_descartar=self.liberar_elemento)
+        captura = HiloCaptura(fuente, entrada,
+                              transformar=(lambda frame: espejar(frame, self.pool_frames)) if fuente.espejar else None,
+                              pool=self.pool_frames)
+        inferencia = threading.Thread(target=self.bucle_inferencia,
+                                      args=(entrada, salida, not isinstance(fuente, FuenteLandmarks), options),
+                                      name='inferencia-gestos', daemon=True)
+
+        self.detener = threading.Event()
+        self.estadisticas_espera = EstadisticasEtapa('espera')
+        self.estadisticas_inferencia = EstadisticasEtapa('inferencia')
+        self.estadisticas_display = EstadisticasEtapa('display')
+        self.estadisticas_total = EstadisticasEtapa('captura->display')
+
+        inicio = time.perf_counter()
+        captura.start()
+        inferencia.start()
+        try:
+            self.bucle_display(salida, inferencia, options['headless'])
+        except KeyboardInterrupt:
+            pass
+        finally:
+            duracion = time.perf_counter() - inicio
+            self.detener.set()
+            captura.detener.set()
+            entrada.cerrar()
+            captura.join(2)
+            inferencia.join(2)
+
+            fuente.release()
+            if self.agrupador:
+                self.agrupador.vaciar(self.ahora())
+            if self.grabador:
+                self.grabador.cerrar()
+            if not options['headless']:
+                cv2.destroyAllWindows()
+            self.transporte.detener()
+            if self.latido:
+                self.latido.detener()
+            self.resumen_envio()
+            self.resumen_pipeline(captura, entrada, salida, duracion)
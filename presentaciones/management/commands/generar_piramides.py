@@ -0,0 +1,52 @@
+from django.core.management.base import BaseCommand
+
+from presentaciones.models import Presentacion
+from presentaciones.cache_drive import cache_drive
+from presentaciones.piramide_diapositivas import (
+    generar_piramide, piramide_vigente, directorio_piramide, NIVELES_PIRAMIDE, FORMATO_PIRAMIDE, PROCESOS_PIRAMIDE
+)
+
+
+class Command(BaseCommand):
+    help = "Genera las diapositivas prerenderizadas (pirámide de resoluciones) de las presentaciones"
+
+    def add_arguments(self, parser):
+        parser.add_argument('ids', nargs='*', type=int, help='Presentaciones a procesar (todas si se omite)')
+        parser.add_argument('--procesos', type=int, default=PROCESOS_PIRAMIDE)
+        parser.add_argument('--formato', choices=['webp', 'jpeg'], default=FORMATO_PIRAMIDE)
+        parser.add_argument('--forzar', action='store_true', help='Regenerar aunque la pirámide esté vigente')
+
+    def handle(self, *args, **options):
+        presentaciones = Presentacion.objects.all()
+        if options['ids']:
+            presentaciones = presentaciones.filter(id__in=options['ids'])
+
+        for presentacion in presentaciones:
+            if presentacion.ubicacion == 'drive':
+                ruta = cache_drive.ruta_actual(presentacion.drive_id) if presentacion.drive_id else None
+            else:
+                ruta = presentacion.get_archivo_path()
+
+            if not ruta or not ruta.lower().endswith('.pdf'):
+                self.stdout.write(f"[{presentacion.id}] {presentacion.nombre}: sin PDF local, se omite")
+                continue
+            if not options['forzar'] and piramide_vigente(presentacion.id, ruta):
+                self.stdout.write(f"[{presentacion.id}] {presentacion.nombre}: vigente")
+                continue
+
+            def progreso(hechas, total):
+                self.stdout.write(f"\r[{presentacion.id}] {hechas}/{total} páginas", ending='')
+                self.stdout.flush()
+
+            manifiesto = generar_piramide(ruta, directorio_piramide(presentacion.id), niveles=NIVELES_PIRAMIDE,
+                                          formato=options['formato'], procesos=options['procesos'],
+                                          progreso=progreso)
+            tiempos = sorted(pagina['ms'] for pagina in manifiesto['paginas'])
+            if not tiempos:
+                self.stdout.write(f"\r[{presentacion.id}] {presentacion.nombre}: el PDF no tiene páginas")
+                continue
+            self.stdout.write(
+                f"\r[{presentacion.id}] {presentacion.nombre}: {manifiesto['total_paginas']} páginas en "
+                f"{manifiesto['ms_total'] / 1000:.1f} s | por página: media {sum(tiempos) / len(tiempos):.0f} ms, "
+                f"p95 {tiempos[int(0.95 * (len(tiempos) - 1))]:.0f} ms, máx {tiempos[-1]:.0f} ms"
+            )
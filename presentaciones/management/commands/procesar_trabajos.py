@@ -0,0 +1,87 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from presentaciones import tareas  # noqa: F401  (registra los manejadores)
+from presentaciones.google_drive_oauth import iniciar_medicion
+from presentaciones.cola_trabajos import (
+    tomar_trabajo, ejecutar, recuperar_abandonados, limpiar_pendientes, estadisticas, nombre_trabajador
+)
+
+INTERVALO_MANTENIMIENTO = 60
+
+
+def _segundos(valor):
+    return '-' if valor is None else f"{valor:.2f} s"
+
+
+class Command(BaseCommand):
+    help = "Procesa la cola de trabajos en segundo plano (subidas a Drive, miniaturas y pirámides)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--intervalo', type=float, default=1.0,
+                            help='Segundos de espera cuando la cola está vacía')
+        parser.add_argument('--una-vez', action='store_true', help='Vaciar la cola y terminar')
+        parser.add_argument('--tipo', action='append', dest='tipos', help='Procesar solo estos tipos de trabajo')
+        parser.add_argument('--estadisticas', action='store_true',
+                            help='Mostrar profundidad y latencia de la cola y terminar')
+
+    def handle(self, *args, **options):
+        if options['estadisticas']:
+            self._mostrar_estadisticas()
+            return
+
+        trabajador = nombre_trabajador()
+        self.stdout.write(f"Trabajador {trabajador} esperando trabajos...")
+        ultimo_mantenimiento = 0.0
+
+        try:
+            while True:
+                close_old_connections()
+                if time.monotonic() - ultimo_mantenimiento >= INTERVALO_MANTENIMIENTO:
+                    ultimo_mantenimiento = time.monotonic()
+                    recuperados = recuperar_abandonados()
+                    if recuperados:
+                        self.stdout.write(self.style.WARNING(f"{recuperados} trabajos abandonados vuelven a la cola"))
+                    limpiar_pendientes()
+
+                trabajo = tomar_trabajo(trabajador, options['tipos'])
+                if trabajo is None:
+                    if options['una_vez']:
+                        break
+                    time.sleep(options['intervalo'])
+                    continue
+
+                espera = (trabajo.fecha_inicio - trabajo.fecha_creacion).total_seconds()
+                tiempos_drive = iniciar_medicion()
+                inicio = time.perf_counter()
+                try:
+                    correcto = ejecutar(trabajo)
+                except Exception as e:
+                    # Por ejemplo, la presentación se eliminó mientras se procesaba su trabajo.
+                    self.stderr.write(f"{trabajo}: {e}")
+                    continue
+                duracion = time.perf_counter() - inicio
+                resultado = self.style.SUCCESS('ok') if correcto else self.style.ERROR(trabajo.estado)
+                self.stdout.write(f"{trabajo.tipo} #{trabajo.id}: {resultado} | espera {espera:.2f} s | "
+                                  f"ejecución {duracion:.2f} s | intento {trabajo.intentos}/{trabajo.max_intentos} | "
+                                  f"Drive auth {tiempos_drive['auth'] * 1000:.0f} ms, "
+                                  f"discovery {tiempos_drive['discovery'] * 1000:.0f} ms, "
+                                  f"{tiempos_drive['llamadas_evitadas']} llamadas evitadas")
+        except KeyboardInterrupt:
+            pass
+
+        if options['una_vez']:
+            self._mostrar_estadisticas()
+
+    def _mostrar_estadisticas(self):
+        datos = estadisticas()
+        conteos = ', '.join(f"{estado}: {total}" for estado, total in datos['por_estado'].items())
+        self.stdout.write(f"Trabajos por estado: {conteos}")
+        self.stdout.write(f"Profundidad (listos para ejecutar): {datos['profundidad']} | "
+                          f"espera más antigua: {_segundos(datos['espera_mas_antigua_s'])}")
+        self.stdout.write(f"Espera en cola: media {_segundos(datos['espera_media_s'])}, "
+                          f"p95 {_segundos(datos['espera_p95_s'])}")
+        self.stdout.write(f"Ejecución: media {_segundos(datos['duracion_media_s'])}, "
+                          f"p95 {_segundos(datos['duracion_p95_s'])}")
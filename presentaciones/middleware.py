@@ -0,0 +1,42 @@
+import logging
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+
+from .google_drive_oauth import iniciar_medicion
+
+logger = logging.getLogger(__name__)
+
+
+class TiemposDriveMiddleware:
+    # Híbrido: bajo ASGI no obliga a Django a pasar el stream de comandos por un hilo.
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        tiempos = iniciar_medicion()
+        response = self.get_response(request)
+        return self.agregar_tiempos(request, response, tiempos)
+
+    async def __acall__(self, request):
+        tiempos = iniciar_medicion()
+        response = await self.get_response(request)
+        return self.agregar_tiempos(request, response, tiempos)
+
+    def agregar_tiempos(self, request, response, tiempos):
+        if tiempos['auth'] or tiempos['discovery'] or tiempos['llamadas_evitadas']:
+            auth_ms = tiempos['auth'] * 1000
+            discovery_ms = tiempos['discovery'] * 1000
+            response['Server-Timing'] = (
+                f'drive-auth;dur={auth_ms:.1f}, drive-discovery;dur={discovery_ms:.1f}, '
+                f'drive-evitadas;desc="{tiempos["llamadas_evitadas"]}"'
+            )
+            logger.info(f"{request.method} {request.path}: auth de Drive {auth_ms:.1f} ms, "
+                        f"discovery {discovery_ms:.1f} ms, {tiempos['llamadas_evitadas']} llamadas evitadas")
+        return response
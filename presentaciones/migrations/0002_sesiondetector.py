@@ -0,0 +1,27 @@
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('presentaciones', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SesionDetector',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('sesion', models.CharField(max_length=64, unique=True)),
+                ('pid', models.IntegerField(blank=True, null=True)),
+                ('estado', models.CharField(choices=[('ejecutando', 'En ejecución'), ('detenido', 'Detenido'), ('fallido', 'Fallido')], default='detenido', max_length=12)),
+                ('reinicios', models.PositiveIntegerField(default=0)),
+                ('fecha_inicio', models.DateTimeField(blank=True, null=True)),
+                ('fecha_actualizacion', models.DateTimeField(auto_now=True)),
+                ('presentacion', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='sesiones_detector', to='presentaciones.presentacion')),
+                ('usuario', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='sesion_detector', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+    ]
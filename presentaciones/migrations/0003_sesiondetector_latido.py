@@ -0,0 +1,26 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('presentaciones', '0002_sesiondetector'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='sesiondetector',
+            name='mensaje',
+            field=models.CharField(blank=True, default='', max_length=255),
+        ),
+        migrations.AddField(
+            model_name='sesiondetector',
+            name='ultimo_latido',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AlterField(
+            model_name='sesiondetector',
+            name='estado',
+            field=models.CharField(choices=[('iniciando', 'Iniciando'), ('ejecutando', 'En ejecución'), ('detenido', 'Detenido'), ('fallido', 'Fallido')], default='detenido', max_length=12),
+        ),
+    ]
@@ -0,0 +1,40 @@
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('presentaciones', '0003_sesiondetector_latido'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='presentacion',
+            name='estado',
+            field=models.CharField(choices=[('pendiente', 'Procesando'), ('lista', 'Lista'), ('error', 'Error')], default='lista', max_length=10),
+        ),
+        migrations.CreateModel(
+            name='Trabajo',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('tipo', models.CharField(max_length=50)),
+                ('datos', models.JSONField(blank=True, default=dict)),
+                ('estado', models.CharField(choices=[('pendiente', 'Pendiente'), ('en_proceso', 'En proceso'), ('completado', 'Completado'), ('fallido', 'Fallido')], default='pendiente', max_length=12)),
+                ('intentos', models.PositiveIntegerField(default=0)),
+                ('max_intentos', models.PositiveIntegerField(default=5)),
+                ('error', models.TextField(blank=True, default='')),
+                ('trabajador', models.CharField(blank=True, default='', max_length=100)),
+                ('ejecutar_despues', models.DateTimeField(default=django.utils.timezone.now)),
+                ('fecha_creacion', models.DateTimeField(auto_now_add=True)),
+                ('fecha_inicio', models.DateTimeField(blank=True, null=True)),
+                ('fecha_fin', models.DateTimeField(blank=True, null=True)),
+                ('presentacion', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='trabajos', to='presentaciones.presentacion')),
+            ],
+            options={
+                'ordering': ['fecha_creacion'],
+                'indexes': [models.Index(fields=['estado', 'ejecutar_despues'], name='presentacio_estado_6b1f0e_idx')],
+            },
+        ),
+    ]
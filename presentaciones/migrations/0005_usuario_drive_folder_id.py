@@ -0,0 +1,16 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('presentaciones', '0004_trabajo_presentacion_estado'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='usuario',
+            name='drive_folder_id',
+            field=models.CharField(blank=True, max_length=255, null=True),
+        ),
+    ]
@@ -0,0 +1,85 @@
+import json
+import logging
+import os
+
+from django.conf import settings
+from django.db import migrations, models
+
+logger = logging.getLogger(__name__)
+
+
+def ruta_respaldo():
+    return getattr(settings, 'RESPALDO_DUPLICADOS_0006',
+                   os.path.join(settings.BASE_DIR, 'respaldo_0006_presentaciones.json'))
+
+
+def eliminar_duplicados(apps, schema_editor):
+    # Antes no había restricción: de cada (usuario, drive_id) repetido se conserva la fila más reciente.
+    Presentacion = apps.get_model('presentaciones', 'Presentacion')
+    Trabajo = apps.get_model('presentaciones', 'Trabajo')
+    SesionDetector = apps.get_model('presentaciones', 'SesionDetector')
+    conservadas = {}
+    duplicados = {}
+    filas = (Presentacion.objects.filter(drive_id__isnull=False)
+             .order_by('-fecha_subida', '-id').values_list('id', 'usuario_id', 'drive_id'))
+    for presentacion_id, usuario_id, drive_id in filas.iterator():
+        clave = (usuario_id, drive_id)
+        if clave in conservadas:
+            duplicados[presentacion_id] = conservadas[clave]
+        else:
+            conservadas[clave] = presentacion_id
+    if not duplicados:
+        return
+
+    # Los trabajos y sesiones de las copias pasan a la fila conservada en vez de borrarse en cascada.
+    for duplicado, conservada in duplicados.items():
+        Trabajo.objects.filter(presentacion_id=duplicado).update(presentacion_id=conservada)
+        SesionDetector.objects.filter(presentacion_id=duplicado).update(presentacion_id=conservada)
+
+    respaldo = list(Presentacion.objects.filter(id__in=duplicados).values())
+    with open(ruta_respaldo(), 'w', encoding='utf-8') as f:
+        json.dump(respaldo, f, default=str)
+    mensaje = (f"Eliminando {len(duplicados)} presentación(es) duplicada(s) por (usuario, drive_id): "
+               + ', '.join(f"id {d} (se conserva {c})" for d, c in sorted(duplicados.items()))
+               + f". Respaldo en {ruta_respaldo()}")
+    print(f"\n  {mensaje}")
+    logger.warning(mensaje)
+    Presentacion.objects.filter(id__in=duplicados).delete()
+
+
+def restaurar_duplicados(apps, schema_editor):
+    # La restricción ya se quitó al revertir: se recrean las filas borradas con su id original.
+    ruta = ruta_respaldo()
+    if not os.path.exists(ruta):
+        return
+    Presentacion = apps.get_model('presentaciones', 'Presentacion')
+    with open(ruta, encoding='utf-8') as f:
+        respaldo = json.load(f)
+    Presentacion.objects.bulk_create([Presentacion(**valores) for valores in respaldo])
+    # auto_now_add pisa fecha_subida al crear; se devuelve la original.
+    for valores in respaldo:
+        Presentacion.objects.filter(id=valores['id']).update(fecha_subida=valores['fecha_subida'])
+    os.remove(ruta)
+    mensaje = (f"Restauradas {len(respaldo)} presentación(es) duplicada(s): "
+               f"ids {', '.join(str(valores['id']) for valores in respaldo)}")
+    print(f"\n  {mensaje}")
+    logger.warning(mensaje)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('presentaciones', '0005_usuario_drive_folder_id'),
+    ]
+
+    operations = [
+        migrations.RunPython(eliminar_duplicados, restaurar_duplicados),
+        migrations.AddIndex(
+            model_name='presentacion',
+            index=models.Index(fields=['usuario', '-fecha_subida', '-id'], name='presentacion_biblioteca_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='presentacion',
+            constraint=models.UniqueConstraint(condition=models.Q(('drive_id__isnull', False)), fields=('usuario', 'drive_id'), name='presentacion_usuario_drive_unica'),
+        ),
+    ]
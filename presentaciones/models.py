@@ -1,20 +1,17 @@
 from django.contrib.auth.models import AbstractUser
 from django.db import models
+from django.utils import timezone
 import os
 from django.conf import settings
-from pdf2image import convert_from_path
-from PIL import Image
 from io import BytesIO
 from django.core.files.base import ContentFile
-from googleapiclient.http import MediaIoBaseDownload
-from .google_drive_oauth import get_drive_service
-from tempfile import NamedTemporaryFile
-from googleapiclient.discovery import build
-import tempfile
+from .google_drive_oauth import get_drive_service, sesion_drive
+from .cache_drive import cache_drive
 
 
 class Usuario(AbstractUser):
     api_key = models.CharField(max_length=255, blank=True, null=True)
+    drive_folder_id = models.CharField(max_length=255, blank=True, null=True)
 
     def _str_(self):
         return self.username
@@ -25,6 +22,11 @@ class Presentacion(models.Model):
         ('drive', 'Google Drive'),
         ('local', 'Servidor Local'),
     ]
+    ESTADO_CHOICES = [
+        ('pendiente', 'Procesando'),
+        ('lista', 'Lista'),
+        ('error', 'Error'),
+    ]
     
     usuario = models.ForeignKey(
         settings.AUTH_USER_MODEL,
@@ -43,9 +45,20 @@ class Presentacion(models.Model):
     miniatura = models.ImageField(upload_to='miniaturas/', blank=True, null=True)
     miniatura_url = models.URLField(blank=True, null=True)
     fecha_subida = models.DateTimeField(auto_now_add=True)
+    estado = models.CharField(max_length=10, choices=ESTADO_CHOICES, default='lista')
 
     class Meta:
         ordering = ['-fecha_subida']
+        indexes = [
+            models.Index(fields=['usuario', '-fecha_subida', '-id'], name='presentacion_biblioteca_idx'),
+        ]
+        constraints = [
+            models.UniqueConstraint(
+                fields=['usuario', 'drive_id'],
+                condition=models.Q(drive_id__isnull=False),
+                name='presentacion_usuario_drive_unica'
+            ),
+        ]
 
     def __str__(self):
         return f"{self.nombre} ({self.usuario})"
@@ -55,36 +68,51 @@ class Presentacion(models.Model):
             return self.archivo_local.path
         return None
 
-    def generar_miniatura(self):
+    def generar_miniatura(self, fuente=None):
+        # fuente: ruta o bytes de un PDF que ya está en el servidor (p. ej. el de la subida),
+        # para no volver a descargarlo de Drive. Devuelve de dónde salió el PDF.
         if self.miniatura_url or self.miniatura:
-            return
+            return None
+        
+        from pdf2image import convert_from_path, convert_from_bytes
+        from PIL import Image
         
         try:
             pdf_path = None
-            temp_file = False
+            origen = None
             
-            if self.ubicacion == 'drive' and self.drive_id:
-                service = get_drive_service()
-                request = service.files().get_media(fileId=self.drive_id)
-                pdf_path = os.path.join(tempfile.gettempdir(), f"temp_{self.id}.pdf")
-                
-                with open(pdf_path, 'wb') as f:
-                    downloader = service._http.request(request.uri)[1]
-                    f.write(downloader)
-                temp_file = True
+            if isinstance(fuente, (bytes, bytearray)):
+                origen = 'fuente'
+            elif fuente and os.path.exists(fuente):
+                pdf_path = fuente
+                origen = 'fuente'
+            elif self.ubicacion == 'drive' and self.drive_id:
+                pdf_path = cache_drive.ruta_actual(self.drive_id)
+                if pdf_path and pdf_path.lower().endswith('.pdf'):
+                    origen = 'cache'
+                else:
+                    # Sin el PDF en el servidor se usa la miniatura que ya genera Drive: nunca el archivo completo.
+                    pdf_path = None
+                    pages = self._miniatura_drive()
+                    if not pages:
+                        return None
+                    origen = 'drive'
                 
             elif self.ubicacion == 'local' and self.archivo_local:
                 pdf_path = self.archivo_local.path
-                temp_file = False
+                origen = 'local'
             
-            if not pdf_path or not os.path.exists(pdf_path):
+            if origen is None or (pdf_path and not os.path.exists(pdf_path)):
                 print(f"No se encontró el archivo PDF para generar miniatura")
-                return
+                return None
 
             poppler_path = os.path.join(settings.BASE_DIR, 'requeridos', 'poppler', 'Library', 'bin')
             poppler_path = os.path.abspath(poppler_path)
 
-            pages = convert_from_path(pdf_path, first_page=1, last_page=1, poppler_path=poppler_path)
+            if pdf_path:
+                pages = convert_from_path(pdf_path, first_page=1, last_page=1, poppler_path=poppler_path)
+            elif origen != 'drive':
+                pages = convert_from_bytes(bytes(fuente), first_page=1, last_page=1, poppler_path=poppler_path)
             
             if pages:
                 thumb_io = BytesIO()
@@ -118,10 +146,97 @@ class Presentacion(models.Model):
                     save=False
                 )
 
-            if temp_file and os.path.exists(pdf_path):
-                os.remove(pdf_path)
+            return origen
 
         except Exception as e:
             print(f"Error generando miniatura: {e}")
             import traceback
-            traceback.print_exc()
\ No newline at end of file
+            traceback.print_exc()
+            return None
+
+
+    def _miniatura_drive(self):
+        from PIL import Image
+
+        try:
+            metadata = get_drive_service().files().get(fileId=self.drive_id, fields='thumbnailLink').execute()
+            enlace = metadata.get('thumbnailLink')
+            if not enlace:
+                print(f"Drive todavía no tiene miniatura para {self.drive_id}; se omite")
+                return None
+            respuesta = sesion_drive().get(enlace, timeout=30)
+            respuesta.raise_for_status()
+            return [Image.open(BytesIO(respuesta.content)).convert('RGB')]
+        except Exception as e:
+            print(f"No se pudo obtener la miniatura de Drive para {self.drive_id}, se omite: {e}")
+            return None
+
+
+class SesionDetector(models.Model):
+    ESTADO_CHOICES = [
+        ('iniciando', 'Iniciando'),
+        ('ejecutando', 'En ejecución'),
+        ('detenido', 'Detenido'),
+        ('fallido', 'Fallido'),
+    ]
+
+    usuario = models.OneToOneField(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name='sesion_detector'
+    )
+    presentacion = models.ForeignKey(
+        Presentacion,
+        on_delete=models.SET_NULL,
+        related_name='sesiones_detector',
+        blank=True,
+        null=True
+    )
+    sesion = models.CharField(max_length=64, unique=True)
+    pid = models.IntegerField(blank=True, null=True)
+    estado = models.CharField(max_length=12, choices=ESTADO_CHOICES, default='detenido')
+    reinicios = models.PositiveIntegerField(default=0)
+    mensaje = models.CharField(max_length=255, blank=True, default='')
+    fecha_inicio = models.DateTimeField(blank=True, null=True)
+    ultimo_latido = models.DateTimeField(blank=True, null=True)
+    fecha_actualizacion = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"Detector de {self.usuario} ({self.estado})"
+
+
+class Trabajo(models.Model):
+    ESTADO_CHOICES = [
+        ('pendiente', 'Pendiente'),
+        ('en_proceso', 'En proceso'),
+        ('completado', 'Completado'),
+        ('fallido', 'Fallido'),
+    ]
+
+    tipo = models.CharField(max_length=50)
+    presentacion = models.ForeignKey(
+        Presentacion,
+        on_delete=models.CASCADE,
+        related_name='trabajos',
+        blank=True,
+        null=True
+    )
+    datos = models.JSONField(default=dict, blank=True)
+    estado = models.CharField(max_length=12, choices=ESTADO_CHOICES, default='pendiente')
+    intentos = models.PositiveIntegerField(default=0)
+    max_intentos = models.PositiveIntegerField(default=5)
+    error = models.TextField(blank=True, default='')
+    trabajador = models.CharField(max_length=100, blank=True, default='')
+    ejecutar_despues = models.DateTimeField(default=timezone.now)
+    fecha_creacion = models.DateTimeField(auto_now_add=True)
+    fecha_inicio = models.DateTimeField(blank=True, null=True)
+    fecha_fin = models.DateTimeField(blank=True, null=True)
+
+    class Meta:
+        ordering = ['fecha_creacion']
+        indexes = [
+            models.Index(fields=['estado', 'ejecutar_despues'], name='presentacio_estado_6b1f0e_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.tipo} #{self.id} ({self.estado})"
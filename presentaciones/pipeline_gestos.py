@@ -0,0 +1,156 @@
+import queue
+import threading
+import time
+from collections import deque
+
+
+MUESTRAS_ESTADISTICAS = 300
+
+
+class UltimoValor:
+    def __init__(self, descartar=True, al_descartar=None):
+        self.descartar = descartar
+        self.al_descartar = al_descartar
+        self._condicion = threading.Condition()
+        self._valor = None
+        self._hay_valor = False
+        self._cerrado = False
+        self.descartados = 0
+
+    def poner(self, valor):
+        with self._condicion:
+            if self._hay_valor:
+                if self.descartar:
+                    self.descartados += 1
+                    if self.al_descartar:
+                        self.al_descartar(self._valor)
+                else:
+                    while self._hay_valor and not self._cerrado:
+                        self._condicion.wait()
+            self._valor = valor
+            self._hay_valor = True
+            self._condicion.notify_all()
+
+    def tomar(self, timeout=None):
+        with self._condicion:
+            if not self._hay_valor and not self._cerrado:
+                self._condicion.wait(timeout)
+            if not self._hay_valor:
+                return None
+            valor = self._valor
+            self._valor = None
+            self._hay_valor = False
+            self._condicion.notify_all()
+            return valor
+
+    def cerrar(self):
+        with self._condicion:
+            self._cerrado = True
+            self._condicion.notify_all()
+
+    @property
+    def cerrado(self):
+        with self._condicion:
+            return self._cerrado and not self._hay_valor
+
+
+class ColaDescarte:
+    def __init__(self, capacidad=1, descartar=True, al_descartar=None):
+        self.descartar = descartar
+        self.al_descartar = al_descartar
+        self._cola = queue.Queue(maxsize=capacidad)
+        self.descartados = 0
+
+    def poner(self, valor):
+        if not self.descartar:
+            self._cola.put(valor)
+            return
+        while True:
+            try:
+                self._cola.put_nowait(valor)
+                return
+            except queue.Full:
+                try:
+                    descartado = self._cola.get_nowait()
+                    self.descartados += 1
+                    if self.al_descartar:
+                        self.al_descartar(descartado)
+                except queue.Empty:
+                    pass
+
+    def tomar(self, timeout=None):
+        try:
+            return self._cola.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+
+class EstadisticasEtapa:
+    def __init__(self, nombre):
+        self.nombre = nombre
+        self._lock = threading.Lock()
+        self._duraciones = deque(maxlen=MUESTRAS_ESTADISTICAS)
+        self._instantes = deque(maxlen=MUESTRAS_ESTADISTICAS)
+        self.total = 0
+        self.tiempo_total = 0.0
+
+    def registrar(self, duracion):
+        with self._lock:
+            self.total += 1
+            self.tiempo_total += duracion
+            self._duraciones.append(duracion)
+            self._instantes.append(time.perf_counter())
+
+    def fps(self):
+        with self._lock:
+            if len(self._instantes) < 2:
+                return 0.0
+            intervalo = self._instantes[-1] - self._instantes[0]
+            return (len(self._instantes) - 1) / intervalo if intervalo > 0 else 0.0
+
+    def resumen(self):
+        with self._lock:
+            duraciones = sorted(self._duraciones)
+            return {
+                'etapa': self.nombre,
+                'frames': self.total,
+                'media_ms': self.tiempo_total / self.total * 1000 if self.total else 0.0,
+                'p95_ms': duraciones[int(0.95 * (len(duraciones) - 1))] * 1000 if duraciones else 0.0,
+            }
+
+
+class HiloCaptura(threading.Thread):
+    def __init__(self, fuente, salida, transformar=None, pool=None):
+        super().__init__(name='captura-gestos', daemon=True)
+        self.fuente = fuente
+        self.salida = salida
+        self.transformar = transformar
+        self.pool = pool
+        self.detener = threading.Event()
+        self.estadisticas = EstadisticasEtapa('captura')
+
+    def run(self):
+        indice = 0
+        lectura = None
+        try:
+            while not self.detener.is_set() and self.fuente.isOpened():
+                inicio = time.perf_counter()
+                destino = None
+                if self.pool is not None and lectura is not None:
+                    # Con transformación la lectura se descarta enseguida y siempre puede usar el mismo buffer;
+                    # sin ella el frame leído sigue por el pipeline y necesita uno propio del pool.
+                    destino = lectura if self.transformar else self.pool.tomar(lectura.shape, lectura.dtype)
+                ret, frame, manos, tiempo = self.fuente.leer(destino)
+                if destino is not None and frame is not destino and not self.transformar:
+                    # La fuente no usó el buffer (p. ej. imread): vuelve al pool sin haberse tocado.
+                    self.pool.liberar(destino)
+                if not ret:
+                    break
+                lectura = frame
+                if self.transformar:
+                    frame = self.transformar(frame)
+                self.estadisticas.registrar(time.perf_counter() - inicio)
+                self.salida.poner((indice, time.perf_counter(), frame, manos, tiempo))
+                indice += 1
+        finally:
+            self.salida.cerrar()
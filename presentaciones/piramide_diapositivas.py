@@ -0,0 +1,141 @@
+import json
+import os
+import shutil
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from django.conf import settings
+from django.urls import reverse
+
+from .servir_archivos import hash_contenido
+
+# Fuera de MEDIA_ROOT: las imágenes solo se sirven a su dueño desde la vista imagen_piramide.
+DIRECTORIO_PIRAMIDES = getattr(settings, 'PIRAMIDE_DIR', os.path.join(settings.BASE_DIR, 'piramides'))
+NIVELES_PIRAMIDE = tuple(getattr(settings, 'PIRAMIDE_NIVELES', (640, 1280, 1920)))
+FORMATO_PIRAMIDE = getattr(settings, 'PIRAMIDE_FORMATO', 'webp')
+CALIDAD_PIRAMIDE = getattr(settings, 'PIRAMIDE_CALIDAD', 82)
+PROCESOS_PIRAMIDE = getattr(settings, 'PIRAMIDE_PROCESOS', max(1, (os.cpu_count() or 2) - 1))
+ARCHIVO_MANIFIESTO = 'manifest.json'
+EXTENSIONES = {'webp': 'webp', 'jpeg': 'jpg'}
+
+
+def ruta_poppler():
+    ruta = os.path.abspath(os.path.join(settings.BASE_DIR, 'requeridos', 'poppler', 'Library', 'bin'))
+    return ruta if os.path.isdir(ruta) else None
+
+
+def directorio_piramide(presentacion_id):
+    return os.path.join(DIRECTORIO_PIRAMIDES, str(presentacion_id))
+
+
+def url_piramide(presentacion_id):
+    # La página agrega a esta base el nombre de cada archivo del manifiesto (ruta imagen_piramide).
+    return reverse('presentaciones:piramide_presentacion', args=[presentacion_id])
+
+
+def ruta_archivo_piramide(presentacion_id, nombre):
+    if not nombre or nombre.startswith('.') or os.path.basename(nombre) != nombre:
+        return None
+    ruta = os.path.join(directorio_piramide(presentacion_id), nombre)
+    return ruta if os.path.isfile(ruta) else None
+
+
+def leer_manifiesto(presentacion_id):
+    try:
+        with open(os.path.join(directorio_piramide(presentacion_id), ARCHIVO_MANIFIESTO), encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _renderizar_pagina(ruta_pdf, numero, directorio, niveles, formato, calidad, poppler):
+    from pdf2image import convert_from_path
+    from PIL import Image
+
+    inicio = time.perf_counter()
+    imagen = convert_from_path(ruta_pdf, first_page=numero, last_page=numero,
+                               size=(max(niveles), None), poppler_path=poppler)[0].convert('RGB')
+    ancho_original, alto_original = imagen.size
+
+    archivos = {}
+    # De mayor a menor: cada nivel se reduce desde el anterior, no desde la página completa.
+    for ancho in sorted(niveles, reverse=True):
+        if imagen.width > ancho:
+            imagen = imagen.resize((ancho, max(1, round(imagen.height * ancho / imagen.width))), Image.LANCZOS)
+        nombre = f"p{numero:04d}_{ancho}.{EXTENSIONES[formato]}"
+        opciones = {'quality': calidad}
+        if formato == 'webp':
+            opciones['method'] = 4
+        else:
+            opciones['optimize'] = True
+        imagen.save(os.path.join(directorio, nombre), format=formato.upper(), **opciones)
+        archivos[str(ancho)] = nombre
+
+    return {
+        'numero': numero,
+        'ancho': ancho_original,
+        'alto': alto_original,
+        'archivos': archivos,
+        'ms': round((time.perf_counter() - inicio) * 1000, 1),
+    }
+
+
+def generar_piramide(ruta_pdf, directorio, niveles=NIVELES_PIRAMIDE, formato=FORMATO_PIRAMIDE,
+                     calidad=CALIDAD_PIRAMIDE, procesos=PROCESOS_PIRAMIDE, progreso=None):
+    from pdf2image import pdfinfo_from_path
+
+    poppler = ruta_poppler()
+    total_paginas = int(pdfinfo_from_path(ruta_pdf, poppler_path=poppler)['Pages'])
+    hash_fuente = hash_contenido(ruta_pdf)
+
+    temporal = f"{directorio}.tmp-{os.getpid()}-{threading.get_ident()}"
+    shutil.rmtree(temporal, ignore_errors=True)
+    os.makedirs(temporal)
+
+    inicio = time.perf_counter()
+    paginas = []
+    try:
+        with ProcessPoolExecutor(max_workers=max(1, min(procesos, total_paginas))) as pool:
+            futuros = [
+                pool.submit(_renderizar_pagina, ruta_pdf, numero, temporal, niveles, formato, calidad, poppler)
+                for numero in range(1, total_paginas + 1)
+            ]
+            for futuro in as_completed(futuros):
+                paginas.append(futuro.result())
+                if progreso:
+                    progreso(len(paginas), total_paginas)
+
+        paginas.sort(key=lambda pagina: pagina['numero'])
+        manifiesto = {
+            'version': 1,
+            'hash': hash_fuente,
+            'formato': formato,
+            'niveles': sorted(niveles),
+            'total_paginas': total_paginas,
+            'ms_total': round((time.perf_counter() - inicio) * 1000, 1),
+            'paginas': paginas,
+        }
+        with open(os.path.join(temporal, ARCHIVO_MANIFIESTO), 'w', encoding='utf-8') as f:
+            json.dump(manifiesto, f)
+
+        shutil.rmtree(directorio, ignore_errors=True)
+        os.makedirs(os.path.dirname(directorio), exist_ok=True)
+        os.replace(temporal, directorio)
+        return manifiesto
+    except BaseException:
+        shutil.rmtree(temporal, ignore_errors=True)
+        raise
+
+
+def eliminar_piramide(presentacion_id):
+    shutil.rmtree(directorio_piramide(presentacion_id), ignore_errors=True)
+
+
+def piramide_vigente(presentacion_id, ruta_pdf):
+    manifiesto = leer_manifiesto(presentacion_id)
+    if manifiesto is None:
+        return None
+    if ruta_pdf and os.path.exists(ruta_pdf) and manifiesto.get('hash') != hash_contenido(ruta_pdf):
+        return None
+    return manifiesto
@@ -0,0 +1,99 @@
+import base64
+import struct
+
+from django.conf import settings
+
+
+VERSION = 1
+TIPO_CONTENIDO = 'application/octet-stream'
+FORMATOS = ('binario', 'json')
+FORMATO_POR_DEFECTO = getattr(settings, 'COMANDOS_FORMATO', 'binario')
+
+# El índice es el código de operación: solo se agregan tipos al final y un cambio incompatible sube VERSION.
+# presentar.js recibe esta misma tabla desde la plantilla.
+TIPOS = (
+    'next', 'prev', 'toggle_draw_mode', 'clear_drawings', 'reset', 'zoom', 'puntero',
+    'start_draw', 'drawing', 'stop_draw', 'start_erase', 'erasing', 'stop_erase',
+    'start_move', 'moving', 'stop_move',
+)
+CODIGOS = {tipo: codigo for codigo, tipo in enumerate(TIPOS)}
+# Los tipos compuestos van primero para que "stop_draw_..." no se confunda con otro prefijo.
+PREFIJOS = sorted(TIPOS, key=len, reverse=True)
+
+# Cabecera (little-endian, 16 bytes): versión, código, cantidad de valores, seq y timestamp en segundos;
+# le siguen los valores como float32 (x, y de cada punto; factor, x, y del zoom).
+CABECERA = struct.Struct('<BBHId')
+VALOR = 4
+VALORES_MAXIMOS = 0xFFFF
+
+
+class ComandoInvalido(ValueError):
+    pass
+
+
+def separar(comando):
+    # "drawing_0.1_0.2_0.3_0.4" -> ('drawing', [0.1, 0.2, 0.3, 0.4])
+    for tipo in PREFIJOS:
+        if comando == tipo:
+            return tipo, []
+        if comando.startswith(tipo + '_'):
+            try:
+                return tipo, [float(valor) for valor in comando[len(tipo) + 1:].split('_')]
+            except ValueError as e:
+                raise ComandoInvalido(f"Valores inválidos en {comando!r}") from e
+    raise ComandoInvalido(f"Tipo de comando desconocido: {comando!r}")
+
+
+def unir(tipo, valores):
+    # float32 conserva ~7 cifras: con 6 se recupera el texto que generó el detector.
+    return tipo + ''.join(f"_{valor:.6g}" for valor in valores)
+
+
+def codificar(comando, seq=0, timestamp=0.0):
+    tipo, valores = separar(comando)
+    if len(valores) > VALORES_MAXIMOS:
+        raise ComandoInvalido(f"Demasiados valores en {tipo}: {len(valores)}")
+    return CABECERA.pack(VERSION, CODIGOS[tipo], len(valores), seq & 0xFFFFFFFF, timestamp) \
+        + struct.pack(f'<{len(valores)}f', *valores)
+
+
+def codificar_evento(evento):
+    try:
+        return codificar(evento['comando'], evento['seq'], evento['timestamp'])
+    except ComandoInvalido:
+        # Llegó por JSON con un tipo fuera del esquema: el cliente binario tampoco sabría procesarlo.
+        return b''
+
+
+def decodificar(datos):
+    datos = memoryview(datos)
+    eventos = []
+    desplazamiento = 0
+    while desplazamiento < len(datos):
+        if len(datos) - desplazamiento < CABECERA.size:
+            raise ComandoInvalido("Cabecera incompleta")
+        version, codigo, cantidad, seq, timestamp = CABECERA.unpack_from(datos, desplazamiento)
+        if version != VERSION:
+            raise ComandoInvalido(f"Versión de protocolo no soportada: {version}")
+        if codigo >= len(TIPOS):
+            raise ComandoInvalido(f"Código de operación desconocido: {codigo}")
+        desplazamiento += CABECERA.size
+        fin = desplazamiento + cantidad * VALOR
+        if fin > len(datos):
+            raise ComandoInvalido("Valores incompletos")
+        valores = struct.unpack_from(f'<{cantidad}f', datos, desplazamiento)
+        desplazamiento = fin
+        tipo = TIPOS[codigo]
+        eventos.append({
+            'seq': seq,
+            'timestamp': timestamp,
+            'tipo': tipo,
+            'valores': valores,
+            'comando': unir(tipo, valores),
+        })
+    return eventos
+
+
+def evento_sse_binario(evento):
+    # SSE solo transporta texto: el binario viaja en base64, todavía más corto que el JSON.
+    return base64.b64encode(codificar_evento(evento)).decode('ascii')
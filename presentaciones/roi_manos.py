@@ -0,0 +1,87 @@
+import cv2
+
+from .buffers_frames import BufferReutilizable, convertir_rgb
+from .clasificador_gestos import landmarks_a_array
+
+
+ANCHO_INFERENCIA = 320
+MARGEN_ROI = 0.35
+INTERVALO_BUSQUEDA = 15
+LADO_MINIMO_ROI = 96
+
+
+class InferenciaAdaptativa:
+    def __init__(self, hands, ancho_inferencia=ANCHO_INFERENCIA, margen=MARGEN_ROI,
+                 intervalo_busqueda=INTERVALO_BUSQUEDA):
+        self.hands = hands
+        self.ancho_inferencia = ancho_inferencia
+        self.margen = margen
+        self.intervalo_busqueda = intervalo_busqueda
+
+        self._caja = None
+        self._frames_desde_busqueda = 0
+        self.busquedas_completas = 0
+        self.inferencias_roi = 0
+        self.perdidas = 0
+        self._reducida = BufferReutilizable()
+        self._rgb = BufferReutilizable()
+
+    def procesar(self, frame):
+        alto, ancho = frame.shape[:2]
+
+        if self._caja is not None and self._frames_desde_busqueda < self.intervalo_busqueda:
+            self._frames_desde_busqueda += 1
+            x0, y0, x1, y1 = self._caja
+            manos = self._inferir(frame[y0:y1, x0:x1])
+            if len(manos):
+                self.inferencias_roi += 1
+                ancho_roi, alto_roi = x1 - x0, y1 - y0
+                manos[:, :, 0] = (manos[:, :, 0] * ancho_roi + x0) / ancho
+                manos[:, :, 1] = (manos[:, :, 1] * alto_roi + y0) / alto
+                manos[:, :, 2] *= ancho_roi / ancho
+                self._actualizar_caja(manos, ancho, alto)
+                return manos
+            self.perdidas += 1
+
+        self.busquedas_completas += 1
+        self._frames_desde_busqueda = 0
+        manos = self._inferir(frame)
+        self._actualizar_caja(manos, ancho, alto)
+        return manos
+
+    def _inferir(self, imagen):
+        alto, ancho = imagen.shape[:2]
+        if ancho > self.ancho_inferencia:
+            escala = self.ancho_inferencia / ancho
+            alto_reducido = max(1, int(alto * escala))
+            imagen = cv2.resize(imagen, (self.ancho_inferencia, alto_reducido),
+                                dst=self._reducida.vista((alto_reducido, self.ancho_inferencia, 3)),
+                                interpolation=cv2.INTER_AREA)
+        rgb = convertir_rgb(imagen, self._rgb)
+        # Las coordenadas normalizadas no dependen de la resolución de entrada.
+        return landmarks_a_array(self.hands.process(rgb).multi_hand_landmarks).copy()
+
+    def _actualizar_caja(self, manos, ancho, alto):
+        if not len(manos):
+            self._caja = None
+            return
+
+        x_min, y_min = manos[:, :, :2].reshape(-1, 2).min(axis=0)
+        x_max, y_max = manos[:, :, :2].reshape(-1, 2).max(axis=0)
+        lado = max((x_max - x_min) * ancho, (y_max - y_min) * alto)
+        lado = max(lado * (1 + 2 * self.margen), LADO_MINIMO_ROI)
+        centro_x = (x_min + x_max) / 2 * ancho
+        centro_y = (y_min + y_max) / 2 * alto
+
+        x0 = int(max(0, centro_x - lado / 2))
+        y0 = int(max(0, centro_y - lado / 2))
+        x1 = int(min(ancho, centro_x + lado / 2))
+        y1 = int(min(alto, centro_y + lado / 2))
+        self._caja = (x0, y0, x1, y1) if x1 - x0 > 1 and y1 - y0 > 1 else None
+
+    def estadisticas(self):
+        return {
+            'busquedas_completas': self.busquedas_completas,
+            'inferencias_roi': self.inferencias_roi,
+            'perdidas': self.perdidas,
+        }
@@ -0,0 +1,132 @@
+import hashlib
+import mimetypes
+import os
+import re
+import threading
+from collections import OrderedDict
+
+from django.http import FileResponse, HttpResponse, StreamingHttpResponse
+from django.utils.http import http_date
+
+TAMANO_BLOQUE = 256 * 1024
+MAXIMO_HASHES = 128
+CACHE_CONTROL_VERSIONADO = 'private, max-age=31536000, immutable'
+CACHE_CONTROL_SIN_VERSION = 'private, no-cache'
+
+_lock = threading.Lock()
+_hashes = OrderedDict()
+
+
+def hash_contenido(ruta):
+    estado = os.stat(ruta)
+    clave = (ruta, estado.st_size, estado.st_mtime_ns)
+    with _lock:
+        if clave in _hashes:
+            _hashes.move_to_end(clave)
+            return _hashes[clave]
+
+    digest = hashlib.sha256()
+    with open(ruta, 'rb') as archivo:
+        for bloque in iter(lambda: archivo.read(1024 * 1024), b''):
+            digest.update(bloque)
+    valor = digest.hexdigest()
+
+    with _lock:
+        _hashes[clave] = valor
+        while len(_hashes) > MAXIMO_HASHES:
+            _hashes.popitem(last=False)
+    return valor
+
+
+def version_archivo(ruta):
+    estado = os.stat(ruta)
+    return hashlib.sha256(f"{ruta}:{estado.st_size}:{estado.st_mtime_ns}".encode('utf-8')).hexdigest()[:16]
+
+
+def _coincide_etag(cabecera, etag):
+    if not cabecera:
+        return False
+    if cabecera.strip() == '*':
+        return True
+    # If-None-Match usa comparación débil.
+    return any(valor.strip().removeprefix('W/') == etag for valor in cabecera.split(','))
+
+
+def _rango(cabecera, tamano):
+    coincidencia = re.fullmatch(r'\s*bytes=(\d*)-(\d*)\s*', cabecera)
+    if not coincidencia or coincidencia.group(1) == coincidencia.group(2) == '':
+        # Varios rangos o una sintaxis desconocida: se responde el archivo completo.
+        return None
+    inicio, fin = coincidencia.groups()
+    if inicio == '':
+        largo = int(fin)
+        if largo == 0:
+            return False
+        return max(0, tamano - largo), tamano - 1
+    inicio = int(inicio)
+    fin = min(int(fin), tamano - 1) if fin else tamano - 1
+    if inicio >= tamano or inicio > fin:
+        return False
+    return inicio, fin
+
+
+def _leer_segmento(ruta, inicio, largo):
+    with open(ruta, 'rb') as archivo:
+        archivo.seek(inicio)
+        while largo > 0:
+            bloque = archivo.read(min(TAMANO_BLOQUE, largo))
+            if not bloque:
+                break
+            largo -= len(bloque)
+            yield bloque
+
+
+def respuesta_archivo(request, ruta, versionado=False):
+    estado = os.stat(ruta)
+    tamano = estado.st_size
+    etag = f'"{hash_contenido(ruta)}"'
+    tipo = mimetypes.guess_type(ruta)[0] or 'application/octet-stream'
+
+    cabeceras = {
+        'ETag': etag,
+        'Last-Modified': http_date(estado.st_mtime),
+        'Accept-Ranges': 'bytes',
+        'Cache-Control': CACHE_CONTROL_VERSIONADO if versionado else CACHE_CONTROL_SIN_VERSION,
+    }
+
+    if _coincide_etag(request.headers.get('If-None-Match'), etag):
+        respuesta = HttpResponse(status=304)
+        for nombre, valor in cabeceras.items():
+            respuesta[nombre] = valor
+        return respuesta
+
+    rango = None
+    cabecera_rango = request.headers.get('Range')
+    if cabecera_rango and request.method == 'GET':
+        if_range = request.headers.get('If-Range')
+        if not if_range or if_range.strip() == etag:
+            rango = _rango(cabecera_rango, tamano)
+
+    if rango is False:
+        respuesta = HttpResponse(status=416)
+        respuesta['Content-Range'] = f'bytes */{tamano}'
+        respuesta['Accept-Ranges'] = 'bytes'
+        return respuesta
+
+    if request.method == 'HEAD':
+        respuesta = HttpResponse(content_type=tipo)
+        respuesta['Content-Length'] = str(tamano)
+    elif rango:
+        inicio, fin = rango
+        largo = fin - inicio + 1
+        respuesta = StreamingHttpResponse(_leer_segmento(ruta, inicio, largo), status=206, content_type=tipo)
+        respuesta['Content-Range'] = f'bytes {inicio}-{fin}/{tamano}'
+        respuesta['Content-Length'] = str(largo)
+    else:
+        respuesta = FileResponse(open(ruta, 'rb'), content_type=tipo)
+        respuesta['Content-Length'] = str(tamano)
+
+    respuesta['Content-Disposition'] = f'inline; filename="{os.path.basename(ruta)}"'
+    for nombre, valor in cabeceras.items():
+        respuesta[nombre] = valor
+    return respuesta
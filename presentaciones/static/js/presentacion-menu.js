@@ -71,17 +71,24 @@
         }
     }
 
-    function initializeMenus() {
-        document.querySelectorAll('.presentation-menu-btn').forEach(button => {
+    function initializeCard(card) {
+        card.querySelectorAll('.presentation-menu-btn').forEach(button => {
             button.addEventListener('click', toggleMenu);
         });
         
-        document.querySelectorAll('.dropdown-item').forEach(item => {
+        card.querySelectorAll('.dropdown-item').forEach(item => {
             const action = item.dataset.action;
-            const presentationId = item.closest('.presentation-card').dataset.id;
+            const presentationId = card.dataset.id;
             
             item.addEventListener('click', (e) => handleMenuAction(e, action, presentationId));
         });
+    }
+
+    // Las tarjetas que agrega el desplazamiento infinito se inicializan con esta función.
+    window.initializePresentationCard = initializeCard;
+
+    function initializeMenus() {
+        document.querySelectorAll('.presentation-card').forEach(initializeCard);
         
         document.addEventListener('click', (event) => {
             if (!event.target.closest('.presentation-dropdown') && 
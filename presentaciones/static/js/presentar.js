@@ -3,8 +3,30 @@ console.log('Iniciando presentar.js...');
 pdfjsLib.GlobalWorkerOptions.workerSrc = 'https://cdnjs.cloudflare.com/ajax/libs/pdf.js/3.8.162/pdf.worker.min.js';
 
 
-const url = typeof PDF_URL !== 'undefined' ? PDF_URL : '';
+let url = typeof PDF_URL !== 'undefined' ? PDF_URL : '';
+const descargaUrl = typeof DESCARGA_URL !== 'undefined' ? DESCARGA_URL : '';
 const comandoGestoUrl = typeof COMANDO_GESTO_URL !== 'undefined' ? COMANDO_GESTO_URL : '/presentaciones/comando_gesto/';
+const streamComandosUrl = typeof STREAM_COMANDOS_URL !== 'undefined' ? STREAM_COMANDOS_URL : '';
+const sesionComandos = typeof SESION_COMANDOS !== 'undefined' ? SESION_COMANDOS : '';
+const protocolElement = document.getElementById('protocolo-comandos');
+const commandProtocol = protocolElement
+    ? JSON.parse(protocolElement.textContent)
+    : { version: 1, tipos: [], formato: 'json' };
+// JSON queda como respaldo para depurar: ?formato_comandos=json en la URL de la presentación.
+const useBinaryCommands = commandProtocol.formato === 'binario' && commandProtocol.tipos.length > 0;
+
+// Identifica a esta página ante la cola de comandos del servidor, que libera lo que ya se leyó.
+const lectorComandos = Math.random().toString(36).slice(2, 12);
+
+const urlConSesion = (base, desde) => {
+    const params = new URLSearchParams();
+    if (sesionComandos) params.set('sesion', sesionComandos);
+    params.set('lector', lectorComandos);
+    if (useBinaryCommands) params.set('formato', 'binario');
+    if (desde !== null && desde !== undefined) params.set('desde', desde);
+    const query = params.toString();
+    return query ? `${base}?${query}` : base;
+};
 
 
 let pdfDoc = null;
@@ -433,6 +455,59 @@ const calculateAndSetBaseScale = async () => {
     }
 };
 
+const piramideUrl = typeof PIRAMIDE_URL !== 'undefined' ? PIRAMIDE_URL : '';
+let slidePyramid = null;
+let pyramidBaseUrl = '';
+const pyramidImages = new Map();
+
+const loadPyramid = async (attempt = 0) => {
+    if (!piramideUrl) return;
+    try {
+        const response = await fetch(piramideUrl, { headers: { 'Accept': 'application/json' } });
+        const data = await response.json();
+        
+        if (data.estado === 'lista') {
+            slidePyramid = data.manifiesto;
+            pyramidBaseUrl = data.base_url;
+            console.log(`✓ Diapositivas prerenderizadas disponibles (${slidePyramid.total_paginas} páginas)`);
+            return;
+        }
+        if (data.estado === 'generando' && attempt < 100) {
+            setTimeout(() => loadPyramid(attempt + 1), 3000);
+        }
+    } catch (err) {
+        console.error("Error al consultar diapositivas prerenderizadas:", err);
+    }
+};
+
+const pyramidImage = (num, width) => {
+    if (!slidePyramid || num < 1 || num > slidePyramid.paginas.length) return null;
+    
+    const pagina = slidePyramid.paginas[num - 1];
+    // Nivel más pequeño que cubra el ancho del canvas; si ninguno alcanza (zoom alto) se usa pdf.js.
+    const nivel = slidePyramid.niveles.find(ancho => ancho >= width);
+    if (!nivel || !pagina.archivos[nivel]) return null;
+    
+    const key = `${num}_${nivel}`;
+    if (!pyramidImages.has(key)) {
+        pyramidImages.set(key, new Promise(resolve => {
+            const img = new Image();
+            img.onload = () => resolve(img);
+            img.onerror = () => {
+                pyramidImages.delete(key);
+                resolve(null);
+            };
+            img.src = pyramidBaseUrl + pagina.archivos[nivel];
+        }));
+    }
+    return pyramidImages.get(key);
+};
+
+const prefetchAdjacentSlides = (num, width) => {
+    pyramidImage(num + 1, width);
+    pyramidImage(num - 1, width);
+};
+
 const renderPage = async (num, shouldScroll = false, scrollX = 0, scrollY = 0) => {
     if (!pdfDoc || num < 1 || num > pdfDoc.numPages || !canvas || !ctx) return;
 
@@ -450,7 +525,13 @@ const renderPage = async (num, shouldScroll = false, scrollX = 0, scrollY = 0) =
         }
 
         ctx.clearRect(0, 0, canvas.width, canvas.height);
-        await page.render({ canvasContext: ctx, viewport: viewport }).promise;
+        const prerendered = await pyramidImage(num, canvas.width);
+        if (prerendered) {
+            ctx.drawImage(prerendered, 0, 0, canvas.width, canvas.height);
+        } else {
+            await page.render({ canvasContext: ctx, viewport: viewport }).promise;
+        }
+        prefetchAdjacentSlides(num, canvas.width);
 
         currentPage = num;
         
@@ -486,7 +567,12 @@ const renderPage = async (num, shouldScroll = false, scrollX = 0, scrollY = 0) =
 
 const loadPdf = async () => {
     try {
-        const loadingTask = pdfjsLib.getDocument(url);
+        // El servidor admite rangos: pdf.js pide primero los bytes de la primera página.
+        const loadingTask = pdfjsLib.getDocument({
+            url: url,
+            rangeChunkSize: 262144,
+            disableAutoFetch: false,
+        });
         pdfDoc = await loadingTask.promise;
         
         await calculateAndSetBaseScale();
@@ -667,10 +753,8 @@ const clientCooldowns = {
     reset: { last: 0, duration: 800 },
     toggle_draw_mode: { last: 0, duration: 1000 },
     start_draw: { last: 0, duration: 30 },
-    drawing: { last: 0, duration: 15 },
     stop_draw: { last: 0, duration: 30 },
     start_erase: { last: 0, duration: 30 },
-    erasing: { last: 0, duration: 15 },
     stop_erase: { last: 0, duration: 30 },
     clear_drawings: { last: 0, duration: 800 }
 };
@@ -697,10 +781,64 @@ const getRemainingCooldown = (commandType) => {
     return Math.max(0, cooldown.duration - timePassed);
 };
 
-const processCommand = (comando) => {
-    const currentTime = Date.now();
-    
-    if (comando === "next") {
+// Comandos tipados: { tipo, valores }. En binario llegan así; en JSON (depuración) se separa el texto una vez.
+const commandTypesByLength = [...commandProtocol.tipos].sort((a, b) => b.length - a.length);
+
+const parseCommandText = (comando) => {
+    const tipo = commandTypesByLength.find(t => comando === t || comando.startsWith(`${t}_`));
+    if (!tipo) return { tipo: comando, valores: [] };
+    const valores = comando === tipo ? [] : comando.slice(tipo.length + 1).split("_").map(parseFloat);
+    return { tipo, valores };
+};
+
+// Cabecera de 16 bytes (little-endian): versión, código, cantidad de valores, seq y timestamp; luego float32.
+const COMMAND_HEADER_SIZE = 16;
+
+const decodeCommands = (buffer) => {
+    const view = new DataView(buffer);
+    const commands = [];
+    let offset = 0;
+    while (offset + COMMAND_HEADER_SIZE <= view.byteLength) {
+        const version = view.getUint8(offset);
+        if (version !== commandProtocol.version) {
+            throw new Error(`Versión de protocolo no soportada: ${version}`);
+        }
+        const tipo = commandProtocol.tipos[view.getUint8(offset + 1)];
+        const count = view.getUint16(offset + 2, true);
+        const seq = view.getUint32(offset + 4, true);
+        const timestamp = view.getFloat64(offset + 8, true);
+        offset += COMMAND_HEADER_SIZE;
+        const valores = [];
+        for (let i = 0; i < count; i++, offset += 4) {
+            valores.push(view.getFloat32(offset, true));
+        }
+        commands.push({ seq, timestamp, tipo, valores });
+    }
+    return commands;
+};
+
+const decodeBase64Commands = (texto) => {
+    const binario = atob(texto);
+    const bytes = new Uint8Array(binario.length);
+    for (let i = 0; i < binario.length; i++) bytes[i] = binario.charCodeAt(i);
+    return decodeCommands(bytes.buffer);
+};
+
+// "drawing" puede traer varios puntos: x1, y1, x2, y2...
+const pointsFrom = (valores) => {
+    const points = [];
+    for (let i = 0; i + 1 < valores.length; i += 2) {
+        const x = valores[i];
+        const y = valores[i + 1];
+        if (!isNaN(x) && !isNaN(y)) points.push({ x, y });
+    }
+    return points;
+};
+
+const processCommand = ({ tipo, valores }) => {
+    const point = pointsFrom(valores)[0];
+
+    if (tipo === "next") {
         if (canProcessCommand('next')) {
             goToNextPage();
             if (lastCommandDisplay) lastCommandDisplay.textContent = "✓ Página siguiente";
@@ -710,7 +848,7 @@ const processCommand = (comando) => {
             if (lastCommandDisplay) lastCommandDisplay.textContent = `⏳ Cooldown navegación: ${(remaining/1000).toFixed(1)}s`;
         }
     } 
-    else if (comando === "prev") {
+    else if (tipo === "prev") {
         if (canProcessCommand('prev')) {
             goToPrevPage();
             if (lastCommandDisplay) lastCommandDisplay.textContent = "✓ Página anterior";
@@ -720,7 +858,7 @@ const processCommand = (comando) => {
             if (lastCommandDisplay) lastCommandDisplay.textContent = `⏳ Cooldown navegación: ${(remaining/1000).toFixed(1)}s`;
         }
     } 
-    else if (comando === "toggle_draw_mode") {
+    else if (tipo === "toggle_draw_mode") {
         if (canProcessCommand('toggle_draw_mode')) {
             updateDrawingModeIndicator(!drawingMode);
             if (lastCommandDisplay) lastCommandDisplay.textContent = `✓ Modo dibujo: ${drawingMode ? 'ACTIVADO' : 'DESACTIVADO'}`;
@@ -729,117 +867,73 @@ const processCommand = (comando) => {
             if (lastCommandDisplay) lastCommandDisplay.textContent = `⏳ Cooldown modo dibujo: ${(remaining/1000).toFixed(1)}s`;
         }
     }
-    else if (comando.startsWith("puntero_")) {
-        if (canProcessCommand('puntero')) {
-            const parts = comando.split("_");
-            if (parts.length >= 3) {
-                const x = parseFloat(parts[1]);
-                const y = parseFloat(parts[2]);
-                if (!isNaN(x) && !isNaN(y)) {
-                    updatePointer(x, y, true, 'pointer');
-                    updateModeIndicator('pointer');
-                }
-            }
+    else if (tipo === "puntero") {
+        if (canProcessCommand('puntero') && point) {
+            updatePointer(point.x, point.y, true, 'pointer');
+            updateModeIndicator('pointer');
         }
     }
-    else if (comando.startsWith("start_draw_")) {
-        if (canProcessCommand('start_draw')) {
-            const parts = comando.split("_");
-            if (parts.length >= 4) {
-                const x = parseFloat(parts[2]);
-                const y = parseFloat(parts[3]);
-                if (!isNaN(x) && !isNaN(y)) {
-                    startDrawing(x, y);
-                    updatePointer(x, y, true, 'drawing');
-                }
-            }
+    else if (tipo === "start_draw") {
+        if (canProcessCommand('start_draw') && point) {
+            startDrawing(point.x, point.y);
+            updatePointer(point.x, point.y, true, 'drawing');
         }
     } 
-    else if (comando.startsWith("drawing_")) {
+    else if (tipo === "drawing") {
         if (canProcessCommand('drawing')) {
-            const parts = comando.split("_");
-            if (parts.length >= 3) {
-                const x = parseFloat(parts[1]);
-                const y = parseFloat(parts[2]);
-                if (!isNaN(x) && !isNaN(y)) {
-                    addDrawingPoint(x, y);
-                    updatePointer(x, y, true, 'drawing');
-                }
+            const points = pointsFrom(valores);
+            points.forEach(({ x, y }) => addDrawingPoint(x, y));
+            if (points.length) {
+                const last = points[points.length - 1];
+                updatePointer(last.x, last.y, true, 'drawing');
             }
         }
     } 
-    else if (comando.startsWith("stop_draw_")) {
-        if (canProcessCommand('stop_draw')) {
-            const parts = comando.split("_");
-            if (parts.length >= 4) {
-                const x = parseFloat(parts[2]);
-                const y = parseFloat(parts[3]);
-                if (!isNaN(x) && !isNaN(y)) {
-                    stopDrawing();
-                    updatePointer(x, y, true, 'pointer');
-                    updateModeIndicator('pointer');
-                }
-            }
+    else if (tipo === "stop_draw") {
+        if (canProcessCommand('stop_draw') && point) {
+            stopDrawing();
+            updatePointer(point.x, point.y, true, 'pointer');
+            updateModeIndicator('pointer');
         }
     }
-    else if (comando.startsWith("start_erase_")) {
-        if (canProcessCommand('start_erase')) {
-            const parts = comando.split("_");
-            if (parts.length >= 4) {
-                const x = parseFloat(parts[2]);
-                const y = parseFloat(parts[3]);
-                if (!isNaN(x) && !isNaN(y)) {
-                    startErasing(x, y);
-                    updatePointer(x, y, true, 'erasing');
-                }
-            }
+    else if (tipo === "start_erase") {
+        if (canProcessCommand('start_erase') && point) {
+            startErasing(point.x, point.y);
+            updatePointer(point.x, point.y, true, 'erasing');
         }
     } 
-    else if (comando.startsWith("erasing_")) {
+    else if (tipo === "erasing") {
         if (canProcessCommand('erasing')) {
-            const parts = comando.split("_");
-            if (parts.length >= 3) {
-                const x = parseFloat(parts[1]);
-                const y = parseFloat(parts[2]);
-                if (!isNaN(x) && !isNaN(y)) {
-                    addErasePoint(x, y);
-                    updatePointer(x, y, true, 'erasing');
-                }
+            const points = pointsFrom(valores);
+            points.forEach(({ x, y }) => addErasePoint(x, y));
+            if (points.length) {
+                const last = points[points.length - 1];
+                updatePointer(last.x, last.y, true, 'erasing');
             }
         }
     } 
-    else if (comando.startsWith("stop_erase_")) {
-        if (canProcessCommand('stop_erase')) {
-            const parts = comando.split("_");
-            if (parts.length >= 4) {
-                const x = parseFloat(parts[2]);
-                const y = parseFloat(parts[3]);
-                if (!isNaN(x) && !isNaN(y)) {
-                    stopErasing();
-                    updatePointer(x, y, true, 'pointer');
-                    updateModeIndicator('pointer');
-                }
-            }
+    else if (tipo === "stop_erase") {
+        if (canProcessCommand('stop_erase') && point) {
+            stopErasing();
+            updatePointer(point.x, point.y, true, 'pointer');
+            updateModeIndicator('pointer');
         }
     }
-    else if (comando === "clear_drawings") {
+    else if (tipo === "clear_drawings") {
         if (canProcessCommand('clear_drawings')) {
             clearPageDrawings();
             if (lastCommandDisplay) lastCommandDisplay.textContent = "✓ Dibujos limpiados";
             updateModeIndicator('pointer');
         }
     }
-    else if (comando.startsWith("zoom_")) {
+    else if (tipo === "zoom") {
         if (canProcessCommand('zoom')) {
-            const parts = comando.split("_");
-            if (parts.length >= 2) {
-                const zoomValue = parseFloat(parts[1]);
-                const centerX = parts.length >= 3 ? parseFloat(parts[2]) : pointerX;
-                const centerY = parts.length >= 4 ? parseFloat(parts[3]) : pointerY;
-                if (!isNaN(zoomValue)) {
-                    setGestureZoom(zoomValue, centerX, centerY);
-                    if (isPointerActive) updatePointer(centerX, centerY, false);
-                }
+            const [zoomValue, x, y] = valores;
+            const centerX = x !== undefined ? x : pointerX;
+            const centerY = y !== undefined ? y : pointerY;
+            if (zoomValue !== undefined && !isNaN(zoomValue)) {
+                setGestureZoom(zoomValue, centerX, centerY);
+                if (isPointerActive) updatePointer(centerX, centerY, false);
             }
         } else {
             const remaining = getRemainingCooldown('zoom');
@@ -848,22 +942,21 @@ const processCommand = (comando) => {
             }
         }
     }
-    else if (comando.startsWith("start_move_")) {
-        const parts = comando.split("_");
+    else if (tipo === "start_move") {
+        if (!point) return;
         isMoving = true;
-        moveStartX = parseFloat(parts[2]);
-        moveStartY = parseFloat(parts[3]);
+        moveStartX = point.x;
+        moveStartY = point.y;
         moveOffsetX = 0;
         moveOffsetY = 0;
         updateModeIndicator('moving');
         updatePointer(moveStartX, moveStartY, true, 'moving');
         if (lastCommandDisplay) lastCommandDisplay.textContent = "👌 Agarrando dibujo...";
     }
-    else if (comando.startsWith("moving_")) {
-        if (!isMoving) return;
-        const parts = comando.split("_");
-        const currentX = parseFloat(parts[1]);
-        const currentY = parseFloat(parts[2]);
+    else if (tipo === "moving") {
+        if (!isMoving || !point) return;
+        const currentX = point.x;
+        const currentY = point.y;
         
         moveOffsetX = currentX - moveStartX;
         moveOffsetY = currentY - moveStartY;
@@ -872,7 +965,7 @@ const processCommand = (comando) => {
         redrawCanvas();
         if (lastCommandDisplay) lastCommandDisplay.textContent = `Moviendo: dx=${(moveOffsetX*100).toFixed(1)}%, dy=${(moveOffsetY*100).toFixed(1)}%`;
     }
-    else if (comando === "stop_move" || comando.startsWith("stop_move_")) {
+    else if (tipo === "stop_move") {
         if (!isMoving) return;
         
         const pageDrawings = drawingPaths.get(currentPage);
@@ -894,7 +987,7 @@ const processCommand = (comando) => {
         updatePointer(pointerX, pointerY, false);
         if (lastCommandDisplay) lastCommandDisplay.textContent = "✓ Dibujo soltado";
     }
-    else if (comando === "reset") {
+    else if (tipo === "reset") {
         if (canProcessCommand('reset')) {
             resetZoom();
             if (lastCommandDisplay) lastCommandDisplay.textContent = "✓ Zoom reiniciado";
@@ -905,38 +998,60 @@ const processCommand = (comando) => {
         }
     }
     else {
-        console.log("Comando no reconocido:", comando);
+        console.log("Comando no reconocido:", tipo, valores);
     }
 };
 
-let lastProcessedCommand = null;
+let lastSeq = null;
 let commandCounter = 0;
 
+// Si el servidor se reinició su seq vuelve a empezar: sin esto se ignorarían todos los comandos nuevos.
+const syncLastSeq = (ultimoSeq) => {
+    if (lastSeq !== null && ultimoSeq < lastSeq) {
+        console.log(`Secuencia reiniciada por el servidor (${lastSeq} -> ${ultimoSeq})`);
+        lastSeq = ultimoSeq;
+    }
+};
+
+// evento: { seq, tipo, valores } (binario) o { seq, comando } (JSON).
+const handleIncomingCommand = (evento) => {
+    if (lastSeq !== null && evento.seq <= lastSeq) return;
+    lastSeq = evento.seq;
+    commandCounter++;
+    const command = evento.tipo ? evento : parseCommandText(evento.comando);
+    console.log(`[${commandCounter}] Procesando comando #${evento.seq}:`, command.tipo, command.valores);
+    processCommand(command);
+};
+
 const pollForCommands = async () => {
     try {
-        const response = await fetch(comandoGestoUrl, {
+        const pollUrl = urlConSesion(comandoGestoUrl, lastSeq);
+        const response = await fetch(pollUrl, {
             method: 'GET',
             headers: {
-                'Accept': 'application/json',
+                'Accept': useBinaryCommands ? 'application/octet-stream' : 'application/json',
             }
         });
         
         if (response.ok) {
-            const data = await response.json();
+            let comandos;
+            let ultimoSeq;
+            if (useBinaryCommands) {
+                ultimoSeq = parseInt(response.headers.get('X-Ultimo-Seq'), 10);
+                comandos = decodeCommands(await response.arrayBuffer());
+            } else {
+                const data = await response.json();
+                if (!data.success) return;
+                ultimoSeq = data.ultimo_seq;
+                comandos = data.comandos;
+            }
             
-            if (data.success && data.comando) {
-                const isContinuousCommand = data.comando.startsWith('drawing_') || 
-                                           data.comando.startsWith('erasing_') ||
-                                           data.comando.startsWith('moving_') ||
-                                           data.comando.startsWith('puntero_');
-                
-                if (isContinuousCommand || data.comando !== lastProcessedCommand) {
-                    lastProcessedCommand = data.comando;
-                    commandCounter++;
-                    console.log(`[${commandCounter}] Procesando comando:`, data.comando);
-                    processCommand(data.comando);
-                }
+            if (lastSeq === null) {
+                lastSeq = ultimoSeq;
+                return;
             }
+            syncLastSeq(ultimoSeq);
+            comandos.forEach(handleIncomingCommand);
         }
     } catch (err) {
         console.error("Error al consultar comandos:", err);
@@ -970,17 +1085,169 @@ const stopPolling = () => {
 };
 
 
+let commandStream = null;
+let streamFailures = 0;
+const MAX_STREAM_FAILURES = 3;
+
+const startStream = () => {
+    if (!streamComandosUrl || typeof EventSource === 'undefined' || streamFailures >= MAX_STREAM_FAILURES) {
+        return false;
+    }
+    
+    stopStream();
+    const url = urlConSesion(streamComandosUrl, lastSeq);
+    commandStream = new EventSource(url);
+    
+    commandStream.onopen = () => {
+        streamFailures = 0;
+        stopPolling();
+        console.log('✓ Stream de comandos conectado');
+    };
+    
+    commandStream.addEventListener('seq', (event) => {
+        syncLastSeq(parseInt(event.data, 10));
+    });
+    
+    commandStream.onmessage = (event) => {
+        try {
+            if (useBinaryCommands) {
+                decodeBase64Commands(event.data).forEach(handleIncomingCommand);
+                return;
+            }
+            const data = JSON.parse(event.data);
+            if (data.comando) {
+                handleIncomingCommand(data);
+            }
+        } catch (err) {
+            console.error("Error al procesar evento del stream:", err);
+        }
+    };
+    
+    commandStream.onerror = () => {
+        if (commandStream && commandStream.readyState === EventSource.CONNECTING) {
+            streamFailures++;
+        }
+        if (!commandStream || commandStream.readyState === EventSource.CLOSED || streamFailures >= MAX_STREAM_FAILURES) {
+            console.warn('Stream de comandos no disponible, usando polling');
+            stopStream();
+            startPolling();
+        }
+    };
+    
+    return true;
+};
+
+const stopStream = () => {
+    if (commandStream) {
+        commandStream.close();
+        commandStream = null;
+    }
+};
+
+const startCommandTransport = () => {
+    if (!startStream()) {
+        startPolling();
+    }
+};
+
+const stopCommandTransport = () => {
+    stopStream();
+    stopPolling();
+};
+
+
 document.addEventListener('visibilitychange', () => {
     if (document.hidden) {
-        stopPolling();
+        stopCommandTransport();
     } else {
-        startPolling();
+        startCommandTransport();
     }
 });
 
 
+const detectorEstadoBox = document.getElementById('detector-estado');
+const detectorEstadoTexto = document.getElementById('detector-estado-texto');
+const estadoDetectorUrl = typeof ESTADO_DETECTOR_URL !== 'undefined' ? ESTADO_DETECTOR_URL : '';
+const CLASES_ESTADO_DETECTOR = {
+    starting: 'alert-info',
+    ready: 'alert-success',
+    failed: 'alert-warning',
+    stopped: 'alert-warning',
+};
+let detectorStatusTimer = null;
+
+const updateDetectorStatus = (estado, mensaje) => {
+    if (!detectorEstadoBox) return;
+    detectorEstadoBox.dataset.estado = estado;
+    detectorEstadoBox.className = `alert ${CLASES_ESTADO_DETECTOR[estado] || 'alert-warning'}`;
+    if (detectorEstadoTexto && mensaje) detectorEstadoTexto.textContent = mensaje;
+};
+
+const checkDetectorStatus = async () => {
+    let estado = detectorEstadoBox ? detectorEstadoBox.dataset.estado : 'starting';
+    try {
+        const response = await fetch(estadoDetectorUrl, { headers: { 'Accept': 'application/json' } });
+        if (response.ok) {
+            const data = await response.json();
+            estado = data.status;
+            updateDetectorStatus(estado, data.message);
+        }
+    } catch (err) {
+        console.error('Error al consultar el estado del detector:', err);
+    }
+    // Mientras arranca se consulta seguido; una vez listo basta con vigilar caídas.
+    if (estado === 'starting' || estado === 'ready') {
+        detectorStatusTimer = setTimeout(checkDetectorStatus, estado === 'starting' ? 1000 : 5000);
+    }
+};
+
+const startDetectorStatus = () => {
+    if (!detectorEstadoBox || !estadoDetectorUrl || detectorStatusTimer) return;
+    checkDetectorStatus();
+};
+
+const stopDetectorStatus = () => {
+    if (detectorStatusTimer) {
+        clearTimeout(detectorStatusTimer);
+        detectorStatusTimer = null;
+    }
+};
+
+
+const formatMegabytes = (bytes) => `${(bytes / (1024 * 1024)).toFixed(1)} MB`;
+
+const waitForDownload = async () => {
+    while (true) {
+        try {
+            const response = await fetch(descargaUrl, { headers: { 'Accept': 'application/json' } });
+            const data = await response.json();
+            
+            if (data.estado === 'lista') {
+                return data.url;
+            }
+            if (!response.ok || data.estado === 'error') {
+                console.error("Error en la descarga desde Drive:", data.message);
+                return '';
+            }
+            if (pageInfoDisplay) {
+                pageInfoDisplay.textContent = data.total
+                    ? `Descargando desde Drive... ${Math.floor(100 * data.descargados / data.total)}% (${formatMegabytes(data.descargados)} de ${formatMegabytes(data.total)})`
+                    : `Descargando desde Drive... ${formatMegabytes(data.descargados)}`;
+            }
+        } catch (err) {
+            console.error("Error al consultar el progreso de la descarga:", err);
+        }
+        await new Promise(resolve => setTimeout(resolve, 500));
+    }
+};
+
 const initApp = async () => {
     console.log('Iniciando aplicación de presentación...');
+    startDetectorStatus();
+    
+    if (!url && descargaUrl) {
+        url = await waitForDownload();
+    }
     
     if (!url) {
         console.error("No se proporcionó URL del PDF");
@@ -992,10 +1259,11 @@ const initApp = async () => {
     }
     
     console.log('Cargando PDF desde:', url);
+    loadPyramid();
     await loadPdf();
     
-    console.log('PDF cargado, iniciando polling de comandos...');
-    startPolling();
+    console.log('PDF cargado, iniciando recepción de comandos...');
+    startCommandTransport();
     
     updateFullscreenButton();
     
@@ -1012,7 +1280,8 @@ if (document.readyState === 'loading') {
 
 const detenerYSalir = async () => {
     try {
-        stopPolling();
+        stopCommandTransport();
+        stopDetectorStatus();
         
         const detenerUrl = typeof DETENER_DETECTOR_URL !== 'undefined' 
             ? DETENER_DETECTOR_URL 
@@ -1064,12 +1333,12 @@ const detenerDetectorAlSalir = () => {
 
 window.addEventListener('beforeunload', () => {
     console.log('Página cerrándose, deteniendo detector...');
-    stopPolling();
+    stopCommandTransport();
     detenerDetectorAlSalir();
 });
 
 window.addEventListener('pagehide', () => {
-    stopPolling();
+    stopCommandTransport();
     detenerDetectorAlSalir();
 });
 
@@ -0,0 +1,281 @@
+import logging
+import os
+import secrets
+import subprocess
+import sys
+import threading
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from .models import SesionDetector
+
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+
+logger = logging.getLogger(__name__)
+
+MAX_DETECTORES = getattr(settings, 'DETECTOR_MAX_PROCESOS', 4)
+MAX_REINICIOS = getattr(settings, 'DETECTOR_MAX_REINICIOS', 3)
+LIMITE_MEMORIA_MB = getattr(settings, 'DETECTOR_LIMITE_MEMORIA_MB', None)
+PRIORIDAD_DETECTOR = getattr(settings, 'DETECTOR_NICE', 5)
+FUENTE_DETECTOR = getattr(settings, 'DETECTOR_FUENTE', '0')
+INTERVALO_SUPERVISION = 2.0
+TIEMPO_MAXIMO_ARRANQUE = getattr(settings, 'DETECTOR_TIEMPO_ARRANQUE', 60)
+LATIDO_MAXIMO = getattr(settings, 'DETECTOR_LATIDO_MAXIMO', 20)
+ESTADOS_ACTIVOS = ('iniciando', 'ejecutando')
+ESTADOS_LATIDO = {
+    'listo': 'ejecutando',
+    'fallido': 'fallido',
+    'detenido': 'detenido',
+}
+
+
+class LimiteDetectoresAlcanzado(Exception):
+    pass
+
+
+def proceso_vivo(pid):
+    if not pid:
+        return False
+    if psutil:
+        try:
+            return psutil.Process(pid).status() != psutil.STATUS_ZOMBIE
+        except psutil.Error:
+            return False
+    if os.name == 'nt':
+        # En Windows os.kill(pid, 0) termina el proceso en lugar de consultarlo.
+        import ctypes
+        kernel32 = ctypes.windll.kernel32
+        handle = kernel32.OpenProcess(0x1000, False, pid)
+        if not handle:
+            return False
+        codigo = ctypes.c_ulong()
+        kernel32.GetExitCodeProcess(handle, ctypes.byref(codigo))
+        kernel32.CloseHandle(handle)
+        return codigo.value == 259
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def terminar_pid(pid, timeout=5):
+    if psutil:
+        try:
+            proceso = psutil.Process(pid)
+            proceso.terminate()
+            proceso.wait(timeout=timeout)
+        except psutil.TimeoutExpired:
+            proceso.kill()
+        except psutil.Error:
+            pass
+        return
+    try:
+        os.kill(pid, 15)
+    except OSError:
+        pass
+
+
+class SupervisorDetectores:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._procesos = {}
+        self._hilo = None
+
+    def iniciar(self, usuario, presentacion=None):
+        with self._lock:
+            with transaction.atomic():
+                registro = SesionDetector.objects.select_for_update().filter(usuario=usuario).first()
+                if registro and registro.estado in ESTADOS_ACTIVOS and self.vivo(registro):
+                    if presentacion and registro.presentacion_id != presentacion.id:
+                        registro.presentacion = presentacion
+                        registro.save(update_fields=['presentacion', 'fecha_actualizacion'])
+                    return registro
+
+                activos = SesionDetector.objects.select_for_update().filter(
+                    estado__in=ESTADOS_ACTIVOS
+                ).exclude(usuario=usuario)
+                en_uso = 0
+                for otro in activos:
+                    if self.vivo(otro):
+                        en_uso += 1
+                    else:
+                        self._marcar(otro, 'fallido')
+                if en_uso >= MAX_DETECTORES:
+                    raise LimiteDetectoresAlcanzado(
+                        f"Se alcanzó el máximo de {MAX_DETECTORES} detectores en ejecución"
+                    )
+
+                if registro is None:
+                    registro = SesionDetector(usuario=usuario, sesion=secrets.token_urlsafe(16))
+                registro.presentacion = presentacion
+                registro.reinicios = 0
+                self._lanzar(registro)
+
+            self._asegurar_monitor()
+            return registro
+
+    def detener(self, usuario):
+        with self._lock:
+            registro = SesionDetector.objects.filter(usuario=usuario).first()
+            if registro is None:
+                return None
+
+            # Se marca antes de terminar para que el monitor no lo reinicie.
+            self._marcar(registro, 'detenido')
+            proceso = self._procesos.pop(registro.pk, None)
+            if proceso is not None:
+                proceso.terminate()
+                try:
+                    proceso.wait(timeout=5)
+                except subprocess.TimeoutExpired:
+                    proceso.kill()
+            elif registro.pid and proceso_vivo(registro.pid):
+                terminar_pid(registro.pid)
+
+            registro.pid = None
+            registro.save(update_fields=['pid', 'fecha_actualizacion'])
+            return registro
+
+    def estado(self, usuario):
+        registro = SesionDetector.objects.filter(usuario=usuario).first()
+        if registro is None or registro.estado not in ESTADOS_ACTIVOS:
+            return registro
+
+        if registro.pk not in self._procesos and not self.vivo(registro):
+            # Lanzado por otro worker que ya no lo supervisa; los propios los revisa el monitor.
+            registro.mensaje = 'El proceso del detector terminó inesperadamente'
+            self._marcar(registro, 'fallido')
+            return registro
+
+        ahora = timezone.now()
+        if registro.estado == 'iniciando' and registro.fecha_inicio and \
+                ahora - registro.fecha_inicio > timedelta(seconds=TIEMPO_MAXIMO_ARRANQUE):
+            self._expirar(registro, 'El detector no respondió al iniciar')
+        elif registro.estado == 'ejecutando' and registro.ultimo_latido and \
+                ahora - registro.ultimo_latido > timedelta(seconds=LATIDO_MAXIMO):
+            self._expirar(registro, 'El detector dejó de responder')
+        return registro
+
+    def registrar_latido(self, sesion, estado, mensaje=''):
+        nuevo_estado = ESTADOS_LATIDO.get(estado)
+        if not sesion or nuevo_estado is None:
+            return None
+        # Un latido tardío no debe revivir un detector ya detenido o descartado.
+        actualizados = SesionDetector.objects.filter(sesion=sesion, estado__in=ESTADOS_ACTIVOS).update(
+            estado=nuevo_estado,
+            mensaje=mensaje[:255],
+            ultimo_latido=timezone.now(),
+            fecha_actualizacion=timezone.now(),
+        )
+        if not actualizados:
+            return SesionDetector.objects.filter(sesion=sesion).first()
+        return SesionDetector.objects.get(sesion=sesion)
+
+    def detener_todos(self):
+        with self._lock:
+            ids = list(self._procesos)
+        for registro in SesionDetector.objects.filter(pk__in=ids).select_related('usuario'):
+            self.detener(registro.usuario)
+
+    def vivo(self, registro):
+        proceso = self._procesos.get(registro.pk)
+        if proceso is not None:
+            return proceso.poll() is None
+        return proceso_vivo(registro.pid)
+
+    def _marcar(self, registro, estado):
+        registro.estado = estado
+        registro.save(update_fields=['estado', 'mensaje', 'fecha_actualizacion'])
+
+    def _expirar(self, registro, mensaje):
+        logger.warning(f"Detector de {registro.usuario}: {mensaje}")
+        registro.mensaje = mensaje
+        self._marcar(registro, 'fallido')
+        with self._lock:
+            proceso = self._procesos.pop(registro.pk, None)
+        if proceso is not None:
+            proceso.kill()
+        elif registro.pid:
+            terminar_pid(registro.pid)
+
+    def _lanzar(self, registro):
+        argumentos = [
+            sys.executable, os.path.join(settings.BASE_DIR, 'manage.py'), 'detectar_gestos',
+            '--sesion', registro.sesion,
+            '--source', str(FUENTE_DETECTOR),
+        ]
+        # Prioridad y memoria las aplica el propio detector al arrancar: preexec_fn no es seguro con los
+        # hilos del servidor (el hijo puede bloquearse en un lock tomado por otro hilo antes del fork).
+        if LIMITE_MEMORIA_MB:
+            argumentos += ['--limite-memoria', str(LIMITE_MEMORIA_MB)]
+        opciones = {'cwd': settings.BASE_DIR}
+        if os.name == 'nt':
+            opciones['creationflags'] = subprocess.BELOW_NORMAL_PRIORITY_CLASS
+        else:
+            argumentos += ['--nice', str(PRIORIDAD_DETECTOR)]
+
+        proceso = subprocess.Popen(argumentos, **opciones)
+
+        registro.pid = proceso.pid
+        registro.estado = 'iniciando'
+        registro.mensaje = ''
+        registro.fecha_inicio = timezone.now()
+        registro.ultimo_latido = None
+        registro.save()
+        self._procesos[registro.pk] = proceso
+        logger.info(f"Detector iniciado para {registro.usuario} (pid {proceso.pid}, sesión {registro.sesion})")
+
+    def _asegurar_monitor(self):
+        if self._hilo is None or not self._hilo.is_alive():
+            self._hilo = threading.Thread(target=self._supervisar, name='supervisor-detectores', daemon=True)
+            self._hilo.start()
+
+    def _supervisar(self):
+        while True:
+            time.sleep(INTERVALO_SUPERVISION)
+            with self._lock:
+                if not self._procesos:
+                    self._hilo = None
+                    return
+                terminados = [(pk, p.returncode) for pk, p in self._procesos.items() if p.poll() is not None]
+                for pk, codigo in terminados:
+                    self._procesos.pop(pk, None)
+                    try:
+                        self._revisar_terminado(pk, codigo)
+                    except Exception as e:
+                        logger.error(f"Error supervisando detector {pk}: {e}")
+
+    def _revisar_terminado(self, pk, codigo):
+        registro = SesionDetector.objects.filter(pk=pk).first()
+        if registro is None or registro.estado not in ESTADOS_ACTIVOS:
+            return
+        if codigo == 0:
+            # El presentador cerró la ventana del detector.
+            registro.pid = None
+            registro.estado = 'detenido'
+            registro.save(update_fields=['pid', 'estado', 'fecha_actualizacion'])
+            return
+        if registro.reinicios >= MAX_REINICIOS:
+            logger.error(f"Detector de {registro.usuario} falló {registro.reinicios + 1} veces, no se reinicia")
+            registro.pid = None
+            registro.estado = 'fallido'
+            registro.mensaje = f'El detector terminó con código {codigo}'
+            registro.save(update_fields=['pid', 'estado', 'mensaje', 'fecha_actualizacion'])
+            return
+        registro.reinicios += 1
+        logger.warning(f"Detector de {registro.usuario} terminó con código {codigo}, reinicio {registro.reinicios}")
+        self._lanzar(registro)
+
+
+supervisor_detectores = SupervisorDetectores()
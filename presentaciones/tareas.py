@@ -0,0 +1,83 @@
+import logging
+import os
+
+from .cache_drive import cache_drive
+from .cola_trabajos import manejador, encolar, liberar_archivo_pendiente
+from .google_drive_oauth import get_or_create_user_folder, upload_to_drive, carpeta_no_encontrada
+from .piramide_diapositivas import generar_piramide, directorio_piramide
+
+logger = logging.getLogger(__name__)
+
+
+def _marcar_error(trabajo):
+    presentacion = trabajo.presentacion
+    if presentacion is not None:
+        presentacion.estado = 'error'
+        presentacion.save(update_fields=['estado'])
+    liberar_archivo_pendiente(trabajo.datos.get('ruta'), excluir=trabajo)
+
+
+def _liberar_fuente(trabajo):
+    liberar_archivo_pendiente(trabajo.datos.get('ruta'), excluir=trabajo)
+
+
+@manejador('subir_drive', al_fallar=_marcar_error)
+def subir_drive(trabajo):
+    presentacion = trabajo.presentacion
+    ruta = trabajo.datos['ruta']
+
+    # Si un intento anterior subió el archivo pero falló después, no se vuelve a subir.
+    if not presentacion.drive_id:
+        folder_id = get_or_create_user_folder(presentacion.usuario)
+        if not folder_id:
+            raise Exception("No se pudo obtener o crear la carpeta en Drive.")
+
+        nombre = trabajo.datos.get('nombre', presentacion.nombre)
+        try:
+            datos_drive = upload_to_drive(ruta, nombre, folder_id)
+        except Exception as e:
+            if not carpeta_no_encontrada(e):
+                raise
+            # La carpeta guardada en el usuario ya no existe en Drive: se vuelve a resolver una vez.
+            folder_id = get_or_create_user_folder(presentacion.usuario, revalidar=True)
+            if not folder_id:
+                raise
+            datos_drive = upload_to_drive(ruta, nombre, folder_id)
+        presentacion.nombre = datos_drive['name']
+        presentacion.drive_id = datos_drive['id']
+        presentacion.enlace_drive = datos_drive.get('webViewLink', '')
+
+    presentacion.estado = 'lista'
+    presentacion.save(update_fields=['nombre', 'drive_id', 'enlace_drive', 'estado'])
+
+    # Ambos trabajos leen el PDF que ya está en el servidor en lugar de descargarlo de Drive.
+    encolar('miniatura', presentacion, {'ruta': ruta})
+    encolar('piramide', presentacion, {'ruta': ruta})
+    _liberar_fuente(trabajo)
+
+
+@manejador('miniatura', al_fallar=_liberar_fuente)
+def miniatura(trabajo):
+    presentacion = trabajo.presentacion
+    ruta = trabajo.datos.get('ruta')
+    origen = presentacion.generar_miniatura(ruta)
+    presentacion.save(update_fields=['miniatura'])
+
+    if presentacion.ubicacion == 'drive' and origen in ('fuente', 'cache'):
+        ruta_pdf = ruta if origen == 'fuente' else cache_drive.ruta_actual(presentacion.drive_id)
+        tamano = os.path.getsize(ruta_pdf) if ruta_pdf and os.path.exists(ruta_pdf) else 0
+        cache_drive.registrar_descarga_evitada(tamano)
+        trabajo.datos['bytes_drive_evitados'] = tamano
+        trabajo.save(update_fields=['datos'])
+        logger.info(f"Miniatura de la presentación {presentacion.id} sin descargar de Drive: {tamano} bytes evitados")
+    _liberar_fuente(trabajo)
+
+
+@manejador('piramide', al_fallar=_liberar_fuente)
+def piramide(trabajo):
+    presentacion = trabajo.presentacion
+    manifiesto = generar_piramide(trabajo.datos['ruta'], directorio_piramide(presentacion.id))
+    tiempos = [pagina['ms'] for pagina in manifiesto['paginas']]
+    logger.info(f"Pirámide de la presentación {presentacion.id}: {manifiesto['total_paginas']} páginas en "
+                f"{manifiesto['ms_total'] / 1000:.1f} s ({sum(tiempos) / max(1, len(tiempos)):.0f} ms/página)")
+    _liberar_fuente(trabajo)
@@ -1,3 +1,366 @@
-from django.test import TestCase
+import base64
+import os
+import shutil
+import tempfile
+from io import StringIO
+from types import SimpleNamespace
+from unittest import mock
 
-# Create your tests here.
+import requests
+
+from django.core.management import call_command
+from django.db import connection
+from django.db.migrations.executor import MigrationExecutor
+from django.test import RequestFactory, SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from . import protocolo_comandos
+from .biblioteca import pagina_biblioteca, CursorInvalido
+from .canal_comandos import ColaComandos, CAPACIDAD_COLA_COMANDOS, colas_comandos
+from .descargas_drive import descargar_a_archivo
+from . import listado_slides
+from .management.commands.benchmark_descarga import crear_servidor
+from .models import Presentacion, SesionDetector, Usuario
+from .servir_archivos import respuesta_archivo
+from .transporte_gestos import TransporteComandos, EDAD_MAXIMA_COMANDO, _FIN
+
+
+class ColaComandosTests(SimpleTestCase):
+    def test_lector_al_dia_no_llena_la_cola(self):
+        cola = ColaComandos()
+        leido = 0
+        for i in range(CAPACIDAD_COLA_COMANDOS * 4):
+            comando = 'start_draw_0.1_0.1' if i % 50 == 0 else f'drawing_0.{i % 9}_0.2'
+            evento = cola.agregar(comando, 0.0)
+            self.assertIsNotNone(evento, f"Rechazado el comando {i}")
+            if i % 10 == 0:
+                leido = cola.desde(leido, 'pagina')[-1]['seq']
+
+        self.assertIsNotNone(cola.agregar('next', 0.0))
+        self.assertEqual(cola.estadisticas()['rechazados'], 0)
+
+    def test_rechaza_en_lugar_de_pisar_comandos_sin_leer(self):
+        cola = ColaComandos(capacidad=3)
+        cola.desde(0, 'pagina')
+        cola.agregar('drawing_0.1_0.1', 0.0)
+        cola.agregar('puntero_0.2_0.2', 0.0)
+        cola.agregar('next', 0.0)
+
+        # La posición se descarta para hacer lugar; después ya no queda nada descartable.
+        self.assertIsNotNone(cola.agregar('erasing_0.1_0.1', 0.0))
+        self.assertIsNone(cola.agregar('prev', 0.0))
+        self.assertEqual([e['comando'] for e in cola.desde(0)], ['drawing_0.1_0.1', 'next', 'erasing_0.1_0.1'])
+
+    def test_los_comandos_fuera_de_la_ventana_se_liberan(self):
+        cola = ColaComandos(capacidad=2, ventana=0)
+        for comando in ('next', 'prev', 'next', 'prev'):
+            self.assertIsNotNone(cola.agregar(comando, 0.0))
+
+    def test_coalesce_posiciones_consecutivas(self):
+        cola = ColaComandos()
+        cola.agregar('puntero_0.1_0.1', 0.0)
+        ultimo = cola.agregar('puntero_0.2_0.2', 0.0)
+        self.assertEqual(cola.desde(0), [ultimo])
+
+
+class ProtocoloComandosTests(SimpleTestCase):
+    def test_ida_y_vuelta_conserva_comandos(self):
+        comandos = ['next', 'drawing_0.125_0.5_0.25_0.75', 'zoom_1.5_0.3_0.7', 'stop_draw', 'puntero_0.333333_0.666667']
+        datos = b''.join(protocolo_comandos.codificar(c, seq=i + 1, timestamp=100.5 + i) for i, c in enumerate(comandos))
+
+        eventos = protocolo_comandos.decodificar(datos)
+        self.assertEqual([e['comando'] for e in eventos], comandos)
+        self.assertEqual([e['seq'] for e in eventos], [1, 2, 3, 4, 5])
+        self.assertEqual(eventos[1]['tipo'], 'drawing')
+        self.assertEqual(eventos[2]['timestamp'], 102.5)
+
+    def test_evento_sse_binario_se_decodifica(self):
+        evento = {'seq': 7, 'timestamp': 1.0, 'comando': 'moving_0.1_0.2'}
+        datos = base64.b64decode(protocolo_comandos.evento_sse_binario(evento))
+        self.assertEqual(protocolo_comandos.decodificar(datos)[0]['comando'], 'moving_0.1_0.2')
+
+    def test_rechaza_datos_invalidos(self):
+        datos = protocolo_comandos.codificar('drawing_0.1_0.2', seq=1)
+        with self.assertRaises(protocolo_comandos.ComandoInvalido):
+            protocolo_comandos.decodificar(datos[:-1])
+        with self.assertRaises(protocolo_comandos.ComandoInvalido):
+            protocolo_comandos.decodificar(datos[:protocolo_comandos.CABECERA.size - 1])
+        with self.assertRaises(protocolo_comandos.ComandoInvalido):
+            protocolo_comandos.codificar('saltar_0.1')
+        self.assertEqual(protocolo_comandos.codificar_evento({'seq': 1, 'timestamp': 0.0, 'comando': 'saltar'}), b'')
+
+
+class RespuestaArchivoTests(SimpleTestCase):
+    def setUp(self):
+        directorio = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directorio, ignore_errors=True)
+        self.contenido = bytes(range(256)) * 4
+        self.ruta = os.path.join(directorio, 'presentacion.pdf')
+        with open(self.ruta, 'wb') as f:
+            f.write(self.contenido)
+        self.fabrica = RequestFactory()
+
+    def pedir(self, **cabeceras):
+        respuesta = respuesta_archivo(self.fabrica.get('/archivo/', headers=cabeceras), self.ruta)
+        self.addCleanup(respuesta.close)
+        return respuesta
+
+    def test_rango_responde_206_con_el_segmento(self):
+        respuesta = self.pedir(Range='bytes=100-199')
+        self.assertEqual(respuesta.status_code, 206)
+        self.assertEqual(respuesta['Content-Range'], 'bytes 100-199/1024')
+        self.assertEqual(b''.join(respuesta.streaming_content), self.contenido[100:200])
+
+        respuesta = self.pedir(Range='bytes=-24')
+        self.assertEqual(respuesta['Content-Range'], 'bytes 1000-1023/1024')
+        self.assertEqual(b''.join(respuesta.streaming_content), self.contenido[-24:])
+
+    def test_rango_fuera_del_archivo_responde_416(self):
+        respuesta = self.pedir(Range='bytes=1024-')
+        self.assertEqual(respuesta.status_code, 416)
+        self.assertEqual(respuesta['Content-Range'], 'bytes */1024')
+
+    def test_etag_coincidente_responde_304(self):
+        etag = self.pedir()['ETag']
+        respuesta = self.pedir(If_None_Match=etag)
+        self.assertEqual(respuesta.status_code, 304)
+        self.assertEqual(respuesta.content, b'')
+        self.assertEqual(respuesta['ETag'], etag)
+
+    def test_if_range_desactualizado_devuelve_el_archivo_completo(self):
+        respuesta = self.pedir(Range='bytes=0-9', If_Range='"otro"')
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertEqual(b''.join(respuesta.streaming_content), self.contenido)
+
+
+class BibliotecaTests(TestCase):
+    def setUp(self):
+        self.usuario = Usuario.objects.create(username='ana')
+        otro = Usuario.objects.create(username='otro')
+        Presentacion.objects.create(usuario=otro, nombre='ajena')
+        ahora = timezone.now()
+        for i in range(10):
+            presentacion = Presentacion.objects.create(usuario=self.usuario, nombre=f'p{i}')
+            # Varias comparten fecha para que el desempate por id cruce los límites de página.
+            Presentacion.objects.filter(id=presentacion.id).update(fecha_subida=ahora - timezone.timedelta(minutes=i // 3))
+
+    def recorrer(self, limite, al_paginar=None):
+        ids = []
+        cursor = None
+        while True:
+            filas, cursor = pagina_biblioteca(self.usuario, cursor, limite)
+            ids.extend(fila['id'] for fila in filas)
+            if cursor is None:
+                return ids
+            if al_paginar:
+                al_paginar()
+
+    def test_recorre_todas_sin_duplicados(self):
+        esperados = list(Presentacion.objects.filter(usuario=self.usuario)
+                         .order_by('-fecha_subida', '-id').values_list('id', flat=True))
+        for limite in (1, 3, 4, 10, 50):
+            self.assertEqual(self.recorrer(limite), esperados, f"limite={limite}")
+
+    def test_presentacion_nueva_no_repite_paginas(self):
+        existentes = set(Presentacion.objects.filter(usuario=self.usuario).values_list('id', flat=True))
+        ids = self.recorrer(3, lambda: Presentacion.objects.create(usuario=self.usuario, nombre='nueva'))
+        self.assertEqual(len(ids), len(set(ids)))
+        self.assertEqual(set(ids), existentes)
+
+    def test_cursor_invalido(self):
+        with self.assertRaises(CursorInvalido):
+            pagina_biblioteca(self.usuario, 'no-es-un-cursor')
+
+
+class ComandoGestoTests(TestCase):
+    def setUp(self):
+        usuario = Usuario.objects.create(username='ana')
+        SesionDetector.objects.create(usuario=usuario, sesion='sesion-ana')
+        self.addCleanup(colas_comandos.eliminar, 'sesion-ana')
+        self.url = reverse('presentaciones:comando_gesto')
+
+    def enviar(self, datos):
+        return self.client.post(self.url, datos, content_type='application/json')
+
+    def test_sin_sesion_de_detector_valida_responde_404(self):
+        self.assertEqual(self.enviar({'comando': 'next'}).status_code, 404)
+        self.assertEqual(self.enviar({'comando': 'next', 'sesion': 'default'}).status_code, 404)
+        self.assertEqual(self.client.get(self.url, {'desde': 0}).status_code, 404)
+        self.assertIsNone(colas_comandos.obtener('default', crear=False))
+
+    def test_sesion_de_detector_recibe_y_entrega_comandos(self):
+        respuesta = self.enviar({'comando': 'next', 'sesion': 'sesion-ana'})
+        self.assertEqual(respuesta.status_code, 200)
+        comandos = self.client.get(self.url, {'sesion': 'sesion-ana', 'desde': 0}).json()['comandos']
+        self.assertEqual([c['comando'] for c in comandos], ['next'])
+
+
+class MigracionesTests(TestCase):
+    def test_modelos_y_migraciones_coinciden(self):
+        # Falla con SystemExit si makemigrations generaría una migración nueva.
+        call_command('makemigrations', 'presentaciones', '--check', '--dry-run', stdout=StringIO())
+
+
+class MigracionDuplicadosTests(TransactionTestCase):
+    antes = [('presentaciones', '0005_usuario_drive_folder_id')]
+    despues = [('presentaciones', '0006_presentacion_biblioteca')]
+
+    def setUp(self):
+        self.directorio = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directorio, ignore_errors=True)
+        self.ajustes = override_settings(RESPALDO_DUPLICADOS_0006=os.path.join(self.directorio, 'respaldo.json'))
+        self.ajustes.enable()
+        self.addCleanup(self.ajustes.disable)
+        self.migrar(self.antes)
+        self.addCleanup(self.volver_a_la_ultima)
+
+    def volver_a_la_ultima(self):
+        apps = MigrationExecutor(connection).loader.project_state(self.antes).apps
+        apps.get_model('presentaciones', 'Presentacion').objects.all().delete()
+        self.migrar(MigrationExecutor(connection).loader.graph.leaf_nodes('presentaciones'))
+
+    def migrar(self, destino):
+        executor = MigrationExecutor(connection)
+        with mock.patch('builtins.print'):
+            executor.migrate(destino)
+        return executor.loader.project_state(destino).apps
+
+    def test_conserva_la_fila_mas_reciente_y_revierte(self):
+        apps = MigrationExecutor(connection).loader.project_state(self.antes).apps
+        Usuario = apps.get_model('presentaciones', 'Usuario')
+        Presentacion = apps.get_model('presentaciones', 'Presentacion')
+        Trabajo = apps.get_model('presentaciones', 'Trabajo')
+        usuario = Usuario.objects.create(username='ana')
+        ahora = timezone.now()
+        ids = []
+        for dias in (3, 1, 2):
+            presentacion = Presentacion.objects.create(usuario=usuario, nombre=f'copia {dias}', drive_id='abc')
+            Presentacion.objects.filter(id=presentacion.id).update(fecha_subida=ahora - timezone.timedelta(days=dias))
+            ids.append(presentacion.id)
+        otra = Presentacion.objects.create(usuario=usuario, nombre='otra', drive_id='xyz')
+        trabajo = Trabajo.objects.create(tipo='miniatura', presentacion_id=ids[0])
+
+        with self.assertLogs('presentaciones.migrations.0006_presentacion_biblioteca', 'WARNING') as registro:
+            apps = self.migrar(self.despues)
+        Presentacion = apps.get_model('presentaciones', 'Presentacion')
+        Trabajo = apps.get_model('presentaciones', 'Trabajo')
+        self.assertEqual(set(Presentacion.objects.values_list('id', flat=True)), {ids[1], otra.id})
+        self.assertEqual(Trabajo.objects.get(id=trabajo.id).presentacion_id, ids[1])
+        self.assertIn(f"id {ids[0]} (se conserva {ids[1]})", registro.output[0])
+        self.assertIn(f"id {ids[2]} (se conserva {ids[1]})", registro.output[0])
+
+        with self.assertLogs('presentaciones.migrations.0006_presentacion_biblioteca', 'WARNING') as registro:
+            apps = self.migrar(self.antes)
+        self.assertIn("Restauradas 2", registro.output[0])
+        Presentacion = apps.get_model('presentaciones', 'Presentacion')
+        self.assertEqual(set(Presentacion.objects.values_list('id', flat=True)), set(ids) | {otra.id})
+        self.assertEqual(Presentacion.objects.get(id=ids[0]).fecha_subida, ahora - timezone.timedelta(days=3))
+        self.assertFalse(os.path.exists(os.path.join(self.directorio, 'respaldo.json')))
+
+
+class TransporteComandosTests(SimpleTestCase):
+    def setUp(self):
+        # Sin iniciar el hilo: la cola se vacía a mano con _bucle.
+        self.transporte = TransporteComandos('http://127.0.0.1:1/', capacidad=4)
+        self.enviados = []
+        self.transporte._enviar_ahora = self.enviados.append
+
+    def tearDown(self):
+        self.transporte._sesion.close()
+
+    def vaciar(self, envejecer=0.0):
+        with self.transporte._cola.mutex:
+            pendientes = self.transporte._cola.queue
+            for i, (comando, tipo, encolado) in enumerate(pendientes):
+                pendientes[i] = (comando, tipo, encolado - envejecer)
+            pendientes.append(_FIN)
+        self.transporte._bucle()
+
+    def test_el_trazo_agrupado_sobrevive_a_la_cola_llena(self):
+        trazo = 'drawing' + '_0.5_0.5' * 32
+        self.assertTrue(self.transporte.enviar('start_draw_0.5_0.5', 'start_draw'))
+        self.assertTrue(self.transporte.enviar(trazo, 'drawing'))
+        for i in range(10):
+            self.transporte.enviar(f'puntero_0.{i}_0.1', 'puntero')
+        self.assertTrue(self.transporte.enviar(trazo, 'drawing'))
+        self.assertTrue(self.transporte.enviar('stop_draw', 'stop_draw'))
+
+        # Más viejos que la edad máxima: las posiciones caducan, el trazo y los discretos no.
+        self.vaciar(envejecer=EDAD_MAXIMA_COMANDO * 2)
+        self.assertEqual(self.enviados, ['start_draw_0.5_0.5', trazo, trazo, 'stop_draw'])
+        self.assertGreater(self.transporte.descartados, 0)
+
+
+class DescargaPorRangosTests(SimpleTestCase):
+    def test_reanuda_un_parcial(self):
+        datos = os.urandom(300 * 1024)
+        with tempfile.TemporaryDirectory() as directorio:
+            origen = os.path.join(directorio, 'origen.pdf')
+            with open(origen, 'wb') as f:
+                f.write(datos)
+            servidor = crear_servidor(origen)
+            self.addCleanup(servidor.server_close)
+            self.addCleanup(servidor.shutdown)
+            peticion = SimpleNamespace(uri=f"http://127.0.0.1:{servidor.server_address[1]}/origen.pdf", headers={})
+
+            destino = os.path.join(directorio, 'destino.pdf')
+            with open(destino, 'wb') as f:
+                f.write(datos[:1000])
+            progreso = []
+            with open(destino, 'ab') as f, requests.Session() as sesion:
+                descargar_a_archivo(f, peticion, inicio=1000, tamano_fragmento=64 * 1024, sesion=sesion,
+                                    progreso=lambda descargados, total: progreso.append((descargados, total)))
+            with open(destino, 'rb') as f:
+                self.assertEqual(f.read(), datos)
+            self.assertEqual(progreso[-1], (len(datos), len(datos)))
+
+
+class DriveFalso:
+    # Lo mínimo de la API de Drive que usa ListadoSlides.
+    def __init__(self, archivos):
+        self.archivos = archivos
+        self.enlaces = 0
+
+    def changes(self):
+        return SimpleNamespace(getStartPageToken=lambda: SimpleNamespace(execute=lambda: {'startPageToken': '1'}))
+
+    def files(self):
+        def listar(**_):
+            return SimpleNamespace(execute=lambda: {'files': self.archivos})
+
+        def obtener(fileId, fields):
+            self.enlaces += 1
+            return {'id': fileId, 'thumbnailLink': f'https://miniatura/{fileId}?firma={self.enlaces}'}
+
+        return SimpleNamespace(list=listar, get=obtener)
+
+    def new_batch_http_request(self, callback):
+        peticiones = []
+        return SimpleNamespace(
+            add=peticiones.append,
+            execute=lambda: [callback(None, respuesta, None) for respuesta in peticiones]
+        )
+
+
+class ListadoSlidesTests(SimpleTestCase):
+    def setUp(self):
+        directorio = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directorio, ignore_errors=True)
+        parche = mock.patch.object(listado_slides, 'DIRECTORIO_LISTADOS', directorio)
+        parche.start()
+        self.addCleanup(parche.stop)
+        self.drive = DriveFalso([{'id': f'p{i}', 'name': f'Presentación {i}', 'thumbnailLink': 'vieja'}
+                                 for i in range(3)])
+        self.listado = listado_slides.ListadoSlides({'cuenta': 'c', 'token': 't'})
+        self.listado._servicio = self.drive
+
+    def test_las_miniaturas_no_se_guardan_y_se_renuevan(self):
+        primera, hay_mas = self.listado.pagina(0, 2)
+        self.assertTrue(hay_mas)
+        self.assertEqual([p['thumbnailLink'] for p in primera],
+                         ['https://miniatura/p0?firma=1', 'https://miniatura/p1?firma=2'])
+        with open(self.listado.ruta, encoding='utf-8') as archivo:
+            self.assertNotIn('thumbnailLink', archivo.read())
+
+        self.assertEqual(self.listado.buscar(['p2'])['p2']['thumbnailLink'], 'https://miniatura/p2?firma=3')
@@ -0,0 +1,319 @@
+import math
+import queue
+import threading
+import time
+from collections import Counter, deque
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from .protocolo_comandos import codificar, ComandoInvalido, TIPO_CONTENIDO
+
+
+EDAD_MAXIMA_COMANDO = 1.0
+MUESTRAS_LATENCIA = 500
+INTERVALO_LATIDO = 5.0
+PESO_LATENCIA_RECIENTE = 0.2
+
+# Trazos: cada punto cuenta y un mensaje lleva varios. Posiciones: solo importa la última.
+TIPOS_TRAZO = ('drawing', 'erasing')
+TIPOS_POSICION = ('moving', 'puntero')
+# Solo estos pueden perderse o caducar: el siguiente los reemplaza. Los trazos (hasta PUNTOS_POR_MENSAJE puntos
+# por mensaje) y los discretos (next, start_draw, stop_move...) se envían siempre.
+TIPOS_REEMPLAZABLES = TIPOS_POSICION + ('zoom',)
+# En coordenadas normalizadas; 0.004 son ~2.5 px a 640 px de ancho.
+UMBRAL_MOVIMIENTO = 0.004
+PUNTOS_POR_MENSAJE = 32
+INTERVALO_ENVIO_MINIMO = 0.015
+INTERVALO_ENVIO_MAXIMO = 0.12
+
+_FIN = object()
+
+
+class TransporteComandos:
+    def __init__(self, url, timeout=0.5, capacidad=256, registro=None, sesion=None, formato='binario'):
+        self.url = url
+        self.sesion = sesion
+        self.timeout = timeout
+        self.registro = registro
+        self.formato = formato
+        self._seq = 0
+
+        self._cola = queue.Queue(maxsize=capacidad)
+        self._sesion = requests.Session()
+        adaptador = HTTPAdapter(pool_connections=1, pool_maxsize=1, max_retries=0)
+        self._sesion.mount('http://', adaptador)
+        self._sesion.mount('https://', adaptador)
+        self._hilo = threading.Thread(target=self._bucle, name='transporte-comandos', daemon=True)
+
+        self._lock = threading.Lock()
+        self._latencias = deque(maxlen=MUESTRAS_LATENCIA)
+        self._latencia_reciente = None
+        self.enviados = 0
+        self.descartados = 0
+        self.caducados = 0
+        self.errores = Counter()
+        self.errores_consecutivos = 0
+
+    def iniciar(self):
+        self._hilo.start()
+        return self
+
+    def enviar(self, comando, tipo_comando):
+        elemento = (comando, tipo_comando, time.monotonic())
+        cola = self._cola
+        with cola.mutex:
+            if len(cola.queue) >= cola.maxsize:
+                # Cola llena: sale la posición más antigua; si no hay ninguna se pierde la nueva si es una posición.
+                # Un trazo o un discreto nunca se descarta, aunque la cola supere su capacidad.
+                indice = next((i for i, pendiente in enumerate(cola.queue)
+                               if pendiente is not _FIN and pendiente[1] in TIPOS_REEMPLAZABLES), None)
+                if indice is None and tipo_comando in TIPOS_REEMPLAZABLES:
+                    with self._lock:
+                        self.descartados += 1
+                    return False
+                if indice is not None:
+                    del cola.queue[indice]
+                    with self._lock:
+                        self.descartados += 1
+            cola.queue.append(elemento)
+            cola.unfinished_tasks += 1
+            cola.not_empty.notify()
+        return True
+
+    def detener(self, timeout=2.0):
+        try:
+            self._cola.put(_FIN, timeout=timeout)
+        except queue.Full:
+            pass
+        self._hilo.join(timeout)
+        self._sesion.close()
+
+    def _bucle(self):
+        while True:
+            elemento = self._cola.get()
+            if elemento is _FIN:
+                return
+
+            comando, tipo_comando, encolado = elemento
+            if time.monotonic() - encolado > EDAD_MAXIMA_COMANDO and tipo_comando in TIPOS_REEMPLAZABLES:
+                with self._lock:
+                    self.caducados += 1
+                continue
+
+            self._enviar_ahora(comando)
+
+    def _enviar_ahora(self, comando):
+        inicio = time.perf_counter()
+        try:
+            response = self._publicar(comando)
+            latencia = (time.perf_counter() - inicio) * 1000
+            if response.status_code == 200:
+                with self._lock:
+                    self.enviados += 1
+                    self._latencias.append(latencia)
+                    self._actualizar_latencia_reciente(latencia)
+                    self.errores_consecutivos = 0
+                return
+            self._registrar_error('http', f"HTTP {response.status_code}")
+        except requests.exceptions.Timeout:
+            with self._lock:
+                # Un timeout cuenta como la peor latencia posible para que el emisor espacie los envíos.
+                self._actualizar_latencia_reciente(self.timeout * 1000)
+            self._registrar_error('timeout', "Timeouts detectados (normal)")
+        except requests.exceptions.ConnectionError:
+            self._registrar_error('conexion', f"Error de conexión: {self.url}")
+        except Exception as e:
+            self._registrar_error('otro', f" Error: {type(e).__name__}")
+
+    def _publicar(self, comando):
+        self._seq += 1
+        if self.formato == 'binario':
+            try:
+                cuerpo = codificar(comando, self._seq, time.time())
+            except ComandoInvalido:
+                # Un comando fuera del esquema todavía puede viajar como JSON.
+                cuerpo = None
+            if cuerpo is not None:
+                return self._sesion.post(self.url, data=cuerpo, timeout=self.timeout,
+                                         params={'sesion': self.sesion} if self.sesion else None,
+                                         headers={'Content-Type': TIPO_CONTENIDO})
+        datos = {"comando": comando}
+        if self.sesion:
+            datos["sesion"] = self.sesion
+        return self._sesion.post(self.url, json=datos, timeout=self.timeout)
+
+    def _actualizar_latencia_reciente(self, latencia):
+        if self._latencia_reciente is None:
+            self._latencia_reciente = latencia
+        else:
+            self._latencia_reciente += PESO_LATENCIA_RECIENTE * (latencia - self._latencia_reciente)
+
+    def latencia_reciente(self):
+        with self._lock:
+            return self._latencia_reciente or 0.0
+
+    def _registrar_error(self, tipo, mensaje):
+        with self._lock:
+            self.errores[tipo] += 1
+            self.errores_consecutivos += 1
+            consecutivos = self.errores_consecutivos
+        if self.registro and consecutivos <= 3:
+            self.registro(mensaje)
+
+    def estadisticas(self):
+        with self._lock:
+            latencias = sorted(self._latencias)
+            total_errores = sum(self.errores.values())
+            return {
+                'enviados': self.enviados,
+                'errores': total_errores,
+                'errores_por_tipo': dict(self.errores),
+                'descartados': self.descartados,
+                'caducados': self.caducados,
+                'en_cola': self._cola.qsize(),
+                'latencia_media_ms': sum(latencias) / len(latencias) if latencias else 0.0,
+                'latencia_p95_ms': latencias[int(0.95 * (len(latencias) - 1))] if latencias else 0.0,
+            }
+
+
+class TransporteNulo:
+    errores_consecutivos = 0
+
+    def __init__(self, latencia_ms=0.0):
+        self.enviados = 0
+        self.latencia_ms = latencia_ms
+
+    def iniciar(self):
+        return self
+
+    def enviar(self, comando, tipo_comando):
+        self.enviados += 1
+        return True
+
+    def detener(self, timeout=2.0):
+        pass
+
+    def latencia_reciente(self):
+        return self.latencia_ms
+
+    def estadisticas(self):
+        return {
+            'enviados': self.enviados,
+            'errores': 0,
+            'errores_por_tipo': {},
+            'descartados': 0,
+            'caducados': 0,
+            'en_cola': 0,
+            'latencia_media_ms': 0.0,
+            'latencia_p95_ms': 0.0,
+        }
+
+
+class AgrupadorComandos:
+    # Comandos continuos del lado del detector: descarta los movimientos por debajo del umbral y junta
+    # los puntos de un trazo en un solo mensaje ("drawing_x1_y1_x2_y2..."). El intervalo entre mensajes
+    # sigue a la latencia medida por el transporte: si el servidor tarda más, se envían menos mensajes y más largos.
+    def __init__(self, transmitir, latencia=None, umbral=UMBRAL_MOVIMIENTO,
+                 intervalo_minimo=INTERVALO_ENVIO_MINIMO, intervalo_maximo=INTERVALO_ENVIO_MAXIMO):
+        self.transmitir = transmitir
+        self.latencia = latencia
+        self.umbral = umbral
+        self.intervalo_minimo = intervalo_minimo
+        self.intervalo_maximo = intervalo_maximo
+
+        self._tipo = None
+        self._puntos = []
+        self._referencias = {}
+        self._ultimo_envio = float('-inf')
+        self.recibidos = 0
+        self.filtrados = 0
+        self.mensajes = 0
+        self.puntos_enviados = 0
+
+    def intervalo(self):
+        latencia = self.latencia() / 1000 if self.latencia else 0.0
+        return min(max(latencia, self.intervalo_minimo), self.intervalo_maximo)
+
+    def agregar(self, tipo, x, y, ahora):
+        self.recibidos += 1
+        if self._tipo is not None and tipo != self._tipo:
+            self.vaciar(ahora)
+
+        referencia = self._referencias.get(tipo)
+        if referencia is not None and math.hypot(x - referencia[0], y - referencia[1]) < self.umbral:
+            self.filtrados += 1
+        else:
+            self._referencias[tipo] = (x, y)
+            self._tipo = tipo
+            if tipo in TIPOS_TRAZO:
+                self._puntos.append((x, y))
+            else:
+                self._puntos = [(x, y)]
+        self.revisar(ahora)
+
+    def revisar(self, ahora):
+        if self._puntos and (ahora - self._ultimo_envio >= self.intervalo()
+                             or len(self._puntos) >= PUNTOS_POR_MENSAJE):
+            self.vaciar(ahora)
+
+    def vaciar(self, ahora):
+        if self._puntos:
+            comando = self._tipo + ''.join(f"_{x:.3f}_{y:.3f}" for x, y in self._puntos)
+            if self.transmitir(comando, self._tipo):
+                self.mensajes += 1
+                self.puntos_enviados += len(self._puntos)
+            self._ultimo_envio = ahora
+        self._tipo = None
+        self._puntos = []
+
+    def reiniciar(self):
+        # Tras un comando discreto (start_draw, stop_move...) el siguiente punto siempre se envía.
+        self._referencias.clear()
+
+    def estadisticas(self):
+        return {
+            'recibidos': self.recibidos,
+            'filtrados': self.filtrados,
+            'mensajes': self.mensajes,
+            'puntos_enviados': self.puntos_enviados,
+            'intervalo_ms': self.intervalo() * 1000,
+        }
+
+
+class LatidoDetector:
+    def __init__(self, url, sesion, intervalo=INTERVALO_LATIDO, timeout=1.0):
+        self.url = url
+        self.sesion = sesion
+        self.intervalo = intervalo
+        self.timeout = timeout
+        self._detener = threading.Event()
+        self._hilo = threading.Thread(target=self._bucle, name='latido-detector', daemon=True)
+        self._iniciado = False
+
+    def listo(self):
+        if not self._iniciado:
+            self._iniciado = True
+            self._hilo.start()
+
+    def fallido(self, mensaje):
+        self._enviar('fallido', mensaje)
+
+    def detener(self):
+        self._detener.set()
+        if self._hilo.is_alive():
+            self._hilo.join(self.timeout)
+            self._enviar('detenido')
+
+    def _bucle(self):
+        while True:
+            self._enviar('listo')
+            if self._detener.wait(self.intervalo):
+                return
+
+    def _enviar(self, estado, mensaje=''):
+        try:
+            requests.post(self.url, json={'sesion': self.sesion, 'estado': estado, 'mensaje': mensaje},
+                          timeout=self.timeout)
+        except requests.exceptions.RequestException:
+            pass
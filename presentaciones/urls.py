@@ -8,16 +8,25 @@ urlpatterns = [
     path('register/', views.registerPage, name='register'),
     path('logout/', views.logoutUser, name='logout'),
     path('', views.home, name='home'),
+    path('biblioteca/', views.biblioteca, name='biblioteca'),
     path('upload/', views.uploadPage, name='upload'),
     path('eliminar/<int:presentacion_id>/', views.eliminar_presentacion, name='eliminar'),
+    path('presentaciones/estado/', views.estado_presentaciones, name='estado_presentaciones'),
     path('import-google-slides/', views.import_from_google_slides, name='import_from_google_slides'),
     path('oauth2callback/', views.oauth2callback, name='oauth2callback'),
     path('select-presentations/', views.select_presentations, name='select_presentations'),
+    path('select-presentations/pagina/', views.pagina_presentaciones_slides, name='pagina_presentaciones_slides'),
     path('import-selected-presentations/', views.import_selected_presentations, name='import_selected_presentations'),
     path('presentar/<int:presentacion_id>/', views.presentar, name='presentar'),
+    path('presentar/<int:presentacion_id>/descarga/', views.progreso_descarga, name='progreso_descarga'),
+    path('presentar/<int:presentacion_id>/archivo/', views.archivo_presentacion, name='archivo_presentacion'),
+    path('presentar/<int:presentacion_id>/piramide/', views.piramide_presentacion, name='piramide_presentacion'),
+    path('presentar/<int:presentacion_id>/piramide/<str:nombre>', views.imagen_piramide, name='imagen_piramide'),
     path('detector/iniciar/', views.iniciar_detector, name='iniciar_detector'),
     path('detector/detener/', views.detener_detector, name='detener_detector'),
     path('detector/estado/', views.verificar_estado_detector, name='verificar_estado_detector'),
+    path('detector/latido/', views.latido_detector, name='latido_detector'),
     path('comando-gesto/', views.comando_gesto, name='comando_gesto'),
+    path('comando-gesto/stream/', views.stream_comandos, name='stream_comandos'),
     path('guia-gestos/', views.guia_gestos, name='guia_gestos'),
 ]
\ No newline at end of file
@@ -1,46 +1,54 @@
 from django.shortcuts import render, redirect, get_object_or_404
-import os, cv2
+import os
 import traceback
 import logging
-from googleapiclient.http import MediaIoBaseDownload
-from io import BytesIO
 from .google_drive_oauth import get_drive_service
 from django.core.files import File
 from django.contrib import messages
 from django.contrib.auth import authenticate, login, logout
 from .forms import CustomUserCreationForm
 from django.contrib.auth import get_user_model
-from google.oauth2 import service_account
-from .google_drive_oauth import get_or_create_user_folder, upload_to_drive
-from googleapiclient.discovery import build
+from .google_drive_oauth import get_or_create_user_folder, upload_to_drive, carpeta_no_encontrada
 import tempfile
 from django.views.decorators.http import require_http_methods
-import comtypes.client
-from django.http import JsonResponse
+from django.http import HttpResponse, JsonResponse, StreamingHttpResponse
+from django.core.handlers.asgi import ASGIRequest
 from django.urls import reverse
+from django.template.loader import render_to_string
 from CPG import settings
-import time, subprocess, threading
-from .models import Presentacion
+import time
+from datetime import timedelta
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from .models import Presentacion, Trabajo, SesionDetector
 from django.contrib.auth.decorators import login_required
 from .forms import UploadPresentationForm
 from .google_slides_import import (
     get_authorization_url, 
     get_credentials_from_code,
-    get_user_presentations,
-    copy_presentation_to_drive
+    get_account_id,
+    copy_presentations_to_drive
 )
+from .listado_slides import ListadoSlides, TAMANO_PAGINA as TAMANO_PAGINA_SLIDES
+from .biblioteca import pagina_biblioteca, tarjeta, CursorInvalido, TAMANO_PAGINA as TAMANO_PAGINA_BIBLIOTECA
 from django.views.decorators.csrf import csrf_exempt
 import json
-from googleapiclient.errors import HttpError
-import sys
+import asyncio
+from asgiref.sync import sync_to_async
+from .canal_comandos import canal_comandos, colas_comandos
+from . import protocolo_comandos
+
+from .supervisor_detectores import supervisor_detectores, LimiteDetectoresAlcanzado, ESTADOS_ACTIVOS
+from .cache_drive import cache_drive, version_drive
+from .descargas_drive import descargar_a_archivo, iniciar_descarga, leer_progreso
+from .servir_archivos import respuesta_archivo, version_archivo
+from .piramide_diapositivas import piramide_vigente, url_piramide, eliminar_piramide, ruta_archivo_piramide
+from .cola_trabajos import encolar, trabajo_activo, guardar_archivo_pendiente
 
 # Variables Globales
 logger = logging.getLogger(__name__)
-detector_process = None
-detector_thread = None
-detector_running = False
 User = get_user_model()
-ultimo_comando = {'comando': None, 'timestamp': 0}
+ESPERA_REINTENTO_PIRAMIDE = 600
 def safe_remove(path, retries=3, delay=1):
     for i in range(retries):
         try:
@@ -116,13 +124,50 @@ def logoutUser(request):
 
 @login_required(login_url='presentaciones:login')
 def home(request):
-    presentaciones = Presentacion.objects.filter(usuario=request.user).order_by('-fecha_subida')[:10]
+    filas, siguiente = pagina_biblioteca(request.user)
+    presentaciones = [tarjeta(fila) for fila in filas]
 
     context = {
-        'presentaciones': presentaciones
+        'presentaciones': presentaciones,
+        'procesando': _ids_procesando(presentaciones),
+        'siguiente_cursor': siguiente,
     }
     return render(request, 'presentaciones/home.html', context)
 
+def _ids_procesando(presentaciones):
+    return set(Trabajo.objects.filter(
+        presentacion__in=[p['id'] for p in presentaciones], estado__in=['pendiente', 'en_proceso']
+    ).values_list('presentacion_id', flat=True))
+
+
+@login_required
+def biblioteca(request):
+    try:
+        limite = int(request.GET.get('limite', TAMANO_PAGINA_BIBLIOTECA))
+    except ValueError:
+        limite = TAMANO_PAGINA_BIBLIOTECA
+    
+    try:
+        filas, siguiente = pagina_biblioteca(request.user, request.GET.get('cursor'), limite)
+    except CursorInvalido as e:
+        return JsonResponse({'success': False, 'message': str(e)}, status=400)
+    
+    presentaciones = [tarjeta(fila) for fila in filas]
+    respuesta = {
+        'success': True,
+        'presentaciones': presentaciones,
+        'siguiente': siguiente,
+    }
+    if request.GET.get('html'):
+        # El inicio agrega las tarjetas con la misma plantilla que usa al renderizar la primera página.
+        procesando = _ids_procesando(presentaciones)
+        respuesta['html'] = ''.join(
+            render_to_string('presentaciones/componentes/tarjeta-presentacion.html',
+                             {'p': p, 'procesando': procesando}, request=request)
+            for p in presentaciones
+        )
+    return JsonResponse(respuesta)
+
 @login_required
 def guia_gestos(request):
     context = {
@@ -161,7 +206,8 @@ def uploadPage(request):
                         return redirect('presentaciones:upload')
                     
                     try:
-                        import comtypes
+                        # comtypes solo existe en Windows y solo se usa aquí: no se carga al arrancar.
+                        import comtypes.client
                         comtypes.CoInitialize()
                         
                         pdf_path = tmp_path.replace('.pptx', '.pdf')
@@ -188,23 +234,18 @@ def uploadPage(request):
                     return redirect('presentaciones:upload')
 
                 if ubicacion == 'drive':
-                    
-                    folder_id = get_or_create_user_folder(user)
-                    if not folder_id:
-                        raise Exception("No se pudo obtener o crear la carpeta en Drive.")
-
-                    datos_drive = upload_to_drive(upload_path, upload_name, folder_id)
-
+                    # La subida a Drive la hace el trabajador; la petición solo deja el PDF en espera.
+                    ruta_pendiente = guardar_archivo_pendiente(upload_path)
                     presentacion = Presentacion.objects.create(
                         usuario=user,
-                        nombre=datos_drive['name'],
+                        nombre=upload_name,
                         titulo=titulo,
-                        drive_id=datos_drive['id'],
-                        enlace_drive=datos_drive.get('webViewLink', ''),
-                        ubicacion='drive'
+                        ubicacion='drive',
+                        estado='pendiente'
                     )
+                    encolar('subir_drive', presentacion, {'ruta': ruta_pendiente, 'nombre': upload_name})
                     
-                    messages.success(request, f'Presentación "{titulo}" subida correctamente a Google Drive.')                
+                    messages.success(request, f'Presentación "{titulo}" recibida. Se está subiendo a Google Drive en segundo plano.')
                 else:
                     presentacion = Presentacion.objects.create(
                         usuario=user,
@@ -215,16 +256,13 @@ def uploadPage(request):
                     
                     with open(upload_path, 'rb') as f:
                         presentacion.archivo_local.save(upload_name, File(f), save=False)
+                    presentacion.save()
+                    
+                    encolar('miniatura', presentacion)
+                    encolar('piramide', presentacion, {'ruta': presentacion.archivo_local.path})
                     
                     messages.success(request, f'Presentación "{titulo}" guardada correctamente en el servidor.')
 
-                try:
-                    presentacion.generar_miniatura()
-                except Exception as e:
-                    logger.warning(f"Error al generar miniatura: {e}")
-                
-                presentacion.save()
-
                 return redirect('presentaciones:home')
             except Exception as e:
                 error_traceback = traceback.format_exc()
@@ -255,6 +293,7 @@ def eliminar_presentacion(request, presentacion_id):
     try:
         presentacion = get_object_or_404(Presentacion, id=presentacion_id, usuario=request.user)
         presentacion.delete()
+        eliminar_piramide(presentacion_id)
         messages.success(request, 'Presentación eliminada exitosamente.')
         return JsonResponse({'success': True, 'message': 'Presentación eliminada'})
     except Exception as e:
@@ -294,6 +333,11 @@ def oauth2callback(request):
     try:
         redirect_uri = request.build_absolute_uri(reverse('presentaciones:oauth2callback'))
         credentials_dict = get_credentials_from_code(code, state, redirect_uri)
+        try:
+            # Identifica la cuenta de Google para compartir su listado en caché entre sesiones.
+            credentials_dict['cuenta'] = get_account_id(credentials_dict)
+        except Exception as e:
+            logger.warning(f"No se pudo identificar la cuenta de Google: {e}")
         
         request.session['google_credentials'] = credentials_dict
         
@@ -317,10 +361,14 @@ def select_presentations(request):
         return redirect('presentaciones:import_from_google_slides')
     
     try:
-        presentations = get_user_presentations(credentials_dict)
+        presentations, hay_mas = ListadoSlides(credentials_dict).pagina(0)
+        for presentation in presentations:
+            presentation['modificado'] = parse_datetime(presentation['modifiedTime'] or '')
         
         context = {
-            'presentations': presentations
+            'presentations': presentations,
+            'hay_mas': hay_mas,
+            'tamano_pagina': TAMANO_PAGINA_SLIDES,
         }
         
         return render(request, 'presentaciones/select_presentations.html', context)
@@ -335,6 +383,31 @@ def select_presentations(request):
         return redirect('presentaciones:home')
 
 
+@login_required
+def pagina_presentaciones_slides(request):
+    credentials_dict = request.session.get('google_credentials')
+    if not credentials_dict:
+        return JsonResponse({'success': False, 'message': 'Sesión expirada. Por favor, autoriza nuevamente.'}, status=401)
+    
+    try:
+        desde = max(0, int(request.GET.get('desde', 0)))
+    except ValueError:
+        desde = 0
+    
+    try:
+        presentations, hay_mas = ListadoSlides(credentials_dict).pagina(desde)
+    except Exception as e:
+        logger.error(f"Error al obtener presentaciones: {e}")
+        return JsonResponse({'success': False, 'message': str(e)}, status=502)
+    
+    return JsonResponse({
+        'success': True,
+        'presentaciones': presentations,
+        'siguiente': desde + len(presentations),
+        'hay_mas': hay_mas,
+    })
+
+
 @login_required
 def import_selected_presentations(request):
     if request.method != 'POST':
@@ -361,40 +434,51 @@ def import_selected_presentations(request):
         if not folder_id:
             raise Exception("No se pudo obtener la carpeta del usuario.")
         
-        imported_count = 0
-
-        presentations = get_user_presentations(credentials_dict)
-        presentations_dict = {p['id']: p for p in presentations}
+        resultados = copy_presentations_to_drive(selected_ids, folder_id, credentials_dict)
+        sin_carpeta = [pid for pid, resultado in resultados.items() if carpeta_no_encontrada(resultado)]
+        if sin_carpeta:
+            folder_id = get_or_create_user_folder(request.user, revalidar=True)
+            if folder_id:
+                resultados.update(copy_presentations_to_drive(sin_carpeta, folder_id, credentials_dict))
         
-        for presentation_id in selected_ids:
-            try:
-                copied_data = copy_presentation_to_drive(
-                    presentation_id, 
-                    folder_id, 
-                    credentials_dict
-                )
-                
-                if not Presentacion.objects.filter(
-                    usuario=request.user, 
-                    drive_id=copied_data['id']
-                ).exists():
-
-                    thumbnail_url = None
-                    if presentation_id in presentations_dict:
-                        thumbnail_url = presentations_dict[presentation_id].get('thumbnailLink')
-                    
-
-                    presentacion = Presentacion.objects.create(
-                        usuario=request.user,
-                        nombre=copied_data['name'],
-                        drive_id=copied_data['id'],
-                        enlace_drive=copied_data['webView'],
-                        miniatura_url=thumbnail_url
-                    )
-                    imported_count += 1
-            except Exception as e:
-                logger.error(f"Error al importar presentación {presentation_id}: {e}")
-                continue
+        # Los datos salen del listado que ya se mostró al seleccionar; solo se piden las miniaturas vigentes.
+        presentations_dict = ListadoSlides(credentials_dict).buscar(selected_ids)
+        
+        copiadas = [(pid, resultados[pid]) for pid in selected_ids if not isinstance(resultados[pid], Exception)]
+        fallidas = [(pid, resultados[pid]) for pid in selected_ids if isinstance(resultados[pid], Exception)]
+        
+        existentes = set(Presentacion.objects.filter(
+            usuario=request.user,
+            drive_id__in=[copied_data['id'] for _, copied_data in copiadas]
+        ).values_list('drive_id', flat=True))
+        
+        nuevas = [
+            Presentacion(
+                usuario=request.user,
+                nombre=copied_data['name'],
+                drive_id=copied_data['id'],
+                enlace_drive=copied_data['webView'],
+                miniatura_url=presentations_dict.get(presentation_id, {}).get('thumbnailLink')
+            )
+            for presentation_id, copied_data in copiadas
+            if copied_data['id'] not in existentes
+        ]
+        # ignore_conflicts cubre la carrera con otra importación simultánea (restricción usuario + drive_id).
+        Presentacion.objects.bulk_create(nuevas, ignore_conflicts=True)
+        # Con ignore_conflicts las filas omitidas no se informan: se cuentan las que quedaron guardadas.
+        imported_count = Presentacion.objects.filter(
+            usuario=request.user,
+            drive_id__in=[presentacion.drive_id for presentacion in nuevas]
+        ).count() if nuevas else 0
+        
+        for presentation_id, error in fallidas:
+            logger.error(f"Error al importar presentación {presentation_id}: {error}")
+        if fallidas:
+            nombres = ', '.join(
+                presentations_dict.get(presentation_id, {}).get('name', presentation_id)
+                for presentation_id, _ in fallidas
+            )
+            messages.warning(request, f'No se pudieron importar {len(fallidas)} presentación(es): {nombres}.')
         
         if imported_count > 0:
             messages.success(
@@ -415,51 +499,33 @@ def import_selected_presentations(request):
         return redirect('presentaciones:home')
     
 
-detector_process = None
-detector_thread = None
-detector_running = False
-
-
-def limpiar_carpeta_temp():
-    temp_dir = os.path.join(settings.MEDIA_ROOT, 'temp')
-    
-    if os.path.exists(temp_dir):
-        try:
-            for filename in os.listdir(temp_dir):
-                file_path = os.path.join(temp_dir, filename)
-                try:
-                    if os.path.isfile(file_path):
-                        os.remove(file_path)
-                        print(f"Eliminado: {filename}")
-                except Exception as e:
-                    print(f"Error al eliminar {filename}: {e}")
-        except Exception as e:
-            print(f"Error al limpiar carpeta temp: {e}")
-    else:
-        os.makedirs(temp_dir, exist_ok=True)
 
 @login_required
 def presentar(request, presentacion_id):
+    from googleapiclient.errors import HttpError
+
     presentacion = get_object_or_404(Presentacion, id=presentacion_id, usuario=request.user)
     
+    if presentacion.estado == 'pendiente':
+        messages.info(request, f'"{presentacion.nombre}" todavía se está procesando. Inténtalo en unos segundos.')
+        return redirect('presentaciones:home')
+    if presentacion.estado == 'error':
+        messages.error(request, f'No se pudo procesar "{presentacion.nombre}". Elimínala y vuelve a subirla.')
+        return redirect('presentaciones:home')
+    
     tipo_almacenamiento = presentacion.ubicacion
     url_pdf = None
+    url_descarga = None
     tipo_archivo = None
     
     if tipo_almacenamiento == 'drive':
-        limpiar_carpeta_temp()
-        
         try:
-            
-            temp_dir = os.path.join(settings.MEDIA_ROOT, 'temp')
-            os.makedirs(temp_dir, exist_ok=True)
-            
             service = get_drive_service()
             
             try:
                 file_metadata = service.files().get(
                     fileId=presentacion.drive_id, 
-                    fields='name,mimeType'
+                    fields='name,mimeType,modifiedTime,md5Checksum'
                 ).execute()
             except HttpError as error:
                 if error.resp.status == 404:
@@ -488,33 +554,32 @@ def presentar(request, presentacion_id):
             mime_type = file_metadata.get('mimeType', '')
             
             if 'presentation' in mime_type or 'slides' in mime_type:
-                file_path = os.path.join(temp_dir, f'{presentacion.id}.pdf')
                 request_export = service.files().export_media(
                     fileId=presentacion.drive_id,
                     mimeType='application/pdf'
                 )
                 tipo_archivo = 'pdf'
+                # La exportación se genera en cada petición y no admite rangos: no se puede reanudar.
+                reanudable = False
             else:
                 extension = file_name.split('.')[-1].lower() if '.' in file_name else 'pdf'
-                file_path = os.path.join(temp_dir, f'{presentacion.id}.{extension}')
                 request_export = service.files().get_media(fileId=presentacion.drive_id)
                 tipo_archivo = extension
+                reanudable = True
             
-            with open(file_path, 'wb') as f:
-                fh = BytesIO()
-                downloader = MediaIoBaseDownload(fh, request_export)
-                done = False
-                
-                while not done:
-                    status, done = downloader.next_chunk()
-                
-                fh.seek(0)
-                f.write(fh.read())
-            
-            relative_path = os.path.join('temp', f'{presentacion.id}.{tipo_archivo}')
-            url_pdf = os.path.join(settings.MEDIA_URL, relative_path).replace('\\', '/')
+            version = version_drive(file_metadata)
             
-            messages.success(request, f'Presentación "{presentacion.nombre}" cargada correctamente.')
+            if cache_drive.contiene(presentacion.drive_id, version, tipo_archivo):
+                file_path, _ = cache_drive.obtener(
+                    presentacion.drive_id, version, tipo_archivo,
+                    lambda f, inicio: descargar_a_archivo(f, request_export, inicio if reanudable else 0),
+                    reanudable=reanudable
+                )
+                url_pdf = _url_archivo_presentacion(presentacion, file_path)
+                messages.success(request, f'Presentación "{presentacion.nombre}" cargada correctamente.')
+            else:
+                iniciar_descarga(presentacion.drive_id, version, tipo_archivo, request_export, reanudable)
+                url_descarga = reverse('presentaciones:progreso_descarga', args=[presentacion.id])
             
         except HttpError as e:
             print(f"Error de Google Drive API: {e}")
@@ -541,117 +606,214 @@ def presentar(request, presentacion_id):
             tipo_archivo = extension
             
             if extension == 'pdf':
-                url_pdf = presentacion.archivo_local.url
+                url_pdf = _url_archivo_presentacion(presentacion, presentacion.archivo_local.path)
             elif extension in ['pptx', 'ppt', 'odp']:
                 url_pdf = f"https://docs.google.com/viewer?url={request.build_absolute_uri(presentacion.archivo_local.url)}&embedded=true"
     
-    global detector_process, detector_running
-    
-    detector_iniciado = False
+    estado_detector = 'failed'
     mensaje_detector = ""
+    sesion_detector = None
     
-    if not detector_running:
-        try:
-            cap = cv2.VideoCapture(0)
-            
-            if cap.isOpened():
-                cap.release()
-                time.sleep(0.5)
-                
-                detector_process = subprocess.Popen(
-                    [sys.executable, 'manage.py', 'detectar_gestos']
-                )
-                
-                detector_running = True
-                time.sleep(2)
-                
-                if detector_process.poll() is None:
-                    detector_iniciado = True
-                    mensaje_detector = "Detector de gestos iniciado correctamente"
-                else:
-                    detector_running = False
-                    mensaje_detector = "Error: El detector no pudo iniciarse"
-            else:
-                cap.release()
-                mensaje_detector = "Advertencia: No se detectó cámara"
-                
-        except ImportError:
-            mensaje_detector = "Error: OpenCV no está instalado"
-        except Exception as e:
-            detector_running = False
-            mensaje_detector = f"Error al iniciar detector: {str(e)}"
-    else:
-        detector_iniciado = True
-        mensaje_detector = "Detector ya está en ejecución"
+    try:
+        registro = supervisor_detectores.iniciar(request.user, presentacion)
+        sesion_detector = registro.sesion
+        estado_detector, mensaje_detector = _estado_detector_publico(registro)
+    except LimiteDetectoresAlcanzado as e:
+        mensaje_detector = f"Advertencia: {e}"
+    except Exception as e:
+        mensaje_detector = f"Error al iniciar detector: {str(e)}"
     
     context = {
         'presentacion': presentacion,
         'url_pdf': url_pdf,
+        'url_descarga': url_descarga,
         'tipo_almacenamiento': tipo_almacenamiento,
         'tipo_archivo': tipo_archivo,
         'debug': settings.DEBUG,
-        'detector_iniciado': detector_iniciado,
+        'estado_detector': estado_detector,
         'mensaje_detector': mensaje_detector,
+        'sesion_detector': sesion_detector,
+        'protocolo_comandos': {
+            'version': protocolo_comandos.VERSION,
+            'tipos': protocolo_comandos.TIPOS,
+            'formato': request.GET.get('formato_comandos') or protocolo_comandos.FORMATO_POR_DEFECTO,
+        },
     }
     
     return render(request, 'presentaciones/presentar.html', context)
 
 
+def _ruta_archivo_presentacion(presentacion):
+    if presentacion.ubicacion == 'drive' and presentacion.drive_id:
+        return cache_drive.ruta_actual(presentacion.drive_id)
+    ruta = presentacion.get_archivo_path()
+    return ruta if ruta and os.path.exists(ruta) else None
+
+
+def _url_archivo_presentacion(presentacion, ruta):
+    url = reverse('presentaciones:archivo_presentacion', args=[presentacion.id])
+    return f"{url}?v={version_archivo(ruta)}"
+
+
 @login_required
-def iniciar_detector(request):
-    global detector_process, detector_thread, detector_running
+@require_http_methods(['GET', 'HEAD'])
+def archivo_presentacion(request, presentacion_id):
+    presentacion = get_object_or_404(Presentacion, id=presentacion_id, usuario=request.user)
+    ruta = _ruta_archivo_presentacion(presentacion)
+    
+    if ruta is None:
+        return JsonResponse({
+            'success': False,
+            'message': 'El archivo de la presentación no está disponible'
+        }, status=404)
+    
+    # Con ?v= la URL cambia junto con el archivo y puede guardarse en caché indefinidamente.
+    versionado = request.GET.get('v') == version_archivo(ruta)
+    return respuesta_archivo(request, ruta, versionado=versionado)
+
+
+@login_required
+def piramide_presentacion(request, presentacion_id):
+    presentacion = get_object_or_404(Presentacion, id=presentacion_id, usuario=request.user)
+    ruta = _ruta_archivo_presentacion(presentacion)
+    if ruta and not ruta.lower().endswith('.pdf'):
+        ruta = None
     
-    if detector_running:
+    manifiesto = piramide_vigente(presentacion.id, ruta)
+    if manifiesto is not None:
         return JsonResponse({
             'success': True,
-            'message': 'Detector ya está en ejecución',
-            'status': 'running'
+            'estado': 'lista',
+            'base_url': url_piramide(presentacion.id),
+            'manifiesto': manifiesto
         })
     
+    generando = trabajo_activo('piramide', presentacion)
+    if ruta and not generando:
+        # Presentaciones importadas o anteriores a la pirámide: se encola al abrirlas, salvo que ya fallara hace poco.
+        fallo_reciente = Trabajo.objects.filter(
+            tipo='piramide', presentacion=presentacion, estado='fallido',
+            fecha_fin__gte=timezone.now() - timedelta(seconds=ESPERA_REINTENTO_PIRAMIDE)
+        ).exists()
+        if not fallo_reciente:
+            if presentacion.ubicacion == 'drive':
+                # La caché de Drive puede expulsar el archivo antes de que el trabajador lo procese.
+                ruta = guardar_archivo_pendiente(ruta)
+            encolar('piramide', presentacion, {'ruta': ruta})
+            generando = True
+    
+    return JsonResponse({
+        'success': True,
+        'estado': 'generando' if generando else 'no_disponible'
+    })
+
+
+@login_required
+@require_http_methods(['GET', 'HEAD'])
+def imagen_piramide(request, presentacion_id, nombre):
+    presentacion = get_object_or_404(Presentacion, id=presentacion_id, usuario=request.user)
+    ruta = ruta_archivo_piramide(presentacion.id, nombre)
+    
+    if ruta is None:
+        return JsonResponse({
+            'success': False,
+            'message': 'Imagen no disponible'
+        }, status=404)
+    
+    return respuesta_archivo(request, ruta)
+
+
+@login_required
+def estado_presentaciones(request):
+    ids = [int(valor) for valor in request.GET.get('ids', '').split(',') if valor.strip().isdigit()]
+    presentaciones = Presentacion.objects.filter(usuario=request.user, id__in=ids)
+    trabajos = Trabajo.objects.filter(presentacion__in=presentaciones, estado__in=['pendiente', 'en_proceso', 'fallido'])
+    
+    pendientes = {}
+    for trabajo in trabajos.values('presentacion_id', 'tipo', 'estado', 'intentos'):
+        pendientes.setdefault(trabajo.pop('presentacion_id'), []).append(trabajo)
+    
+    return JsonResponse({
+        'success': True,
+        'presentaciones': [
+            {
+                'id': presentacion.id,
+                'estado': presentacion.estado,
+                'miniatura': presentacion.miniatura.url if presentacion.miniatura else presentacion.miniatura_url,
+                'trabajos': pendientes.get(presentacion.id, []),
+            }
+            for presentacion in presentaciones
+        ]
+    })
+
+
+@login_required
+def progreso_descarga(request, presentacion_id):
+    presentacion = get_object_or_404(Presentacion, id=presentacion_id, usuario=request.user)
+    progreso = leer_progreso(presentacion.drive_id) if presentacion.drive_id else None
+    
+    if progreso is None:
+        return JsonResponse({
+            'success': False,
+            'message': 'No hay una descarga en curso para esta presentación'
+        }, status=404)
+    
+    url = None
+    if progreso.get('estado') == 'lista':
+        ruta = _ruta_archivo_presentacion(presentacion)
+        url = _url_archivo_presentacion(presentacion, ruta) if ruta else None
+    
+    return JsonResponse({
+        'success': progreso.get('estado') != 'error',
+        'estado': progreso.get('estado'),
+        'descargados': progreso.get('descargados', 0),
+        'total': progreso.get('total'),
+        'url': url,
+        'message': progreso.get('error', ''),
+    })
+
+
+MENSAJES_ESTADO_DETECTOR = {
+    'starting': 'Iniciando detector de gestos...',
+    'ready': 'Detector de gestos listo',
+    'failed': 'El detector de gestos no pudo iniciarse',
+    'stopped': 'Detector detenido',
+}
+
+
+def _estado_detector_publico(registro):
+    if registro is None or registro.estado == 'detenido':
+        estado = 'stopped'
+    elif registro.estado == 'iniciando':
+        estado = 'starting'
+    elif registro.estado == 'ejecutando':
+        estado = 'ready'
+    else:
+        estado = 'failed'
+    mensaje = registro.mensaje if registro is not None and estado == 'failed' and registro.mensaje else ''
+    return estado, mensaje or MENSAJES_ESTADO_DETECTOR[estado]
+
+
+@login_required
+def iniciar_detector(request):
     try:
-        cap = cv2.VideoCapture(0)
-        
-        if not cap.isOpened():
-            cap.release()
-            return JsonResponse({
-                'success': False,
-                'message': 'No se pudo acceder a la cámara',
-                'error': 'camera_not_found'
-            })
-        
-        cap.release()
-        time.sleep(0.5)
-        
-        detector_process = subprocess.Popen(
-                    [sys.executable, 'manage.py', 'detectar_gestos']
-                )
-        
-        detector_running = True
-        
-        time.sleep(2)
-        
-        if detector_process.poll() is not None:
-            detector_running = False
-            return JsonResponse({
-                'success': False,
-                'message': 'Error al iniciar el detector',
-                'error': 'detector_failed'
-            })
+        registro = supervisor_detectores.iniciar(request.user)
+        estado, mensaje = _estado_detector_publico(registro)
         
         return JsonResponse({
             'success': True,
-            'message': 'Detector iniciado correctamente',
-            'status': 'started'
+            'message': mensaje,
+            'status': estado,
+            'sesion': registro.sesion
         })
         
-    except ImportError:
+    except LimiteDetectoresAlcanzado as e:
         return JsonResponse({
             'success': False,
-            'message': 'OpenCV no está instalado',
-            'error': 'opencv_missing'
-        })
+            'message': str(e),
+            'error': 'detector_limit'
+        }, status=503)
     except Exception as e:
-        detector_running = False
         return JsonResponse({
             'success': False,
             'message': f'Error al iniciar el detector: {str(e)}',
@@ -660,8 +822,6 @@ def iniciar_detector(request):
 
 @csrf_exempt
 def detener_detector(request):
-    global detector_process, detector_running
-    
     if request.method not in ['GET', 'POST']:
         return JsonResponse({
             'success': False,
@@ -669,7 +829,15 @@ def detener_detector(request):
             'error': 'invalid_method'
         }, status=405)
     
-    if not detector_running or detector_process is None:
+    if not request.user.is_authenticated:
+        return JsonResponse({
+            'success': False,
+            'message': 'Autenticación requerida',
+            'error': 'not_authenticated'
+        }, status=401)
+    
+    registro = supervisor_detectores.estado(request.user)
+    if registro is None or registro.estado not in ESTADOS_ACTIVOS:
         return JsonResponse({
             'success': True,
             'message': 'Detector no está en ejecución',
@@ -677,15 +845,8 @@ def detener_detector(request):
         })
     
     try:
-        detector_process.terminate()
-        
-        try:
-            detector_process.wait(timeout=5)
-        except subprocess.TimeoutExpired:
-            detector_process.kill()
-        
-        detector_running = False
-        detector_process = None
+        supervisor_detectores.detener(request.user)
+        colas_comandos.eliminar(registro.sesion)
         
         return JsonResponse({
             'success': True,
@@ -703,48 +864,142 @@ def detener_detector(request):
 
 @login_required
 def verificar_estado_detector(request):
-    global detector_process, detector_running
+    registro = supervisor_detectores.estado(request.user)
+    estado, mensaje = _estado_detector_publico(registro)
+    
+    respuesta = {
+        'running': estado in ('starting', 'ready'),
+        'status': estado,
+        'message': mensaje,
+    }
+    if registro is not None:
+        respuesta['sesion'] = registro.sesion
+        respuesta['reinicios'] = registro.reinicios
+    return JsonResponse(respuesta)
+
+
+@csrf_exempt
+def latido_detector(request):
+    if request.method != 'POST':
+        return JsonResponse({
+            'success': False,
+            'message': 'Método no permitido'
+        }, status=405)
     
-    if not detector_running or detector_process is None:
+    try:
+        data = json.loads(request.body)
+    except json.JSONDecodeError:
         return JsonResponse({
-            'running': False,
-            'status': 'stopped'
-        })
+            'success': False,
+            'message': 'JSON inválido'
+        }, status=400)
     
-    if detector_process.poll() is not None:
-        detector_running = False
-        detector_process = None
+    registro = supervisor_detectores.registrar_latido(
+        data.get('sesion'), data.get('estado'), str(data.get('mensaje') or '')
+    )
+    if registro is None:
         return JsonResponse({
-            'running': False,
-            'status': 'crashed'
-        })
+            'success': False,
+            'message': 'Sesión de detector desconocida'
+        }, status=404)
     
     return JsonResponse({
-        'running': True,
-        'status': 'running'
+        'success': True,
+        'estado': registro.estado
+    })
+
+def _sesion_comandos(request, data=None):
+    if data and data.get('sesion'):
+        return str(data['sesion'])
+    return request.GET.get('sesion')
+
+
+def _cola_comandos(sesion):
+    # Solo hay colas para sesiones de detector existentes: el POST no está autenticado,
+    # cualquier texto en "sesion" reservaría memoria y una sesión compartida mezclaría presentaciones.
+    if not sesion:
+        return None
+    cola = colas_comandos.obtener(sesion, crear=False)
+    if cola is None and SesionDetector.objects.filter(sesion=sesion).exists():
+        cola = colas_comandos.obtener(sesion)
+    return cola
+
+
+def _sesion_desconocida():
+    return JsonResponse({
+        'success': False,
+        'message': 'Sesión de comandos desconocida'
+    }, status=404)
+
+
+def _cola_llena():
+    # Solo ocurre si la cola está llena de trazos o navegación que nadie leyó; el detector lo cuenta como error.
+    return JsonResponse({
+        'success': False,
+        'message': 'Cola de comandos llena',
+        'error': 'queue_full'
+    }, status=503)
+
+
+def _formato_comandos(request):
+    formato = request.GET.get('formato')
+    return formato if formato in protocolo_comandos.FORMATOS else 'json'
+
+
+def _recibir_comandos_binarios(request):
+    try:
+        recibidos = protocolo_comandos.decodificar(request.body)
+    except protocolo_comandos.ComandoInvalido as e:
+        return JsonResponse({
+            'success': False,
+            'message': f'Comando binario inválido: {e}'
+        }, status=400)
+    if not recibidos:
+        return JsonResponse({
+            'success': False,
+            'message': 'No se proporcionó comando'
+        }, status=400)
+
+    sesion = _sesion_comandos(request)
+    cola = _cola_comandos(sesion)
+    if cola is None:
+        return _sesion_desconocida()
+    for recibido in recibidos:
+        evento = cola.agregar(recibido['comando'], time.time())
+        if evento is None:
+            return _cola_llena()
+        canal_comandos.publicar(sesion, evento)
+    return JsonResponse({
+        'success': True,
+        'comando': evento['comando'],
+        'seq': evento['seq'],
+        'message': 'Comando actualizado'
     })
 
-comando_lock = threading.Lock()
 
 @csrf_exempt
 def comando_gesto(request):
-    global ultimo_comando
-    
     if request.method == 'POST':
+        if request.content_type == protocolo_comandos.TIPO_CONTENIDO:
+            return _recibir_comandos_binarios(request)
         try:
             data = json.loads(request.body)
             comando = data.get('comando')
             
             if comando:
-                with comando_lock:
-                    ultimo_comando = {
-                        'comando': comando,
-                        'timestamp': time.time()
-                    }
-                print(f"[COMANDO] Recibido: {comando} @ {ultimo_comando['timestamp']}")
+                sesion = _sesion_comandos(request, data)
+                cola = _cola_comandos(sesion)
+                if cola is None:
+                    return _sesion_desconocida()
+                evento = cola.agregar(comando, time.time())
+                if evento is None:
+                    return _cola_llena()
+                canal_comandos.publicar(sesion, evento)
+                print(f"[COMANDO] Recibido: {comando} #{evento['seq']} @ {evento['timestamp']}")
                 return JsonResponse({
                     'success': True,
                     'comando': comando,
+                    'seq': evento['seq'],
                     'message': 'Comando actualizado'
                 })
             else:
@@ -760,24 +1015,111 @@ def comando_gesto(request):
             }, status=400)
     
     elif request.method == 'GET':
-        with comando_lock:
-            current_time = time.time()
-            if ultimo_comando['comando'] and (current_time - ultimo_comando['timestamp']) < 2:
-                comando_actual = ultimo_comando['comando']
-                return JsonResponse({
-                    'success': True,
-                    'comando': comando_actual,
-                    'timestamp': ultimo_comando['timestamp']
-                })
-            else:
-                if ultimo_comando['comando']:
-                    ultimo_comando = {'comando': None, 'timestamp': 0}
-                return JsonResponse({
-                    'success': True,
-                    'comando': None
-                })
+        cola = _cola_comandos(_sesion_comandos(request))
+        if cola is None:
+            return _sesion_desconocida()
+        desde = request.GET.get('desde')
+        
+        try:
+            desde = int(desde) if desde is not None else None
+        except ValueError:
+            return JsonResponse({
+                'success': False,
+                'message': 'Parámetro "desde" inválido'
+            }, status=400)
+        
+        # Con "lector" la página informa hasta dónde leyó y la cola puede liberar esos comandos.
+        lector = request.GET.get('lector')
+        comandos = cola.desde(desde, f"poll-{lector[:32]}" if lector else None) if desde is not None else []
+        if _formato_comandos(request) == 'binario':
+            response = HttpResponse(b''.join(protocolo_comandos.codificar_evento(e) for e in comandos),
+                                    content_type=protocolo_comandos.TIPO_CONTENIDO)
+            response['X-Ultimo-Seq'] = str(cola.ultimo_seq)
+            return response
+
+        respuesta = {
+            'success': True,
+            'comandos': comandos,
+            'ultimo_seq': cola.ultimo_seq,
+        }
+        if request.GET.get('estadisticas'):
+            respuesta['estadisticas'] = cola.estadisticas()
+        return JsonResponse(respuesta)
     
     return JsonResponse({
         'success': False,
         'message': 'Método no permitido'
     }, status=405)
+
+
+INTERVALO_LATIDO_STREAM = 15
+
+
+def _evento_sse(evento, formato='json'):
+    datos = protocolo_comandos.evento_sse_binario(evento) if formato == 'binario' else json.dumps(evento)
+    return f"id: {evento['seq']}\ndata: {datos}\n\n"
+
+
+async def stream_comandos(request):
+    if not isinstance(request, ASGIRequest):
+        return JsonResponse({
+            'success': False,
+            'message': 'El streaming de comandos requiere un servidor ASGI',
+            'error': 'stream_unavailable'
+        }, status=503)
+
+    if request.method != 'GET':
+        return JsonResponse({
+            'success': False,
+            'message': 'Método no permitido'
+        }, status=405)
+
+    sesion = _sesion_comandos(request)
+    formato = _formato_comandos(request)
+    cola_sesion = await sync_to_async(_cola_comandos)(sesion)
+    if cola_sesion is None:
+        return _sesion_desconocida()
+    ultimo_id = request.headers.get('Last-Event-ID') or request.GET.get('desde')
+    try:
+        ultimo_id = int(ultimo_id) if ultimo_id is not None else None
+    except ValueError:
+        ultimo_id = None
+    if ultimo_id is not None and ultimo_id > cola_sesion.ultimo_seq:
+        # El servidor se reinició y seq volvió a empezar: el id del cliente ya no sirve.
+        ultimo_id = cola_sesion.ultimo_seq
+
+    suscripcion = canal_comandos.suscribir(sesion)
+    _, _, cola = suscripcion
+    lector = f"stream-{id(cola)}"
+
+    async def eventos():
+        try:
+            yield "retry: 2000\n\n"
+            ultimo_enviado = ultimo_id if ultimo_id is not None else cola_sesion.ultimo_seq
+            # La página compara este seq con el suyo para detectar que el servidor se reinició.
+            yield f"id: {ultimo_enviado}\nevent: seq\ndata: {ultimo_enviado}\n\n"
+            for evento in cola_sesion.desde(ultimo_enviado, lector):
+                ultimo_enviado = evento['seq']
+                yield _evento_sse(evento, formato)
+                cola_sesion.confirmar(lector, ultimo_enviado)
+            while True:
+                try:
+                    evento = await asyncio.wait_for(cola.get(), timeout=INTERVALO_LATIDO_STREAM)
+                except asyncio.TimeoutError:
+                    # El latido también renueva el cursor: un lector conectado mantiene viva la cola.
+                    cola_sesion.confirmar(lector, ultimo_enviado)
+                    yield ": latido\n\n"
+                    continue
+                if evento['seq'] <= ultimo_enviado:
+                    continue
+                ultimo_enviado = evento['seq']
+                yield _evento_sse(evento, formato)
+                cola_sesion.confirmar(lector, ultimo_enviado)
+        finally:
+            cola_sesion.soltar(lector)
+            canal_comandos.desuscribir(suscripcion)
+
+    response = StreamingHttpResponse(eventos(), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response